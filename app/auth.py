@@ -1,30 +1,30 @@
 from jose import JWTError, jwt 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
+from app.utils.principal_cache import principal_cache
+from app.utils.password_hasher import password_hasher
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "94ef4ff7a665cbf75258dcc74599d59ab5239fb52bbdbfa06a1d88fde85e6b8e")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """Check a username/password with bcrypt on the hasher pool; rehashes when BCRYPT_ROUNDS changed."""
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         return None
+
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = await password_hasher.hash(password)
+        await db.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -33,7 +33,10 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
+    return await get_user_from_token(db, token)
+
+async def get_user_from_token(db: AsyncSession, token: str):
     credentials_exception = HTTPException(status_code=401, detail="Invalid token")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -43,8 +46,14 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except JWTError as e:  
         raise HTTPException(status_code=401, detail=f"JWT error: {str(e)}")
 
-    user = db.query(User).filter(User.username == username).first()
+    # The token is verified above; only the user lookup is cached
+    user = principal_cache.get(token)
+    if user is not None:
+        return await db.merge(user, load=False)
+
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
+    principal_cache.put(token, user, token_exp=payload.get("exp"))
     return user
@@ -0,0 +1 @@
+"""Synthetic data and in-process load benchmarks (SQLite), see app/benchmarks/__main__.py."""
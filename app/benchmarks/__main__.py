@@ -0,0 +1,128 @@
+"""Benchmarks against a local SQLite database filled with synthetic data.
+
+    python -m app.benchmarks generate [--db bench.db] [--users 200] [--tasks 20000] [--chats 150] [--messages 40]
+    python -m app.benchmarks run [--db bench.db] [--requests 200] [--concurrency 8] [--only search] [--out run.json]
+    python -m app.benchmarks compare baseline.json candidate.json [--fail-over 20]
+
+The app runs in-process behind httpx's ASGI transport, with the fake LLM
+backend and the in-memory email transport (--llm-latency / --email-latency
+set how long each fake call takes). run exits non-zero on errors or when an
+endpoint goes over its query budget (runner.SCENARIOS). Save two runs with
+--out and compare them; compare exits non-zero when a p50 gets slower by more
+than --fail-over percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+DEFAULT_DB = "bench.db"
+
+
+def _configure(args):
+    # Before anything imports app.database / the LLM and email settings
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("EMAIL_TRANSPORT", "memory")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("DB_ECHO", "0")
+    # Per-request statement counts come back in X-DB-Queries
+    os.environ["SQL_DEBUG_HEADERS"] = "1"
+    if getattr(args, "llm_latency", None) is not None:
+        os.environ["LLM_FAKE_LATENCY"] = str(args.llm_latency)
+    if getattr(args, "email_latency", None) is not None:
+        os.environ["EMAIL_FAKE_LATENCY"] = str(args.email_latency)
+
+
+def _generate(args):
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    from app.database import engine
+    from app.benchmarks.synthetic import generate
+
+    counts = generate(engine, users=args.users, tasks=args.tasks, chats=args.chats,
+                      messages_per_chat=args.messages, seed=args.seed)
+    print(f"{args.db}: " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+    return 0
+
+
+def _run(args):
+    import logging
+
+    from app.benchmarks.runner import run
+
+    # httpx logs every request at INFO and app.main's basicConfig shows INFO;
+    # formatting and printing those lines would be part of what is measured
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run(requests=args.requests, concurrency=args.concurrency,
+                              warmup=args.warmup, only=args.only, seed=args.seed))
+
+    print(f"{'endpoint':32} {'p50':>8} {'p90':>8} {'p99':>8} {'req/s':>8} {'queries':>8} {'errors':>6}")
+    for name, result in results["endpoints"].items():
+        print(f"{name:32} {result['p50_ms']:8.2f} {result['p90_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['throughput_rps']:8.1f} {result['queries_per_request']:8.1f} {result['errors']:6}")
+    failures = [result["budget_failure"] for result in results["endpoints"].values() if result["over_budget"]]
+    for failure in failures:
+        print(f"Over query budget: {failure}")
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"Saved {args.out}")
+    return 1 if failures or any(result["errors"] for result in results["endpoints"].values()) else 0
+
+
+def _compare(args):
+    from app.benchmarks.runner import compare
+
+    with open(args.baseline) as baseline, open(args.candidate) as candidate:
+        rows = compare(json.load(baseline), json.load(candidate))
+
+    regressions = 0
+    print(f"{'endpoint':32} {'metric':20} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for name, metric, old, new, change in rows:
+        shown = "" if change is None else f"{change:+.1f}%"
+        print(f"{name:32} {metric:20} {old:10} {new:10} {shown:>8}")
+        if metric == "p50_ms" and change is not None and args.fail_over is not None and change > args.fail_over:
+            regressions += 1
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="create a SQLite database of synthetic data")
+    generate.add_argument("--db", default=DEFAULT_DB)
+    generate.add_argument("--users", type=int, default=200)
+    generate.add_argument("--tasks", type=int, default=20000)
+    generate.add_argument("--chats", type=int, default=150)
+    generate.add_argument("--messages", type=int, default=40, help="typical messages per chat")
+    generate.add_argument("--seed", type=int, default=42)
+
+    run = commands.add_parser("run", help="benchmark every endpoint scenario")
+    run.add_argument("--db", default=DEFAULT_DB)
+    run.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--warmup", type=int, default=10)
+    run.add_argument("--only", nargs="*", help="scenario names (substrings) to run")
+    run.add_argument("--llm-latency", type=float, default=None, help="seconds per fake LLM call")
+    run.add_argument("--email-latency", type=float, default=None, help="seconds per fake email send")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out", default=None, help="write the results as JSON")
+
+    compare = commands.add_parser("compare", help="compare two saved runs")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--fail-over", type=float, default=None, help="allowed p50 slowdown, percent")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _compare(args)
+    _configure(args)
+    return _generate(args) if args.command == "generate" else _run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Drive the app in-process and measure each endpoint: latency percentiles, throughput, SQL queries."""
+import asyncio
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+PERCENTILES = (50, 90, 95, 99)
+# Logins per role; requests rotate over these accounts
+BENCH_ACCOUNTS = 20
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str          # formatted per request: {chat_id}, {word}, {task_id}
+    role: str          # admin / member
+    max_queries: int   # SQL statements one request may run (see assert_query_budget)
+    body: dict = None
+    revalidate: bool = False  # send each account's last ETag in If-None-Match, like a polling client
+
+
+SCENARIOS = [
+    Scenario("tasks.list (admin)", "GET", "/tasks/?page_size=50", "admin", 3),
+    Scenario("tasks.list (admin, filtered)", "GET", "/tasks/?completed=false&priority=1&page_size=50", "admin", 3),
+    Scenario("tasks.list (member)", "GET", "/tasks/?page_size=50", "member", 3),
+    Scenario("tasks.list (member, polling)", "GET", "/tasks/?page_size=50", "member", 3, revalidate=True),
+    Scenario("tasks.list (smart)", "GET", "/tasks/?sort_by=smart&page_size=50", "admin", 4),
+    Scenario("tasks.summary (admin)", "GET", "/tasks/summary", "admin", 3),
+    Scenario("tasks.summary (member)", "GET", "/tasks/summary", "member", 3),
+    Scenario("tasks.summary (member, polling)", "GET", "/tasks/summary", "member", 3, revalidate=True),
+    Scenario("tasks.create", "POST", "/tasks/", "admin", 6,
+             {"title": "bench {word}", "description": "created by the benchmark", "priority": 3}),
+    Scenario("chats.unread (admin)", "GET", "/chats/admin/unread", "admin", 2),
+    Scenario("chats.all (admin)", "GET", "/chats/admin/all", "admin", 3),
+    Scenario("chats.messages", "GET", "/chats/admin/{chat_id}/messages", "admin", 3),
+    Scenario("chats.own (member)", "GET", "/chats/admin", "member", 4),
+    Scenario("chats.own (member, polling)", "GET", "/chats/admin", "member", 4, revalidate=True),
+    Scenario("chats.send (member)", "POST", "/chats/admin/message", "member", 8, {"content": "bench {word} {word}"}),
+    Scenario("search", "GET", "/search/?q={word}", "member", 10),
+    Scenario("assistant.generate", "POST", "/generate", "member", 0,
+             {"session_id": "bench-{task_id}", "prompt": "How do I plan my {word}?"}),
+]
+
+
+def percentile(sorted_values, pct: float):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _fill(template, values):
+    if isinstance(template, str):
+        return template.format(**values)
+    if isinstance(template, dict):
+        return {key: _fill(value, values) for key, value in template.items()}
+    return template
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def _login(client, username: str, password: str):
+    response = await client.post("/users/token", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _load_context():
+    from app.database import SessionLocal
+    from app.models import Chat, Role, Task, User
+
+    db = SessionLocal()
+    try:
+        admins = db.execute(select(User.username).where(User.role == Role.admin).limit(BENCH_ACCOUNTS)).scalars().all()
+        # Members with a chat, so the chat scenarios have something to read
+        members = db.execute(
+            select(User.username).join(Chat, Chat.user_id == User.id).where(User.role == Role.user).limit(BENCH_ACCOUNTS)
+        ).scalars().all()
+        chat_ids = db.execute(select(Chat.id).where(Chat.is_admin_chat == True)).scalars().all()
+        task_ids = db.execute(select(Task.id).limit(10000)).scalars().all()
+    finally:
+        db.close()
+    if not admins or not members or not chat_ids or not task_ids:
+        raise RuntimeError("The database has no benchmark data; run `python -m app.benchmarks generate` first")
+    return admins, members, chat_ids, task_ids
+
+
+async def _measure(client, scenario: Scenario, headers, values, requests: int, concurrency: int, warmup: int):
+    from app.utils.request_metrics import QueryBudgetExceeded, assert_query_budget
+
+    latencies, queries, errors, over_budget = [], [], 0, []
+    not_modified = 0
+    etags = {}  # account -> ETag of its last response (revalidating scenarios)
+
+    async def one(i: int, record: bool):
+        nonlocal errors, not_modified
+        request_values = {key: pick(i) for key, pick in values.items()}
+        account = i % len(headers[scenario.role])
+        request_headers = headers[scenario.role][account]
+        if scenario.revalidate and account in etags:
+            request_headers = {**request_headers, "If-None-Match": etags[account]}
+        started = time.perf_counter()
+        response = await client.request(
+            scenario.method, _fill(scenario.path, request_values),
+            headers=request_headers,
+            json=_fill(scenario.body, request_values),
+        )
+        elapsed = time.perf_counter() - started
+        if scenario.revalidate and "etag" in response.headers:
+            etags[account] = response.headers["etag"]
+        if record:
+            latencies.append(elapsed)
+            # Counted by the app's metrics middleware (SQL_DEBUG_HEADERS=1)
+            queries.append(int(response.headers.get("x-db-queries", 0)))
+            errors += response.status_code >= 400
+            not_modified += response.status_code == 304
+            try:
+                assert_query_budget(response, scenario.max_queries)
+            except QueryBudgetExceeded as e:
+                over_budget.append(str(e))
+
+    for i in range(warmup):
+        await one(i, record=False)
+
+    pending = iter(range(requests))
+
+    async def worker():
+        for i in pending:
+            await one(i, record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 2) if wall else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+        "query_budget": scenario.max_queries,
+        "not_modified": not_modified,
+        "over_budget": len(over_budget),
+        "budget_failure": over_budget[0] if over_budget else None,
+    }
+    for pct in PERCENTILES:
+        result[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 3)
+    return result
+
+
+async def run(requests: int = 200, concurrency: int = 8, warmup: int = 10, only=None, seed: int = 42):
+    """Run every scenario (or those whose name contains one of `only`) and return the results."""
+    import httpx
+
+    # Here rather than at the top, so compare() works without the app's settings
+    from app.benchmarks.synthetic import BENCH_PASSWORD, WORDS
+    from app.main import app
+
+    admins, members, chat_ids, task_ids = _load_context()
+    values = {
+        "word": lambda i: WORDS[(i * 7 + seed) % len(WORDS)],
+        "chat_id": lambda i: chat_ids[(i * 31 + seed) % len(chat_ids)],
+        "task_id": lambda i: task_ids[(i * 101 + seed) % len(task_ids)],
+    }
+    scenarios = [s for s in SCENARIOS if not only or any(name in s.name for name in only)]
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            headers = {
+                "admin": [await _login(client, name, BENCH_PASSWORD) for name in admins],
+                "member": [await _login(client, name, BENCH_PASSWORD) for name in members],
+            }
+            for scenario in scenarios:
+                results[scenario.name] = await _measure(
+                    client, scenario, headers, values, requests, concurrency, warmup
+                )
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": os.getenv("DATABASE_URL"),
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed,
+            "llm_fake_latency": float(os.getenv("LLM_FAKE_LATENCY", "0.05")),
+            "email_fake_latency": float(os.getenv("EMAIL_FAKE_LATENCY", "0")),
+        },
+        "endpoints": results,
+    }
+
+
+def compare(baseline: dict, candidate: dict):
+    """[(endpoint, metric, baseline, candidate, change %)] for the endpoints both runs measured."""
+    rows = []
+    for name, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(name)
+        if after is None:
+            continue
+        for metric in ("p50_ms", "p99_ms", "throughput_rps", "queries_per_request"):
+            old, new = before.get(metric), after.get(metric)
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,112 @@
+"""Synthetic users, tasks and admin chats for benchmarks, seeded so runs are reproducible."""
+import math
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import migrations
+from app.models import Chat, ChatMessage, ChatUnreadCounter, Role, Task, User
+from app.utils.password_hasher import make_context
+from app.utils.search_index import rebuild
+
+BENCH_PASSWORD = "bench-password"
+INSERT_CHUNK_SIZE = 5000
+# One admin per this many users, at least one
+USERS_PER_ADMIN = 50
+
+WORDS = (
+    "report review deploy invoice budget meeting design client release backlog sprint "
+    "audit roadmap onboarding migration dashboard contract survey payroll hiring launch "
+    "feedback training security incident forecast newsletter vendor inventory support "
+    "database api mobile website schedule quarterly weekly urgent draft final update"
+).split()
+
+
+def _sentence(rng: random.Random, low: int, high: int):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _insert(connection, model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        connection.execute(insert(model), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def generate(engine, users: int = 200, tasks: int = 20000, chats: int = 150,
+             messages_per_chat: int = 40, seed: int = 42, now: datetime = None):
+    """Fill an empty database; returns the row counts.
+
+    Chat lengths are log-normal around messages_per_chat (a few very long
+    conversations, many short ones) and the newest messages of a chat are
+    unread. Every user's password is BENCH_PASSWORD.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+    migrations.upgrade(engine)
+
+    admins = max(users // USERS_PER_ADMIN, 1)
+    # bcrypt once: every account shares the hash
+    hashed = make_context().hash(BENCH_PASSWORD)
+    user_rows = [
+        {
+            "id": i + 1,
+            "username": f"admin{i}" if i < admins else f"user{i - admins}",
+            "email": f"admin{i}@bench.local" if i < admins else f"user{i - admins}@bench.local",
+            "hashed_password": hashed,
+            "role": Role.admin if i < admins else Role.user,
+        }
+        for i in range(admins + users)
+    ]
+    admin_ids = [row["id"] for row in user_rows[:admins]]
+    member_ids = [row["id"] for row in user_rows[admins:]]
+
+    task_rows = []
+    for i in range(tasks):
+        due = None if rng.random() < 0.2 else now + timedelta(hours=rng.randint(-30 * 24, 60 * 24))
+        task_rows.append({
+            "id": i + 1,
+            "title": _sentence(rng, 2, 5)[:100],
+            "description": _sentence(rng, 5, 20)[:255] if rng.random() < 0.7 else None,
+            "completed": rng.random() < 0.3,
+            "owner_id": rng.choice(admin_ids),
+            "due_date": due,
+            "priority": rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 4, 2, 1])[0],
+            "assigned_to_id": rng.choice(member_ids) if member_ids and rng.random() < 0.8 else None,
+        })
+
+    chat_rows, message_rows, counter_rows = [], [], []
+    message_id = 0
+    for chat_id, user_id in enumerate(rng.sample(member_ids, min(chats, len(member_ids))), start=1):
+        started = now - timedelta(days=rng.randint(1, 90))
+        chat_rows.append({"id": chat_id, "title": "Admin Support", "user_id": user_id,
+                          "created_at": started, "is_admin_chat": True})
+        length = max(1, int(rng.lognormvariate(math.log(messages_per_chat), 0.8)))
+        unread_tail = rng.randint(0, min(length, 5))
+        sent_at = started
+        unread = {True: 0, False: 0}
+        for position in range(length):
+            message_id += 1
+            is_admin = rng.random() < 0.4
+            is_read = position < length - unread_tail
+            sent_at += timedelta(minutes=rng.randint(1, 240))
+            message_rows.append({
+                "id": message_id, "chat_id": chat_id,
+                "sender_id": rng.choice(admin_ids) if is_admin else user_id,
+                "content": _sentence(rng, 3, 30), "created_at": sent_at,
+                "is_admin": is_admin, "is_read": is_read,
+            })
+            if not is_read:
+                unread[is_admin] += 1
+        counter_rows.append({"chat_id": chat_id, "admin_unread": unread[False], "user_unread": unread[True],
+                             "last_activity": sent_at})
+
+    with engine.begin() as connection:
+        _insert(connection, User, user_rows)
+        _insert(connection, Task, task_rows)
+        _insert(connection, Chat, chat_rows)
+        _insert(connection, ChatMessage, message_rows)
+        _insert(connection, ChatUnreadCounter, counter_rows)
+        rebuild(connection)
+
+    return {"admins": admins, "users": users, "tasks": len(task_rows),
+            "chats": len(chat_rows), "messages": len(message_rows)}
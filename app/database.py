@@ -1,22 +1,190 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "mssql+pyodbc://sa:sa@IN-JNDLV64/Task?driver=ODBC+Driver+17+for+SQL+Server")
 
-engine = create_engine(DATABASE_URL, echo=True) 
+# Request handlers use the async engine; background workers keep the sync one
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mssql+pyodbc": "mssql+aioodbc",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _async_url(url: str):
+    scheme, _, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
+# Engine profile, all overridable from the environment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_ECHO = os.getenv("DB_ECHO", "0").lower()  # 0 / 1 / debug
+DB_SQLITE_WAL = os.getenv("DB_SQLITE_WAL", "1") == "1"
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class _MeteredPool:
+    """Pool mixin that records how long each checkout waited for a connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def _engine_options(url: str, poolclass=MeteredQueuePool):
+    options = {
+        "echo": {"1": True, "true": True, "debug": "debug"}.get(DB_ECHO, False),
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("sqlite"):
+        # Local and benchmark runs: share the file between request threads
+        if "aiosqlite" not in url:
+            options["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/") == "sqlite:":
+            return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if url.startswith(("mssql+pyodbc", "mssql+aioodbc")):
+        # Send executemany() batches in one round-trip instead of one per row
+        options["fast_executemany"] = True
+    return options
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, poolclass=MeteredAsyncQueuePool)
+)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not DB_SQLITE_WAL:
+        return
+    # Readers no longer block on the writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", _sqlite_pragmas)
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes stay readable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-# Dependency to get DB session
+
+@compiles(UnaryExpression, "mssql")
+def _mssql_nulls_order(element, compiler, **kw):
+    """SQL Server has no NULLS FIRST / NULLS LAST, but sorts NULLs lowest:
+    ASC NULLS FIRST and DESC NULLS LAST are its default order."""
+    if element.modifier not in (operators.nulls_first_op, operators.nulls_last_op):
+        return compiler.visit_unary(element, **kw)
+    descending = getattr(element.element, "modifier", None) is operators.desc_op
+    if (element.modifier is operators.nulls_last_op) != descending:
+        raise CompileError("SQL Server only sorts NULLs lowest (ASC NULLS FIRST / DESC NULLS LAST)")
+    return compiler.process(element.element, **kw)
+
+
+def _pool_stats(pool):
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    stats = {
+        "checkouts": metrics.checkouts,
+        "checkout_timeouts": metrics.timeouts,
+        "checkout_wait_seconds_total": round(metrics.wait_seconds, 6),
+        "checkout_wait_seconds_max": round(metrics.max_wait_seconds, 6),
+    }
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(DB_MAX_OVERFLOW, 0)
+        stats.update(
+            pool_size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            utilization=pool.checkedout() / capacity if capacity else 0.0,
+        )
+    return stats
+
+
+def get_pool_stats():
+    """Pool utilization and checkout wait times for the metrics endpoint."""
+    return {
+        "async": _pool_stats(async_engine.pool),
+        "sync": _pool_stats(engine.pool),
+    }
+
+# Dependency to get DB session (sync; background workers and scripts)
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session (request handlers)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
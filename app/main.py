@@ -1,24 +1,98 @@
-from fastapi import FastAPI
-from app.database import Base, engine
-from app.routes import users, tasks, chats
-import logging
 from dotenv import load_dotenv
-from fastapi.middleware.cors import CORSMiddleware
-import os
+load_dotenv()
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from dotenv import load_dotenv
-from groq import Groq
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-app = FastAPI(title="Task Management API")
+from app.database import get_pool_stats, engine, async_engine
+from app import migrations
+from app.migrations import DB_AUTO_MIGRATE, DB_SCHEMA_CHECK
+from app.routes import users, tasks, chats, search
+from app.utils.outbox import OutboxWorker
+from app.utils.chat_hub import chat_hub
+from app.utils.reminders import reminder_scheduler, REMINDERS_ENABLED
+from app.utils.conversation_store import ConversationStore
+from app.utils.llm_client import LLMClient, LLMOverloaded
+from app.utils.response_cache import ResponseCache, ASSISTANT_CACHE_WARM_QUESTIONS
+from app.utils.password_hasher import password_hasher
+from app.utils.request_metrics import MetricsMiddleware, request_metrics, time_queries
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Async Groq client with a shared connection pool and a concurrency cap (LLM_* settings).
+# Nothing is connected until the first request uses it.
+llm_client = LLMClient()
+
+# Email outbox worker: handlers only enqueue rows, this pool delivers them
+outbox_worker = OutboxWorker()
+
+
+def _check_schema():
+    # Schema changes go through versioned migrations (python -m app.migrations)
+    if DB_AUTO_MIGRATE:
+        applied = migrations.upgrade()
+        if applied:
+            logger.info(f"Applied migrations {', '.join(applied)}")
+    else:
+        waiting = migrations.pending()
+        if waiting:
+            logger.warning(f"Database schema is behind: {len(waiting)} pending migration(s)")
+
+
+# Importing this module only defines objects; anything that touches the
+# database, the network or other threads/processes starts here, once per worker.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timings = {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        fn()
+        timings[name] = round(time.perf_counter() - started, 4)
+
+    if DB_SCHEMA_CHECK:
+        step("schema", _check_schema)
+    if outbox_worker.workers > 0:
+        step("outbox_worker", outbox_worker.start)
+    # Chat hub: pushes chat events to /chats/ws subscribers
+    step("chat_hub", chat_hub.start)
+    # Due-date reminders, queued on the email outbox
+    if REMINDERS_ENABLED:
+        step("reminder_scheduler", reminder_scheduler.start)
+    app.state.startup_timings = timings
+
+    # In the background so startup does not wait on the LLM
+    warmup = None
+    if response_cache.enabled and ASSISTANT_CACHE_WARM_QUESTIONS:
+        warmup = asyncio.create_task(_warm_response_cache())
+
+    yield
+
+    if warmup is not None:
+        warmup.cancel()
+    outbox_worker.stop()
+    reminder_scheduler.stop()
+    chat_hub.stop()
+    await llm_client.aclose()
+    password_hasher.shutdown()
+
+
+app = FastAPI(title="Task Management API", lifespan=lifespan)
 
 
-conversation_history = {}
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
 class PromptRequest(BaseModel):
     session_id: str 
     prompt: str
-    model: str = "llama-3.3-70b-versatile"  
+    model: str = DEFAULT_MODEL
 SYSTEM_INSTRUCTION = {
     "role": "system",
     "content": (
@@ -58,26 +132,106 @@ SYSTEM_INSTRUCTION = {
     )
 }
 
+# Bounded per-session chat history (LRU/TTL, trimmed to a token budget)
+conversation_history = ConversationStore(system_message=SYSTEM_INSTRUCTION)
+
+# First-turn answers to repeated questions (ASSISTANT_CACHE_SIZE=0 disables it)
+response_cache = ResponseCache()
+
 @app.post("/generate")
-def generate_text(request: PromptRequest):
+async def generate_text(request: PromptRequest):
     
     try:
-        if request.session_id not in conversation_history:
-            conversation_history[request.session_id] = [SYSTEM_INSTRUCTION]
+        user_message = {"role": "user", "content": request.prompt}
 
-        conversation_history[request.session_id].append({"role": "user", "content": request.prompt})
-        
-        response = client.chat.completions.create(
-            messages=conversation_history[request.session_id],
-            model=request.model,
+        # Only a first turn has no history that could change the answer
+        first_turn = request.session_id not in conversation_history
+        assistant_message = response_cache.get(request.model, request.prompt) if first_turn else None
+        if assistant_message is None:
+            assistant_message = await llm_client.complete(
+                conversation_history.messages(request.session_id, pending=user_message),
+                request.model,
+            )
+            if first_turn:
+                response_cache.put(request.model, request.prompt, assistant_message)
+        conversation_history.append(
+            request.session_id, user_message, {"role": "assistant", "content": assistant_message}
         )
-        assistant_message = response.choices[0].message.content
-        conversation_history[request.session_id].append({"role": "assistant", "content": assistant_message})
         
         return {"response": assistant_message}
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The assistant took too long to answer")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(data: dict, event: str = None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+# Same as /generate, but forwards tokens as server-sent events while Groq
+# produces them. The turn is stored only once the stream has completed, so a
+# client that disconnects midway leaves the session history untouched.
+@app.post("/generate/stream")
+async def generate_text_stream(request: PromptRequest):
+    user_message = {"role": "user", "content": request.prompt}
+    messages = conversation_history.messages(request.session_id, pending=user_message)
+    first_turn = len(messages) == 2
+    cached = response_cache.get(request.model, request.prompt) if first_turn else None
+
+    async def cached_events():
+        conversation_history.append(
+            request.session_id, user_message, {"role": "assistant", "content": cached}
+        )
+        yield _sse({"token": cached})
+        yield _sse({"response": cached}, event="done")
+
+    async def events():
+        # A client disconnect cancels this generator; closing `tokens` then
+        # closes the upstream stream and frees the concurrency slot.
+        tokens = llm_client.stream(messages, request.model)
+        try:
+            parts = []
+            async for token in tokens:
+                parts.append(token)
+                yield _sse({"token": token})
+            assistant_message = "".join(parts)
+            if first_turn:
+                response_cache.put(request.model, request.prompt, assistant_message)
+            conversation_history.append(
+                request.session_id, user_message, {"role": "assistant", "content": assistant_message}
+            )
+            yield _sse({"response": assistant_message}, event="done")
+        except LLMOverloaded as e:
+            yield _sse({"detail": str(e), "retry": True}, event="error")
+        except asyncio.TimeoutError:
+            yield _sse({"detail": "The assistant took too long to answer"}, event="error")
+        except Exception as e:
+            yield _sse({"detail": str(e)}, event="error")
+        finally:
+            await tokens.aclose()
+
+    return StreamingResponse(
+        cached_events() if cached is not None else events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/generate/cache")
+def get_response_cache_stats():
+    return response_cache.stats()
+
+async def _warm_response_cache():
+    for question in ASSISTANT_CACHE_WARM_QUESTIONS:
+        try:
+            answer = await llm_client.complete(
+                [SYSTEM_INSTRUCTION, {"role": "user", "content": question}], DEFAULT_MODEL
+            )
+            response_cache.put(DEFAULT_MODEL, question, answer)
+        except Exception as e:
+            logger.warning(f"Could not pre-warm answer for '{question}': {e}")
+
 origins = [
     "http://localhost:5173",
     "localhost:5173"
@@ -89,33 +243,36 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    # Readable from the frontend's origin: keyset paging and conditional GETs
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+# Per-route latency/status/SQL-time histograms on /metrics; ACCESS_LOG_SAMPLE_RATE
+# turns on access log lines for a fraction of requests.
+time_queries(engine, async_engine.sync_engine)
+app.add_middleware(MetricsMiddleware)
 
-load_dotenv()
-from app.database import Base, engine
-
-print("Creating tables in SQL Server........")
-Base.metadata.create_all(bind=engine)
-print("created tables!........")
-
+app.include_router(users.router, prefix="/users", tags=["Users"])
+app.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
+app.include_router(chats.router, prefix="/chats", tags=["Chats"])
+app.include_router(search.router, prefix="/search", tags=["Search"])
+@app.get("/metrics", tags=["root"], response_class=PlainTextResponse)
+def metrics():
+    return request_metrics.render()
 
+@app.get("/metrics/db", tags=["root"])
+def database_metrics():
+    return get_pool_stats()
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
+@app.get("/metrics/reminders", tags=["root"])
+def reminder_metrics():
+    return reminder_scheduler.stats()
 
-@app.middleware("http")
-async def log_requests(request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url}")
-    response = await call_next(request)
-    logger.info(f" Response status: {response.status_code}")
-    return response
+@app.get("/metrics/startup", tags=["root"])
+def startup_metrics():
+    return getattr(app.state, "startup_timings", {})
 
-print("working fine.......................................")
-app.include_router(users.router, prefix="/users", tags=["Users"])
-app.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
-app.include_router(chats.router, prefix="/chats", tags=["Chats"])
 @app.get("/",tags=["root"])
 def home():
     return {"message": "Welcome to the Task Management API!"}
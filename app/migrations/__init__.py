@@ -0,0 +1,145 @@
+import importlib
+import os
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import Base, engine as default_engine
+
+# Apply pending migrations when the app starts. Turn off where deploys run
+# `python -m app.migrations upgrade` as a separate step.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
+# DB_SCHEMA_CHECK=0 skips the startup schema step entirely, so a worker starts
+# without a database round-trip (set it on every worker but one).
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "1") == "1"
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(64), primary_key=True),
+    Column("description", String(255), nullable=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration:
+    """One module in app/migrations/versions, named <version>_<slug>.py.
+
+    The module defines upgrade(connection) and optionally downgrade(connection);
+    its docstring is the description recorded in schema_migrations.
+    """
+
+    def __init__(self, module_name: str):
+        self.version, _, self.slug = module_name.partition("_")
+        self.module = importlib.import_module(f"{__name__}.versions.{module_name}")
+        self.description = (self.module.__doc__ or self.slug).strip().splitlines()[0]
+
+    def upgrade(self, connection):
+        self.module.upgrade(connection)
+
+    def downgrade(self, connection):
+        if not hasattr(self.module, "downgrade"):
+            raise RuntimeError(f"Migration {self.version} cannot be reverted")
+        self.module.downgrade(connection)
+
+    def __repr__(self):
+        return f"<Migration({self.version}, {self.slug})>"
+
+
+def discover():
+    from app.migrations import versions
+
+    names = [info.name for info in pkgutil.iter_modules(versions.__path__) if info.name[:1].isdigit()]
+    return [Migration(name) for name in sorted(names)]
+
+
+def applied_versions(connection):
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(engine=default_engine):
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+def upgrade(engine=default_engine, target: str = None):
+    """Apply pending migrations up to target (default: all). Returns the versions applied.
+
+    Each migration runs in its own transaction together with its
+    schema_migrations row. That row is inserted first, so a second process
+    upgrading at the same time blocks on it and then skips the migration.
+    """
+    with engine.begin() as connection:
+        _metadata.create_all(connection)
+
+    applied = []
+    for migration in pending(engine):
+        if target is not None and migration.version > target:
+            break
+        try:
+            with engine.begin() as connection:
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description[:255],
+                    applied_at=datetime.utcnow(),
+                ))
+                migration.upgrade(connection)
+        except IntegrityError:
+            # Applied by another process in the meantime
+            continue
+        applied.append(migration.version)
+    return applied
+
+
+def downgrade(engine=default_engine, target: str = None):
+    """Revert applied migrations newer than target (default: only the latest one)."""
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    migrations = [migration for migration in reversed(discover()) if migration.version in applied]
+    if target is None:
+        migrations = migrations[:1]
+
+    reverted = []
+    for migration in migrations:
+        if target is not None and migration.version <= target:
+            break
+        with engine.begin() as connection:
+            migration.downgrade(connection)
+            connection.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.version))
+        reverted.append(migration.version)
+    return reverted
+
+
+def schema_drift(engine=default_engine):
+    """Model tables, columns and indexes the database lacks after upgrading: schema changes shipped without a migration."""
+    import app.models  # noqa: F401  (registers the tables on Base.metadata)
+
+    missing = []
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                missing.append(f"table {table.name}")
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            missing.extend(f"column {table.name}.{column.name}" for column in table.columns if column.name not in columns)
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            missing.extend(f"index {index.name}" for index in table.indexes if index.name not in indexes)
+    return missing
+
+
+# Helpers for migrations that must be safe to re-run. 0001 builds the current
+# models on an empty database, so later migrations find their changes already
+# there and have to check before altering anything.
+def has_column(connection, table_name: str, column_name: str):
+    return column_name in {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def has_index(connection, table_name: str, index_name: str):
+    return index_name in {index["name"] for index in inspect(connection).get_indexes(table_name)}
@@ -0,0 +1,52 @@
+"""Schema tooling.
+
+    python -m app.migrations upgrade [--to VERSION]
+    python -m app.migrations downgrade [--to VERSION]
+    python -m app.migrations status
+    python -m app.migrations check      # fail if the models have tables/columns/indexes no migration created
+    python -m app.migrations plans      # EXPLAIN the hot queries, fail if one skips its index
+"""
+import argparse
+import sys
+
+from app import migrations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("command", choices=["upgrade", "downgrade", "status", "check", "plans"])
+    parser.add_argument("--to", dest="target", default=None, help="target version")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = migrations.upgrade(target=args.target)
+        print(f"Applied {', '.join(applied)}" if applied else "Schema is up to date")
+    elif args.command == "downgrade":
+        reverted = migrations.downgrade(target=args.target)
+        print(f"Reverted {', '.join(reverted)}" if reverted else "Nothing to revert")
+    elif args.command == "status":
+        waiting = {migration.version for migration in migrations.pending()}
+        for migration in migrations.discover():
+            state = "pending" if migration.version in waiting else "applied"
+            print(f"{migration.version}  {state:8}  {migration.description}")
+    elif args.command == "check":
+        missing = migrations.schema_drift()
+        for item in missing:
+            print(f"No migration creates {item}")
+        print("Schema matches the models" if not missing else f"{len(missing)} model change(s) without a migration")
+        return 1 if missing else 0
+    else:
+        from app.utils.query_plans import check_plans
+
+        failures = 0
+        for name, uses_index, lines in check_plans():
+            failures += not uses_index
+            print(f"[{'ok' if uses_index else 'NO INDEX'}] {name}")
+            for line in lines:
+                print(f"    {line}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
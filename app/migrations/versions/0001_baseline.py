@@ -0,0 +1,87 @@
+"""Baseline: the tables Base.metadata.create_all used to build at import."""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+)
+
+# Frozen copy of the schema when migrations were introduced. Later changes go in
+# their own migrations; the composite indexes on tasks/chats/chat_messages are 0003's.
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(100), unique=True, index=True, nullable=False),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("role", Enum("user", "admin", name="role"), nullable=False, server_default="user"),
+)
+
+Table(
+    "tasks", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(100), index=True, nullable=False),
+    Column("description", String(255), nullable=True),
+    Column("completed", Boolean, nullable=False),
+    Column("owner_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("due_date", DateTime, nullable=True),
+    Column("priority", Integer, nullable=False, server_default="3"),
+    Column("assigned_to_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+
+Table(
+    "chats", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("created_at", DateTime),
+    Column("is_admin_chat", Boolean),
+    Column("admin_last_read_id", Integer, nullable=True),
+    Column("user_last_read_id", Integer, nullable=True),
+)
+
+Table(
+    "chat_messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("chat_id", Integer, ForeignKey("chats.id", ondelete="CASCADE")),
+    Column("sender_id", Integer, ForeignKey("users.id")),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime),
+    Column("is_admin", Boolean),
+    Column("is_read", Boolean),
+)
+
+Table(
+    "admin_status", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("is_online", Boolean, nullable=False),
+    Column("last_seen", DateTime, nullable=False),
+)
+
+Table(
+    "chat_unread_counters", metadata,
+    Column("chat_id", Integer, ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True),
+    Column("admin_unread", Integer, nullable=False, index=True),
+    Column("user_unread", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "email_outbox", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("to_email", String(255), nullable=False),
+    Column("subject", String(255), nullable=False),
+    Column("body", Text, nullable=False),
+    Column("status", String(20), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime, nullable=False),
+    Column("claim_token", String(36), nullable=True),
+    Column("last_error", String(500), nullable=True),
+    Column("created_at", DateTime),
+    Column("sent_at", DateTime, nullable=True),
+    Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+)
+
+
+def upgrade(connection):
+    # checkfirst: databases created before migrations already have these
+    metadata.create_all(connection)
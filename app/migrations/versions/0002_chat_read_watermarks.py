@@ -0,0 +1,18 @@
+"""Add the chats read watermark columns create_all never added to existing tables."""
+from sqlalchemy import text
+
+from app.migrations import has_column
+
+COLUMNS = ["admin_last_read_id", "user_last_read_id"]
+
+
+def upgrade(connection):
+    for name in COLUMNS:
+        if not has_column(connection, "chats", name):
+            connection.execute(text(f"ALTER TABLE chats ADD {name} INTEGER NULL"))
+
+
+def downgrade(connection):
+    for name in COLUMNS:
+        if has_column(connection, "chats", name):
+            connection.execute(text(f"ALTER TABLE chats DROP COLUMN {name}"))
@@ -0,0 +1,46 @@
+"""Composite indexes for the task list/summary and chat message queries."""
+from sqlalchemy import Index, MetaData, Table
+
+from app.migrations import has_index
+
+# table -> [(index name, key columns, INCLUDE columns on SQL Server / PostgreSQL)]
+INDEXES = {
+    "tasks": [
+        ("ix_tasks_owner_due", ["owner_id", "due_date", "id"], ["completed", "priority"]),
+        ("ix_tasks_assignee_due", ["assigned_to_id", "due_date", "id"], ["completed", "priority"]),
+        ("ix_tasks_status_due", ["completed", "priority", "due_date", "id"], []),
+        ("ix_tasks_due", ["due_date", "id"], []),
+    ],
+    "chats": [
+        ("ix_chats_user_admin", ["user_id", "is_admin_chat"], []),
+    ],
+    "chat_messages": [
+        ("ix_chat_messages_chat_created", ["chat_id", "created_at", "id"], ["is_admin", "is_read"]),
+        ("ix_chat_messages_chat_unread", ["chat_id", "is_admin", "is_read", "id"], []),
+    ],
+}
+
+
+def _indexes(connection, table_name):
+    table = Table(table_name, MetaData(), autoload_with=connection)
+    for name, columns, include in INDEXES[table_name]:
+        yield name, Index(
+            name,
+            *[table.c[column] for column in columns],
+            mssql_include=include,
+            postgresql_include=include,
+        )
+
+
+def upgrade(connection):
+    for table_name in INDEXES:
+        for name, index in _indexes(connection, table_name):
+            if not has_index(connection, table_name, name):
+                index.create(connection)
+
+
+def downgrade(connection):
+    for table_name in INDEXES:
+        for name, index in _indexes(connection, table_name):
+            if has_index(connection, table_name, name):
+                index.drop(connection)
@@ -0,0 +1,62 @@
+"""Add the search_terms inverted index and fill it from existing tasks and messages."""
+import re
+from collections import Counter
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, column, insert, inspect, select, table
+
+# Frozen copies of the table and of the tokenizer as they were when this
+# migration was written; later changes to app.utils.search_index do not apply here.
+metadata = MetaData()
+search_terms = Table(
+    "search_terms", metadata,
+    Column("term", String(64), primary_key=True),
+    Column("doc_type", String(16), primary_key=True),
+    Column("doc_id", Integer, primary_key=True),
+    Column("weight", Integer, nullable=False),
+    Index("ix_search_terms_doc", "doc_type", "doc_id"),
+)
+tasks = table("tasks", column("id"), column("title"), column("description"))
+chat_messages = table("chat_messages", column("id"), column("content"))
+
+TITLE_WEIGHT = 3
+BODY_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+MAX_TERMS_PER_DOCUMENT = 256
+CHUNK_SIZE = 500
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _terms(*fields):
+    terms = Counter()
+    for text, weight in fields:
+        for word in _WORD.findall((text or "").lower()):
+            terms[word[:MAX_TERM_LENGTH]] += weight
+    return terms
+
+
+def _backfill(connection):
+    sources = [
+        ("task", select(tasks.c.id, tasks.c.title, tasks.c.description),
+         lambda row: _terms((row[1], TITLE_WEIGHT), (row[2], BODY_WEIGHT))),
+        ("message", select(chat_messages.c.id, chat_messages.c.content),
+         lambda row: _terms((row[1], BODY_WEIGHT))),
+    ]
+    for doc_type, query, terms_of in sources:
+        result = connection.execution_options(yield_per=CHUNK_SIZE).execute(query)
+        for chunk in result.partitions():
+            rows = [
+                {"term": term, "doc_type": doc_type, "doc_id": doc[0], "weight": weight}
+                for doc in chunk for term, weight in terms_of(doc).most_common(MAX_TERMS_PER_DOCUMENT)
+            ]
+            if rows:
+                connection.execute(insert(search_terms), rows)
+
+
+def upgrade(connection):
+    if not inspect(connection).has_table(search_terms.name):
+        search_terms.create(connection)
+        _backfill(connection)
+
+
+def downgrade(connection):
+    search_terms.drop(connection, checkfirst=True)
@@ -0,0 +1,21 @@
+"""Add scheduler_state, where the due-date reminder scheduler keeps its high-water mark."""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect
+
+# Frozen copy of the table as this migration created it
+metadata = MetaData()
+scheduler_state = Table(
+    "scheduler_state", metadata,
+    Column("name", String(64), primary_key=True),
+    Column("high_water_at", DateTime, nullable=False),
+    Column("high_water_id", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+
+def upgrade(connection):
+    if not inspect(connection).has_table(scheduler_state.name):
+        scheduler_state.create(connection)
+
+
+def downgrade(connection):
+    scheduler_state.drop(connection, checkfirst=True)
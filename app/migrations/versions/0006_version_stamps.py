@@ -0,0 +1,45 @@
+"""Add task_list_versions and chat_unread_counters.version, the stamps behind conditional GETs."""
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, inspect, text
+
+from app.migrations import has_column
+
+# Frozen copy of the table as this migration created it
+metadata = MetaData()
+task_list_versions = Table(
+    "task_list_versions", metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+# Named so SQL Server can drop it before the column
+VERSION_DEFAULT = "df_chat_unread_counters_version"
+
+
+def upgrade(connection):
+    if not inspect(connection).has_table(task_list_versions.name):
+        task_list_versions.create(connection)
+    if not has_column(connection, "chat_unread_counters", "version"):
+        connection.execute(text(
+            f"ALTER TABLE chat_unread_counters ADD version INTEGER NOT NULL CONSTRAINT {VERSION_DEFAULT} DEFAULT 0"
+        ))
+
+
+def _drop_version_default(connection):
+    # Looked up rather than assumed: databases upgraded before the constraint
+    # was named carry an auto-generated name
+    names = connection.execute(text(
+        "SELECT dc.name FROM sys.default_constraints dc "
+        "JOIN sys.columns c ON c.object_id = dc.parent_object_id AND c.column_id = dc.parent_column_id "
+        "WHERE dc.parent_object_id = OBJECT_ID('chat_unread_counters') AND c.name = 'version'"
+    )).scalars().all()
+    for name in names:
+        connection.execute(text(f"ALTER TABLE chat_unread_counters DROP CONSTRAINT [{name}]"))
+
+
+def downgrade(connection):
+    task_list_versions.drop(connection, checkfirst=True)
+    if has_column(connection, "chat_unread_counters", "version"):
+        if connection.dialect.name == "mssql":
+            _drop_version_default(connection)
+        connection.execute(text("ALTER TABLE chat_unread_counters DROP COLUMN version"))
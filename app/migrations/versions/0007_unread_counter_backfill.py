@@ -0,0 +1,23 @@
+"""Fill chat_unread_counters for the chats and messages that existed before the counters."""
+from sqlalchemy import and_, case, column, delete, func, insert, select, table
+
+# The tables as they were when this migration was written
+chats = table("chats", column("id"), column("is_admin_chat"))
+chat_messages = table("chat_messages", column("chat_id"), column("is_admin"), column("is_read"))
+chat_unread_counters = table("chat_unread_counters", column("chat_id"), column("admin_unread"), column("user_unread"))
+
+
+def _unread(from_admin: bool):
+    unread = and_(chat_messages.c.is_admin == from_admin, chat_messages.c.is_read == False)
+    return func.coalesce(func.sum(case((unread, 1), else_=0)), 0)
+
+
+def upgrade(connection):
+    counts = select(chats.c.id, _unread(False), _unread(True)).outerjoin(
+        chat_messages, chat_messages.c.chat_id == chats.c.id
+    ).where(chats.c.is_admin_chat == True).group_by(chats.c.id)
+
+    connection.execute(delete(chat_unread_counters))
+    connection.execute(insert(chat_unread_counters).from_select(
+        ["chat_id", "admin_unread", "user_unread"], counts
+    ))
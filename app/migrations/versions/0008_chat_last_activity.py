@@ -0,0 +1,39 @@
+"""Add chat_unread_counters.last_activity and its index, so the admin inbox pages without aggregating chat_messages."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table, column, func, select, table, text, update
+
+from app.migrations import has_column, has_index
+
+# The tables as they were when this migration was written
+chats = table("chats", column("id"), column("created_at"))
+chat_messages = table("chat_messages", column("chat_id"), column("created_at"))
+metadata = MetaData()
+chat_unread_counters = Table(
+    "chat_unread_counters", metadata,
+    Column("chat_id", Integer, primary_key=True),
+    Column("last_activity", DateTime),
+)
+INDEX = Index("ix_chat_unread_counters_activity", chat_unread_counters.c.last_activity, chat_unread_counters.c.chat_id)
+
+
+def _fill(connection):
+    # Newest message of the chat, else when the chat was created
+    newest = select(func.max(chat_messages.c.created_at)).where(chat_messages.c.chat_id == chats.c.id).scalar_subquery()
+    connection.execute(update(chat_unread_counters).values(last_activity=select(
+        func.coalesce(newest, chats.c.created_at)
+    ).where(chats.c.id == chat_unread_counters.c.chat_id).scalar_subquery()))
+
+
+def upgrade(connection):
+    if not has_column(connection, "chat_unread_counters", "last_activity"):
+        column_type = DateTime().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE chat_unread_counters ADD last_activity {column_type} NULL"))
+    _fill(connection)
+    if not has_index(connection, "chat_unread_counters", INDEX.name):
+        INDEX.create(connection)
+
+
+def downgrade(connection):
+    if has_index(connection, "chat_unread_counters", INDEX.name):
+        INDEX.drop(connection)
+    if has_column(connection, "chat_unread_counters", "last_activity"):
+        connection.execute(text("ALTER TABLE chat_unread_counters DROP COLUMN last_activity"))
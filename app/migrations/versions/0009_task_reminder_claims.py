@@ -0,0 +1,15 @@
+"""Add tasks.reminded_due, the per-task claim that keeps reminders to one email when several workers run the scheduler."""
+from sqlalchemy import DateTime, text
+
+from app.migrations import has_column
+
+
+def upgrade(connection):
+    if not has_column(connection, "tasks", "reminded_due"):
+        column_type = DateTime().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE tasks ADD reminded_due {column_type} NULL"))
+
+
+def downgrade(connection):
+    if has_column(connection, "tasks", "reminded_due"):
+        connection.execute(text("ALTER TABLE tasks DROP COLUMN reminded_due"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -39,9 +39,24 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     priority = Column(Integer, nullable=False, server_default="3") 
     assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Due date the last reminder went out for; claimed with a conditional UPDATE
+    # so only one worker's scheduler sends it
+    reminded_due = Column(DateTime, nullable=True)
 
     owner = relationship("User", foreign_keys=[owner_id], back_populates="tasks")
     assigned_to = relationship("User", foreign_keys=[assigned_to_id])  
+
+    # Matched to /tasks/ and /tasks/summary: users filter on owner OR assignee,
+    # admins on completed/priority, and everything is ordered by (due_date, id).
+    # INCLUDE makes the owner/assignee indexes cover the summary counters.
+    __table_args__ = (
+        Index("ix_tasks_owner_due", "owner_id", "due_date", "id",
+              mssql_include=["completed", "priority"], postgresql_include=["completed", "priority"]),
+        Index("ix_tasks_assignee_due", "assigned_to_id", "due_date", "id",
+              mssql_include=["completed", "priority"], postgresql_include=["completed", "priority"]),
+        Index("ix_tasks_status_due", "completed", "priority", "due_date", "id"),
+        Index("ix_tasks_due", "due_date", "id"),
+    )
     
 class Chat(Base):
     __tablename__ = "chats"
@@ -51,12 +66,19 @@ class Chat(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     created_at = Column(DateTime, default=datetime.utcnow)
     is_admin_chat = Column(Boolean, default=False)
+    # Read watermarks: highest message id each side has read
+    admin_last_read_id = Column(Integer, nullable=True)
+    user_last_read_id = Column(Integer, nullable=True)
 
     # Relationships
     messages = relationship("ChatMessage", back_populates="chat", 
                           cascade="all, delete-orphan")
     user = relationship("User", back_populates="chats")
 
+    __table_args__ = (
+        Index("ix_chats_user_admin", "user_id", "is_admin_chat"),
+    )
+
     def __repr__(self):
         return f"<Chat(id={self.id}, user_id={self.user_id}, is_admin={self.is_admin_chat})>"
 
@@ -75,6 +97,14 @@ class ChatMessage(Base):
     chat = relationship("Chat", back_populates="messages")
     sender = relationship("User", back_populates="sent_messages")
 
+    # History and latest-N per chat walk (chat_id, created_at, id); unread
+    # counts and mark-as-read seek on (chat_id, is_admin, is_read, id).
+    __table_args__ = (
+        Index("ix_chat_messages_chat_created", "chat_id", "created_at", "id",
+              mssql_include=["is_admin", "is_read"], postgresql_include=["is_admin", "is_read"]),
+        Index("ix_chat_messages_chat_unread", "chat_id", "is_admin", "is_read", "id"),
+    )
+
     def __repr__(self):
         return f"<ChatMessage(id={self.id}, chat_id={self.chat_id}, sender_id={self.sender_id})>"
 
@@ -86,4 +116,89 @@ class AdminStatus(Base):
     last_seen = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     def __repr__(self):
-        return f"<AdminStatus(is_online={self.is_online}, last_seen={self.last_seen})>"
\ No newline at end of file
+        return f"<AdminStatus(is_online={self.is_online}, last_seen={self.last_seen})>"
+
+class ChatUnreadCounter(Base):
+    __tablename__ = "chat_unread_counters"
+
+    # Maintained in the same transaction as the messages it counts
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True)
+    admin_unread = Column(Integer, nullable=False, default=0, index=True)  # user messages not yet read by an admin
+    user_unread = Column(Integer, nullable=False, default=0)  # admin replies not yet read by the user
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every change; the chat's ETag
+    last_activity = Column(DateTime, nullable=True)  # newest message, else when the chat was created
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # The admin inbox pages through chats by (last_activity, chat_id), newest first
+    __table_args__ = (
+        Index("ix_chat_unread_counters_activity", "last_activity", "chat_id"),
+    )
+
+    def __repr__(self):
+        return f"<ChatUnreadCounter(chat_id={self.chat_id}, admin_unread={self.admin_unread}, user_unread={self.user_unread})>"
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    # pending -> sending -> sent / failed
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = Column(String(36), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, to={self.to_email}, status={self.status})>"
+
+class SearchTerm(Base):
+    __tablename__ = "search_terms"
+
+    # Inverted index for /search, written in the same transaction as the
+    # task or message it points to. weight = occurrences x field weight.
+    term = Column(String(64), primary_key=True)
+    doc_type = Column(String(16), primary_key=True)  # task / message
+    doc_id = Column(Integer, primary_key=True)
+    weight = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("ix_search_terms_doc", "doc_type", "doc_id"),
+    )
+
+    def __repr__(self):
+        return f"<SearchTerm(term={self.term}, doc_type={self.doc_type}, doc_id={self.doc_id})>"
+
+class SchedulerState(Base):
+    __tablename__ = "scheduler_state"
+
+    # Where a background scheduler resumes after a restart: everything up to
+    # (high_water_at, high_water_id) has been handled.
+    name = Column(String(64), primary_key=True)
+    high_water_at = Column(DateTime, nullable=False)
+    high_water_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchedulerState(name={self.name}, high_water_at={self.high_water_at})>"
+
+class TaskListVersion(Base):
+    __tablename__ = "task_list_versions"
+
+    # Bumped in the same transaction as every task change, for the owner and
+    # assignee of the task and for row 0 (all tasks, what admins see); the
+    # ETag / Last-Modified of /tasks/ and /tasks/summary come from here.
+    user_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TaskListVersion(user_id={self.user_id}, version={self.version})>"
@@ -1,31 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import or_, func, update, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import json
 import uuid
 
-from app.database import get_db
-from app.models import Chat, ChatMessage, User, AdminStatus
-from app.schemas import ChatCreate, ChatResponse, MessageCreate, MessageResponse,AdminStatusUpdate
-from app.auth import get_current_user
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import Chat, ChatMessage, ChatUnreadCounter, User, AdminStatus
+from app.schemas import ChatCreate, ChatResponse, MessageCreate, MessageResponse,AdminStatusUpdate, AdminChatSummary
+from app.auth import get_current_user, get_user_from_token
+from app.utils.chat_hub import chat_hub
+from app.utils.search_index import index_messages
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.conditional_get import admin_chat_stamp, not_modified
+from app.utils.unread_counters import (
+    add_counter, increment_unread, decrement_unread, unread_by_user, unread_by_user_from_messages, rebuild_unread_counters
+)
 
 router = APIRouter()
 
 # Create a new admin chat
 @router.post("/admin", response_model=ChatResponse)
-def create_admin_chat(
+async def create_admin_chat(
     chat_data: ChatCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     # Check if user already has an active admin chat
-    existing_chat = db.query(Chat).filter(
+    existing_chat = (await db.execute(select(Chat).where(
         Chat.user_id == user.id,
         Chat.is_admin_chat == True
-    ).first()
+    ))).scalars().first()
 
     if existing_chat:
-        return existing_chat
+        messages = (await db.execute(select(ChatMessage).where(
+            ChatMessage.chat_id == existing_chat.id
+        ).order_by(ChatMessage.created_at.asc()))).scalars().all()
+        return {
+            "id": existing_chat.id,
+            "user_id": existing_chat.user_id,
+            "title": existing_chat.title,
+            "is_admin_chat": existing_chat.is_admin_chat,
+            "messages": [_format_message(msg) for msg in messages],
+            "admin_last_read_id": existing_chat.admin_last_read_id,
+            "user_last_read_id": existing_chat.user_last_read_id
+        }
 
     # Create a new admin chat
     new_chat = Chat(
@@ -36,8 +57,10 @@ def create_admin_chat(
     )
     
     db.add(new_chat)
-    db.commit()
-    db.refresh(new_chat)
+    await db.flush()
+    add_counter(db, new_chat)
+    await db.commit()
+    await db.refresh(new_chat)
     
     return {
         "id": new_chat.id,
@@ -46,23 +69,32 @@ def create_admin_chat(
         "is_admin_chat": new_chat.is_admin_chat,
         "messages": []
     }
-# Get user's active admin chat
+def own_admin_chat_query(user_id: int):
+    return select(Chat).where(Chat.user_id == user_id, Chat.is_admin_chat == True)
+
+
+def chat_history_query(chat_id: int):
+    return select(ChatMessage).where(ChatMessage.chat_id == chat_id).order_by(ChatMessage.created_at.asc())
+
+
+# Get user's active admin chat (304 for a matching If-None-Match / If-Modified-Since)
 @router.get("/admin", response_model=ChatResponse)
-def get_admin_chat(
-    db: Session = Depends(get_db),
+async def get_admin_chat(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
-    chat = db.query(Chat).filter(
-        Chat.user_id == user.id,
-        Chat.is_admin_chat == True
-    ).first()
+    unchanged = not_modified(request, response, await admin_chat_stamp(db, user))
+    if unchanged:
+        return unchanged
+
+    chat = (await db.execute(own_admin_chat_query(user.id))).scalars().first()
     
     if not chat:
         raise HTTPException(status_code=404, detail="No active admin chat found")
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.chat_id == chat.id
-    ).order_by(ChatMessage.created_at.asc()).all()
+    messages = (await db.execute(chat_history_query(chat.id))).scalars().all()
     
     formatted_messages = [
         {
@@ -81,20 +113,22 @@ def get_admin_chat(
         "user_id": chat.user_id,
         "title": chat.title,
         "is_admin_chat": chat.is_admin_chat,
-        "messages": formatted_messages
+        "messages": formatted_messages,
+        "admin_last_read_id": chat.admin_last_read_id,
+        "user_last_read_id": chat.user_last_read_id
     }
 # Send message in an admin chat
 @router.post("/admin/message", response_model=MessageResponse)
-def send_admin_message(
+async def send_admin_message(
     message_data: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     # Find the user's admin chat
-    chat = db.query(Chat).filter(
+    chat = (await db.execute(select(Chat).where(
         Chat.user_id == user.id,
         Chat.is_admin_chat == True
-    ).first()
+    ))).scalars().first()
     
     if not chat:
         # Create a new admin chat if one doesn't exist
@@ -105,8 +139,10 @@ def send_admin_message(
             created_at=datetime.utcnow()
         )
         db.add(chat)
-        db.commit()
-        db.refresh(chat)
+        await db.flush()
+        add_counter(db, chat)
+        await db.commit()
+        await db.refresh(chat)
     
     # Create the message
     new_message = ChatMessage(
@@ -119,23 +155,31 @@ def send_admin_message(
     )
     
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await increment_unread(db, chat.id, for_admin=True, sent_at=new_message.created_at)
+    await index_messages(db, [(new_message.id, new_message.content)])
+    await db.commit()
+    await db.refresh(new_message)
+    
+    chat_hub.publish([f"chat:{chat.id}", "admins"], {
+        "type": "message.created",
+        "chat_id": chat.id,
+        "message": _format_message(new_message)
+    })
     
     return new_message
 
 # Admin sends a reply
 @router.post("/admin/reply/{chat_id}", response_model=MessageResponse)
-def admin_reply(
+async def admin_reply(
     chat_id: int,
     message_data: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     if user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can send replies")
     
-    chat = db.query(Chat).filter(Chat.id == chat_id).first()
+    chat = await db.get(Chat, chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
@@ -149,65 +193,168 @@ def admin_reply(
     )
     
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    await increment_unread(db, chat.id, for_admin=False, sent_at=new_message.created_at)
+    await index_messages(db, [(new_message.id, new_message.content)])
+    await db.commit()
+    await db.refresh(new_message)
     
+    message = _format_message(new_message)
+    chat_hub.publish([f"chat:{chat.id}", "admins"], {
+        "type": "message.created",
+        "chat_id": chat.id,
+        "message": message
+    })
+    
+    return message
+
+def _format_message(msg):
     return {
-        "id": new_message.id,
-        "chat_id": new_message.chat_id,
-        "sender_id": new_message.sender_id,
-        "content": new_message.content,
-        "created_at": new_message.created_at,
-        "is_admin": new_message.is_admin,
-        "is_read": new_message.is_read
+        "id": msg.id,
+        "chat_id": msg.chat_id,
+        "sender_id": msg.sender_id,
+        "content": msg.content,
+        "created_at": msg.created_at,
+        "is_admin": msg.is_admin,
+        "is_read": msg.is_read
     }
 
-# Get all admin chats (admin only)
-@router.get("/admin/all", response_model=List[ChatResponse])
-def get_all_admin_chats(
-    db: Session = Depends(get_db),
+
+def recent_messages_query(chat_ids, limit: int):
+    ranked = select(
+        ChatMessage.id.label("id"),
+        func.row_number().over(
+            partition_by=ChatMessage.chat_id,
+            order_by=(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        ).label("rn")
+    ).where(ChatMessage.chat_id.in_(chat_ids)).subquery()
+    return select(ChatMessage).join(ranked, ranked.c.id == ChatMessage.id).where(
+        ranked.c.rn <= limit
+    ).order_by(ChatMessage.chat_id, ChatMessage.created_at.asc(), ChatMessage.id.asc())
+
+
+async def _recent_messages(db: AsyncSession, chat_ids, limit: int):
+    """Last `limit` messages of each chat, oldest first, in one windowed query."""
+    if not chat_ids or limit == 0:
+        return {}
+
+    messages = (await db.execute(recent_messages_query(chat_ids, limit))).scalars().all()
+
+    by_chat = {}
+    for msg in messages:
+        by_chat.setdefault(msg.chat_id, []).append(_format_message(msg))
+    return by_chat
+
+
+def admin_inbox_query(limit: int, position: dict = None):
+    """Admin chats newest activity first, read from the counter rows by ix_chat_unread_counters_activity."""
+    last_activity = ChatUnreadCounter.last_activity
+    query = select(Chat, last_activity, ChatUnreadCounter.admin_unread).join(
+        Chat, Chat.id == ChatUnreadCounter.chat_id
+    ).where(Chat.is_admin_chat == True)
+    if position is not None:
+        # The <= bound lets the index seek; the OR breaks ties on chat_id
+        query = query.where(last_activity <= position["last_activity"], or_(
+            last_activity < position["last_activity"],
+            ChatUnreadCounter.chat_id < position["id"]
+        ))
+    return query.order_by(last_activity.desc(), ChatUnreadCounter.chat_id.desc()).limit(limit)
+
+
+# Get all admin chats (admin only), most recently active first.
+# Each chat carries its last message_limit messages; older history is loaded
+# per chat from /admin/{chat_id}/messages. The next page is in X-Next-Cursor.
+@router.get("/admin/all", response_model=List[AdminChatSummary])
+async def get_all_admin_chats(
+    response: Response,
+    page_size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    message_limit: int = Query(20, ge=0, le=200),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     if user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view all chats")
-    
-    chats = db.query(Chat).filter(Chat.is_admin_chat == True).all()
-    
-    result = []
-    for chat in chats:
-        messages = db.query(ChatMessage).filter(
-            ChatMessage.chat_id == chat.id
-        ).order_by(ChatMessage.created_at.asc()).all()
-        
-        formatted_messages = [
-            {
-                "id": msg.id,
-                "chat_id": msg.chat_id,
-                "sender_id": msg.sender_id,
-                "content": msg.content,
-                "created_at": msg.created_at,
-                "is_admin": msg.is_admin,
-                "is_read": msg.is_read
-            } for msg in messages
-        ]
-        
-        result.append({
+
+    position = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if "id" not in position or "last_activity" not in position:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    rows = (await db.execute(admin_inbox_query(page_size + 1, position))).all()
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_chat, last_seen, _ = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor({"last_activity": last_seen, "id": last_chat.id})
+
+    messages = await _recent_messages(db, [chat.id for chat, _, _ in rows], message_limit)
+
+    return [
+        {
             "id": chat.id,
             "user_id": chat.user_id,
             "title": chat.title,
             "is_admin_chat": chat.is_admin_chat,
-            "messages": formatted_messages
-        })
-    
-    return result
+            "messages": messages.get(chat.id, []),
+            "admin_last_read_id": chat.admin_last_read_id,
+            "user_last_read_id": chat.user_last_read_id,
+            "unread_count": unread_count,
+            "last_activity": last_activity_at
+        } for chat, last_activity_at, unread_count in rows
+    ]
+
+
+# Page through the history of one chat, newest first; pass the oldest id
+# received as before_id to load the previous page. Messages come back oldest first.
+@router.get("/admin/{chat_id}/messages", response_model=List[MessageResponse])
+async def get_chat_messages(
+    chat_id: int,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    chat = await db.get(Chat, chat_id)
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    if chat.user_id != user.id and user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to access this chat")
+
+    messages = (await db.execute(message_page_query(chat_id, before_id, limit))).scalars().all()
+    return [_format_message(msg) for msg in reversed(messages)]
+
+
+def message_page_query(chat_id: int, before_id: Optional[int], limit: int):
+    """Newest `limit` messages of a chat older than before_id."""
+    query = select(ChatMessage).where(ChatMessage.chat_id == chat_id)
+    if before_id is not None:
+        query = query.where(ChatMessage.id < before_id)
+    return query.order_by(ChatMessage.id.desc()).limit(limit)
+
+
+def mark_read_statement(chat_id: int, is_admin_reader: bool, previous_id: Optional[int], latest_id: int):
+    """Flag the other side's unread messages in (previous_id, latest_id] as read."""
+    # Admin marks user messages as read, user marks admin messages as read
+    conditions = [
+        ChatMessage.chat_id == chat_id,
+        ChatMessage.is_admin == (not is_admin_reader),
+        ChatMessage.is_read == False,
+        ChatMessage.id <= latest_id
+    ]
+    if previous_id is not None:
+        conditions.append(ChatMessage.id > previous_id)
+    return update(ChatMessage).where(*conditions).values(is_read=True)
+
+
 # Mark messages as read
 @router.put("/admin/read/{chat_id}")
-def mark_messages_read(
+async def mark_messages_read(
     chat_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
-    chat = db.query(Chat).filter(Chat.id == chat_id).first()
+    chat = await db.get(Chat, chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
@@ -216,45 +363,52 @@ def mark_messages_read(
     if chat.user_id != user.id and user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to access this chat")
     
-    # Determine which messages to mark as read
-    if user.role.value == "admin":
-        # Admin marks user messages as read
-        unread_messages = db.query(ChatMessage).filter(
-            ChatMessage.chat_id == chat_id,
-            ChatMessage.is_admin == False,
-            ChatMessage.is_read == False
-        ).all()
-    else:
-        # User marks admin messages as read
-        unread_messages = db.query(ChatMessage).filter(
-            ChatMessage.chat_id == chat_id,
-            ChatMessage.is_admin == True,
-            ChatMessage.is_read == False
-        ).all()
+    # Advance this side's watermark to the newest message and flag only the
+    # messages between the old and new watermark in one UPDATE, so the cost
+    # depends on what arrived since the last read, not on the chat length.
+    is_admin_reader = user.role.value == "admin"
+    latest_id = (await db.execute(
+        select(func.max(ChatMessage.id)).where(ChatMessage.chat_id == chat_id)
+    )).scalar()
+    previous_id = chat.admin_last_read_id if is_admin_reader else chat.user_last_read_id
+
+    marked = 0
+    if latest_id is not None and (previous_id is None or latest_id > previous_id):
+        marked = (await db.execute(mark_read_statement(chat_id, is_admin_reader, previous_id, latest_id))).rowcount
+
+        if is_admin_reader:
+            chat.admin_last_read_id = latest_id
+        else:
+            chat.user_last_read_id = latest_id
     
-    # Mark messages as read
-    for message in unread_messages:
-        message.is_read = True
+    await decrement_unread(db, chat_id, for_admin=is_admin_reader, count=marked)
+    await db.commit()
     
-    db.commit()
+    if marked:
+        chat_hub.publish([f"chat:{chat_id}", "admins"], {
+            "type": "messages.read",
+            "chat_id": chat_id,
+            "reader": "admin" if is_admin_reader else "user",
+            "last_read_id": latest_id
+        })
     
-    return {"message": f"Marked {len(unread_messages)} messages as read"}
+    return {"message": f"Marked {marked} messages as read", "last_read_id": latest_id}
 
 
 
     
 # Get admin online status
 @router.get("/admin/status")
-def get_admin_status(
-    db: Session = Depends(get_db)
+async def get_admin_status(
+    db: AsyncSession = Depends(get_async_db)
 ):
-    status = db.query(AdminStatus).first()
+    status = (await db.execute(select(AdminStatus))).scalars().first()
     if not status:
         # Create default status if it doesn't exist
         status = AdminStatus(is_online=False, last_seen=datetime.utcnow())
         db.add(status)
-        db.commit()
-        db.refresh(status)
+        await db.commit()
+        await db.refresh(status)
     
     return {
         "is_online": status.is_online,
@@ -263,16 +417,16 @@ def get_admin_status(
 
 # Update admin online status (admin only)
 @router.put("/admin/status")
-def update_admin_status(
+async def update_admin_status(
     status_data: AdminStatusUpdate,  # Changed to use the schema
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     # Ensure the user is an admin
     if user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update status")
     
-    status = db.query(AdminStatus).first()
+    status = (await db.execute(select(AdminStatus))).scalars().first()
     if not status:
         status = AdminStatus()
         db.add(status)
@@ -280,60 +434,124 @@ def update_admin_status(
     status.is_online = status_data.is_online  # Changed to use status_data
     status.last_seen = datetime.utcnow()
     
-    db.commit()
-    db.refresh(status)
+    await db.commit()
+    await db.refresh(status)
     
-    return {
+    presence = {
         "is_online": status.is_online,
         "last_seen": status.last_seen
     }
+    chat_hub.publish(["presence"], {"type": "admin.status", **presence})
+    
+    return presence
 # Get unread message counts (for notifications)
+# Answered from chat_unread_counters; admins can pass verify=true to compute
+# the breakdown from chat_messages instead.
 @router.get("/admin/unread")
-def get_unread_counts(
-    db: Session = Depends(get_db),
+async def get_unread_counts(
+    verify: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user)
 ):
     if user.role.value == "admin":
-        # For admin: count of unread messages from all users
-        unread_count = db.query(ChatMessage).filter(
-            ChatMessage.is_admin == False,
-            ChatMessage.is_read == False
-        ).count()
-        
-        # Get counts by user for detailed breakdown
-        chats = db.query(Chat).filter(Chat.is_admin_chat == True).all()
-        user_counts = {}
-        
-        for chat in chats:
-            count = db.query(ChatMessage).filter(
-                ChatMessage.chat_id == chat.id,
-                ChatMessage.is_admin == False,
-                ChatMessage.is_read == False
-            ).count()
-            
-            if count > 0:
-                chat_user = db.query(User).filter(User.id == chat.user_id).first()
-                if chat_user:
-                    user_counts[chat_user.username] = count
+        # For admin: unread messages from all users, broken down by user
+        user_counts = await (unread_by_user_from_messages(db) if verify else unread_by_user(db))
         
         return {
-            "total_unread": unread_count,
+            "total_unread": sum(user_counts.values()),
             "by_user": user_counts
         }
     else:
         # For regular user: count of unread admin messages
-        chat = db.query(Chat).filter(
+        unread_count = (await db.execute(select(ChatUnreadCounter.user_unread).join(
+            Chat, Chat.id == ChatUnreadCounter.chat_id
+        ).where(
             Chat.user_id == user.id,
             Chat.is_admin_chat == True
-        ).first()
-        
-        if not chat:
-            return {"unread_count": 0}
-        
-        unread_count = db.query(ChatMessage).filter(
-            ChatMessage.chat_id == chat.id,
-            ChatMessage.is_admin == True,
-            ChatMessage.is_read == False
-        ).count()
+        ))).scalar()
         
-        return {"unread_count": unread_count}
\ No newline at end of file
+        return {"unread_count": unread_count or 0}
+
+# Recompute the unread counters from the messages (admin only)
+# Chats are recounted in chunks with their counter rows locked, so messages sent
+# or read meanwhile still count; each chat's version moves on.
+@router.post("/admin/unread/rebuild")
+async def rebuild_unread(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    if user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can rebuild unread counters")
+    
+    chats_counted = await rebuild_unread_counters(db)
+    return {"message": f"Rebuilt unread counters for {chats_counted} chats"}
+
+
+# Real-time updates for the support chat.
+# Connect with ?token=<access token>. Users are subscribed to their admin chat,
+# admins to every support chat; everyone receives admin presence changes.
+# Clients may send {"action": "subscribe", "chat_id": ...} (e.g. right after
+# creating their chat) and {"action": "ping"}.
+async def _socket_channels(token: str):
+    async with AsyncSessionLocal() as db:
+        user = await get_user_from_token(db, token)
+        channels = ["presence"]
+        if user.role.value == "admin":
+            channels.append("admins")
+        else:
+            chat_id = (await db.execute(select(Chat.id).where(
+                Chat.user_id == user.id,
+                Chat.is_admin_chat == True
+            ))).scalar()
+            if chat_id:
+                channels.append(f"chat:{chat_id}")
+        return user.id, user.role.value == "admin", channels
+
+
+async def _can_access_chat(chat_id: int, user_id: int, is_admin: bool):
+    async with AsyncSessionLocal() as db:
+        owner_id = (await db.execute(select(Chat.user_id).where(Chat.id == chat_id))).first()
+        return owner_id is not None and (is_admin or owner_id[0] == user_id)
+
+
+async def _forward_events(websocket: WebSocket, subscription):
+    while True:
+        event = await subscription.queue.get()
+        if event is None:
+            # Client fell behind; make it reconnect and reload over HTTP
+            await websocket.close(code=1013)
+            return
+        await websocket.send_json(event)
+
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket, token: str = Query(...)):
+    try:
+        user_id, is_admin, channels = await _socket_channels(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscription = chat_hub.subscribe(channels)
+    sender = asyncio.create_task(_forward_events(websocket, subscription))
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            if data.get("action") == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif data.get("action") == "subscribe" and isinstance(data.get("chat_id"), int):
+                if await _can_access_chat(data["chat_id"], user_id, is_admin):
+                    chat_hub.add_channel(subscription, f"chat:{data['chat_id']}")
+                else:
+                    await websocket.send_json({"type": "error", "detail": "Not authorized to access this chat"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        chat_hub.unsubscribe(subscription)
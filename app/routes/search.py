@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
+from app.models import Chat, ChatMessage, Task, User
+from app.schemas import SearchHit
+from app.auth import get_current_user
+from app.routes.tasks import task_visibility
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.search_index import search, rebuild_search_index
+
+router = APIRouter()
+
+DOC_TYPES = {"all": ["task", "message"], "task": ["task"], "message": ["message"]}
+
+
+#  Keyword search over task titles/descriptions and chat messages, best match first.
+#  Every word must match; end a word with * (the last word always) to match it as a prefix.
+#  Users only find their own/assigned tasks and their own chat; the next page is in X-Next-Cursor.
+@router.get("/", response_model=List[SearchHit])
+async def search_everything(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query("all", regex="^(all|task|message)$"),
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if not {"score", "type", "id"} <= after.keys():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    is_admin = user.role.value == "admin"
+    hits = await search(
+        db, q, DOC_TYPES[type],
+        visible_tasks=task_visibility(user),
+        visible_chats=(Chat.is_admin_chat == True) if is_admin else (Chat.user_id == user.id),
+        limit=page_size + 1,
+        after=after,
+    )
+    if len(hits) > page_size:
+        hits = hits[:page_size]
+        doc_type, doc_id, score = hits[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor({"score": score, "type": doc_type, "id": doc_id})
+
+    task_ids = [doc_id for doc_type, doc_id, _ in hits if doc_type == "task"]
+    message_ids = [doc_id for doc_type, doc_id, _ in hits if doc_type == "message"]
+    documents = {}
+    if task_ids:
+        for task in (await db.execute(select(Task).where(Task.id.in_(task_ids)))).scalars():
+            documents[("task", task.id)] = task
+    if message_ids:
+        for message in (await db.execute(select(ChatMessage).where(ChatMessage.id.in_(message_ids)))).scalars():
+            documents[("message", message.id)] = message
+
+    return [
+        {"type": doc_type, "id": doc_id, "score": score, doc_type: documents[(doc_type, doc_id)]}
+        for doc_type, doc_id, score in hits
+        if (doc_type, doc_id) in documents
+    ]
+
+
+#  Re-index every task and message (admin), e.g. after bulk changes made outside the API
+@router.post("/rebuild")
+async def rebuild_index(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    if user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can rebuild the search index")
+
+    indexed = await rebuild_search_index(db)
+    return {"message": f"Indexed {indexed} documents"}
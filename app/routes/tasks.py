@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from app.utils.email_service import send_email  
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, func, case, select, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.outbox import enqueue_email, enqueue_summary
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal
 from app.models import Task, User
-from app.schemas import TaskCreate, TaskResponse
+from app.schemas import TaskCreate, TaskResponse, TaskBatchIds, TaskBatchUpdate, TaskBatchResult, PrioritizedTask
 from app.auth import get_current_user
-from datetime import datetime
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.search_index import index_tasks, remove_tasks
+from app.utils.prioritization import SmartWeights, assignee_load_query, rank, smart_rankings
+from app.utils.reminders import note_task_changes
+from app.utils.conditional_get import bump_task_versions, not_modified, task_list_stamp
+from datetime import datetime, timedelta
+import os
 
 router = APIRouter()
 
+STREAM_BATCH_SIZE = 500
+# Largest id list / task array one batch call accepts (SQL Server allows 2100 parameters)
+TASK_BATCH_MAX = int(os.getenv("TASK_BATCH_MAX", "1000"))
+
 #  Create a Task (Admin Only)
 @router.post("/", response_model=TaskResponse)
-def create_task(
+async def create_task(
     task: TaskCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     user: User = Depends(get_current_user)
 ):
     if user.role.value != "admin":
@@ -22,58 +34,235 @@ def create_task(
 
     db_task = Task(**task.model_dump(), owner_id=user.id)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-
-    
-    send_email(user.email, "Task Created", f"Your task '{task.title}' has been created.")
+    await db.flush()
+    await index_tasks(db, [(db_task.id, db_task.title, db_task.description)])
+    await bump_task_versions(db, [user.id, db_task.assigned_to_id])
+    enqueue_email(db, user.email, "Task Created", f"Your task '{task.title}' has been created.")
+    await db.commit()
+    await db.refresh(db_task)
 
     return db_task
 
 
+#  Batch endpoints: one transaction and set-based SQL per call, one result per
+#  item in request order (a repeated id is reported once) and at most one
+#  notification email per recipient.
+#  They are declared before the /{task_id} routes so "batch" is not read as an id.
+def _batch_ids(ids: List[int]):
+    if len(ids) > TASK_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {TASK_BATCH_MAX} tasks per batch")
+    return list(dict.fromkeys(ids))
+
+
+async def _load_batch(db: AsyncSession, ids: List[int]):
+    rows = await db.execute(
+        select(Task.id, Task.owner_id, Task.assigned_to_id, Task.title).where(Task.id.in_(ids))
+    )
+    return {row.id: row for row in rows}
+
+
+def _task_users(found, ids):
+    """Owners and assignees of the given tasks from _load_batch, whose task lists change."""
+    return [user_id for task_id in ids for user_id in (found[task_id].owner_id, found[task_id].assigned_to_id)]
+
+
+#  Create many Tasks (Admin Only)
+@router.post("/batch", response_model=List[TaskBatchResult])
+async def create_tasks_batch(
+    tasks: List[TaskCreate],
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    if user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can create tasks!")
+    if len(tasks) > TASK_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {TASK_BATCH_MAX} tasks per batch")
+    if not tasks:
+        return []
+
+    # A single multi-row INSERT ... RETURNING (executemany on drivers without it)
+    ids = (await db.execute(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+        [{**task.model_dump(), "owner_id": user.id} for task in tasks]
+    )).scalars().all()
+    await index_tasks(db, [(task_id, task.title, task.description) for task_id, task in zip(ids, tasks)])
+    note_task_changes(db, [(task_id, task.due_date, task.completed) for task_id, task in zip(ids, tasks)])
+    await bump_task_versions(db, [user.id, *(task.assigned_to_id for task in tasks)])
+
+    enqueue_summary(db, user.email, "Tasks Created", f"{len(tasks)} tasks have been created:",
+                    [task.title for task in tasks])
+    await db.commit()
+
+    return [{"index": index, "id": task_id, "status": "created"} for index, task_id in enumerate(ids)]
+
+
+#  Update many Tasks (Only Owner or Admin); only the fields sent are changed
+@router.put("/batch", response_model=List[TaskBatchResult])
+async def update_tasks_batch(
+    batch: TaskBatchUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    changes = batch.model_dump(exclude_unset=True, exclude={"ids"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    for field in ("title", "completed", "priority"):
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+
+    ids = _batch_ids(batch.ids)
+    found = await _load_batch(db, ids)
+    results, allowed = [], []
+    for index, task_id in enumerate(ids):
+        task = found.get(task_id)
+        if task is None:
+            results.append({"index": index, "id": task_id, "status": "not_found", "detail": "Task not found"})
+        elif task.owner_id != user.id and user.role.value != "admin":
+            results.append({"index": index, "id": task_id, "status": "forbidden",
+                            "detail": "Not authorized to update this task!"})
+        else:
+            allowed.append(task_id)
+            results.append({"index": index, "id": task_id, "status": "updated"})
+
+    if allowed:
+        await db.execute(update(Task).where(Task.id.in_(allowed)).values(**changes))
+        if "title" in changes or "description" in changes:
+            await index_tasks(db, (await db.execute(
+                select(Task.id, Task.title, Task.description).where(Task.id.in_(allowed))
+            )).tuples().all())
+        if "due_date" in changes or "completed" in changes:
+            note_task_changes(db, (await db.execute(
+                select(Task.id, Task.due_date, Task.completed).where(Task.id.in_(allowed))
+            )).tuples().all())
+        await bump_task_versions(db, _task_users(found, allowed))
+        await db.commit()
+    return results
+
+
+#  Assign many Tasks to one User (Admin Only)
+@router.put("/batch/assign/{user_id}", response_model=List[TaskBatchResult])
+async def assign_tasks_batch(
+    user_id: int,
+    batch: TaskBatchIds,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    if user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can assign tasks!")
+
+    assigned_user = await db.get(User, user_id)
+    if not assigned_user:
+        raise HTTPException(status_code=404, detail="User not found!")
+
+    ids = _batch_ids(batch.ids)
+    found = await _load_batch(db, ids)
+    results, allowed = [], []
+    for index, task_id in enumerate(ids):
+        if task_id not in found:
+            results.append({"index": index, "id": task_id, "status": "not_found", "detail": "Task not found!"})
+        else:
+            allowed.append(task_id)
+            results.append({"index": index, "id": task_id, "status": "assigned"})
+
+    if allowed:
+        await db.execute(update(Task).where(Task.id.in_(allowed)).values(assigned_to_id=user_id))
+        # The previous assignees' lists change too
+        await bump_task_versions(db, [user_id, *_task_users(found, allowed)])
+        enqueue_summary(db, assigned_user.email, "New Tasks Assigned",
+                        f"You have been assigned {len(allowed)} new tasks:",
+                        [found[task_id].title for task_id in allowed])
+        await db.commit()
+    return results
+
+
+#  Mark many Tasks as Completed (Only Owner or Assigned User)
+@router.patch("/batch/complete", response_model=List[TaskBatchResult])
+async def complete_tasks_batch(
+    batch: TaskBatchIds,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user)
+):
+    ids = _batch_ids(batch.ids)
+    found = await _load_batch(db, ids)
+    results, titles_by_recipient = [], {}
+    for index, task_id in enumerate(ids):
+        task = found.get(task_id)
+        if task is None:
+            results.append({"index": index, "id": task_id, "status": "not_found", "detail": "Task not found"})
+        elif task.owner_id != user.id and task.assigned_to_id != user.id:
+            results.append({"index": index, "id": task_id, "status": "forbidden",
+                            "detail": "Not authorized to complete this task!"})
+        else:
+            titles_by_recipient.setdefault(task.owner_id, []).append(task.title)
+            if task.assigned_to_id and task.assigned_to_id != task.owner_id:
+                titles_by_recipient.setdefault(task.assigned_to_id, []).append(f"{task.title} (assigned to you)")
+            results.append({"index": index, "id": task_id, "status": "completed"})
+
+    if titles_by_recipient:
+        completed_ids = [result["id"] for result in results if result["status"] == "completed"]
+        await db.execute(update(Task).where(Task.id.in_(completed_ids)).values(completed=True))
+        note_task_changes(db, [(task_id, None, True) for task_id in completed_ids])
+        await bump_task_versions(db, _task_users(found, completed_ids))
+
+        #  Notify each Task Owner and Assigned User once, in one lookup; skip it
+        #  when the caller is the only recipient
+        emails = {user.id: user.email}
+        others = [user_id for user_id in titles_by_recipient if user_id != user.id]
+        if others:
+            emails.update((await db.execute(
+                select(User.id, User.email).where(User.id.in_(others))
+            )).tuples().all())
+        for recipient_id, titles in titles_by_recipient.items():
+            if recipient_id in emails:
+                enqueue_summary(db, emails[recipient_id], "Tasks Completed",
+                                f"{len(titles)} of your tasks have been completed:", titles)
+        await db.commit()
+    return results
+
+
 #  Assign Task to Another User (Admin Only)
 @router.put("/{task_id}/assign/{user_id}")
-def assign_task(
+async def assign_task(
     task_id: int, 
     user_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     user: User = Depends(get_current_user)
 ):
     """ Admin assigns a task to another user """
     if user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can assign tasks!")
 
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found!")
 
-    assigned_user = db.query(User).filter(User.id == user_id).first()
+    assigned_user = await db.get(User, user_id)
     if not assigned_user:
         raise HTTPException(status_code=404, detail="User not found!")
 
+    await bump_task_versions(db, [task.owner_id, task.assigned_to_id, user_id])
     task.assigned_to_id = user_id
-    db.commit()
-    db.refresh(task)
-
-    
-    send_email(
+    enqueue_email(
+        db,
         assigned_user.email,
         "New Task Assigned",
         f"You have been assigned a new task: '{task.title}'."
     )
+    await db.commit()
+    await db.refresh(task)
 
     return {"message": f"Task '{task.title}' assigned to user {assigned_user.username} successfully!"}
 
 
 #  Update a Task (Only Owner or Admin)
 @router.put("/{task_id}", response_model=TaskResponse)
-def update_task(
+async def update_task(
     task_id: int, 
     updated_task: TaskCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     user: User = Depends(get_current_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -85,45 +274,49 @@ def update_task(
     task.completed = updated_task.completed
     task.priority = updated_task.priority
     task.due_date = updated_task.due_date
+    await index_tasks(db, [(task.id, task.title, task.description)])
+    await bump_task_versions(db, [task.owner_id, task.assigned_to_id])
 
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return task
 
 
 #  Delete a Task (Only Owner or Admin)
 @router.delete("/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     user: User = Depends(get_current_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     if task.owner_id != user.id and user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete this task!")
 
-    db.delete(task)
-    db.commit()
-
-    #  Send Email Notification to Owner (if exists)
-    owner = db.query(User).filter(User.id == task.owner_id).first()
+    #  Queue Email Notification to Owner (if exists); skip the lookup when the owner is the caller
+    owner = user if task.owner_id == user.id else await db.get(User, task.owner_id)
     if owner:
-        send_email(owner.email, "Task Deleted", f"Your task '{task.title}' has been deleted.")
+        enqueue_email(db, owner.email, "Task Deleted", f"Your task '{task.title}' has been deleted.")
+
+    await remove_tasks(db, [task.id])
+    await bump_task_versions(db, [task.owner_id, task.assigned_to_id])
+    await db.delete(task)
+    await db.commit()
 
     return {"message": "Task deleted successfully"}
 
 
 #  Mark a Task as Completed (Only Owner or Assigned User)
 @router.patch("/{task_id}/complete")
-def complete_task(
+async def complete_task(
     task_id: int, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     user: User = Depends(get_current_user)
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -131,78 +324,312 @@ def complete_task(
         raise HTTPException(status_code=403, detail="Not authorized to complete this task!")
 
     task.completed = True
-    db.commit()
+    await bump_task_versions(db, [task.owner_id, task.assigned_to_id])
 
     #  Notify Task Owner
-    owner = db.query(User).filter(User.id == task.owner_id).first()
+    owner = user if task.owner_id == user.id else await db.get(User, task.owner_id)
     if owner:
-        send_email(owner.email, "Task Completed", f"Your task '{task.title}' has been completed.")
+        enqueue_email(db, owner.email, "Task Completed", f"Your task '{task.title}' has been completed.")
 
     #  Notify Assigned User (if exists)
     if task.assigned_to_id:
-        assigned_user = db.query(User).filter(User.id == task.assigned_to_id).first()
+        assigned_user = user if task.assigned_to_id == user.id else await db.get(User, task.assigned_to_id)
         if assigned_user:
-            send_email(
+            enqueue_email(
+                db,
                 assigned_user.email,
                 "Task Marked as Completed",
                 f"The task '{task.title}' assigned to you has been completed."
             )
 
+    await db.commit()
+
     return {"message": "Task marked as completed"}
 
 
-#  Get All Tasks with Filtering & Sorting (Admins see all, users see their own)
+def task_visibility(user: User):
+    """WHERE condition for the tasks a user may see, or None for admins (also used by /search)."""
+    #  Non-admin users should only see their own tasks
+    if user.role.value != "admin":
+        return (Task.owner_id == user.id) | (Task.assigned_to_id == user.id)
+    return None
 
+
+def _visible_tasks(user: User, *columns):
+    query = select(*columns) if columns else select(Task)
+    visible = task_visibility(user)
+    if visible is not None:
+        query = query.where(visible)
+    return query
+
+
+def _after_cursor(column, value, last_id, descending):
+    """Keyset condition for rows that sort after (value, last_id).
+
+    NULLs sort lowest: first in ascending order and last in descending order,
+    as task_list_query's ORDER BY spells out (PostgreSQL would put them highest).
+    """
+    if descending:
+        if value is None:
+            return and_(column.is_(None), Task.id < last_id)
+        return or_(column < value, and_(column == value, Task.id < last_id), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), Task.id > last_id), column.isnot(None))
+    return or_(column > value, and_(column == value, Task.id > last_id))
+
+
+def task_list_query(user: User, filters, sort_by: str, sort_order: str, position: dict = None):
+    """The /tasks/ query: visible tasks in (sort column, id) order, after the cursor position if given."""
+    query = _visible_tasks(user).where(*filters)
+
+    #  Keyset pagination: continue after the last (sort value, id) of the previous page
+    order_by_column = getattr(Task, sort_by)
+    descending = sort_order == "desc"
+    if position is not None:
+        query = query.where(_after_cursor(order_by_column, position.get("value"), position["id"], descending))
+
+    # id breaks ties so every row has a stable position between pages
+    if descending:
+        return query.order_by(order_by_column.desc().nulls_last(), Task.id.desc())
+    return query.order_by(order_by_column.asc().nulls_first(), Task.id)
+
+
+#  Get All Tasks with Filtering & Sorting (Admins see all, users see their own)
+#  Pass page_size (and the X-Next-Cursor of the previous page as cursor) to page through
+#  results, or stream=true to receive NDJSON rows as they are read.
+#  Send the ETag back in If-None-Match to get a 304 while the list is unchanged.
 @router.get("/", response_model=List[TaskResponse])
-def get_tasks(
+async def get_tasks(
+    request: Request,
+    response: Response,
     completed: Optional[bool] = None,
     priority: Optional[int] = Query(None, ge=1, le=5),
     due_date: Optional[str] = None,
-    sort_by: Optional[str] = Query("due_date", regex="^(due_date|priority|title)$"),
+    sort_by: Optional[str] = Query("due_date", regex="^(due_date|priority|title|smart)$"),
     sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
-    db: Session = Depends(get_db),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
-    query = db.query(Task)
-
-    #  Non-admin users should only see their own tasks
-    if user.role.value != "admin":
-        query = query.filter((Task.owner_id == user.id) | (Task.assigned_to_id == user.id))
-
+    if not stream:
+        variant = sorted(request.query_params.multi_items())
+        if sort_by == "smart":
+            # The ranking depends on the time left until each due date
+            variant.append(datetime.utcnow().strftime("%Y-%m-%dT%H:%M"))
+        unchanged = not_modified(request, response, await task_list_stamp(db, user), *variant)
+        if unchanged:
+            return unchanged
+
+    filters = []
     if completed is not None:
-        query = query.filter(Task.completed == completed)
+        filters.append(Task.completed == completed)
     if priority is not None:
-        query = query.filter(Task.priority == priority)
+        filters.append(Task.priority == priority)
     if due_date:
-        query = query.filter(Task.due_date == datetime.strptime(due_date, "%Y-%m-%d"))
-
-    
-    order_by_column = getattr(Task, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(order_by_column.desc())
-    else:
-        query = query.order_by(order_by_column)
-
-    return query.all()
-# 🚀 Get Task Statistics (Admin sees all, users see their own)
-@router.get("/summary")
-def get_task_summary(
-    db: Session = Depends(get_db),
+        filters.append(Task.due_date == datetime.strptime(due_date, "%Y-%m-%d"))
+
+    if sort_by == "smart":
+        key = ("list", _ranking_scope(user), completed, priority, due_date)
+        return await _smart_tasks(db, user, filters, key, response, sort_order, page_size, cursor, stream)
+
+    position = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("sort_by") != sort_by or position.get("sort_order") != sort_order or "id" not in position:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sorting")
+    query = task_list_query(user, filters, sort_by, sort_order, position)
+
+    if stream:
+        return StreamingResponse(_stream_tasks(query, page_size), media_type="application/x-ndjson")
+
+    if page_size is None:
+        return (await db.execute(query)).scalars().all()
+
+    tasks = (await db.execute(query.limit(page_size + 1))).scalars().all()
+    if len(tasks) > page_size:
+        tasks = tasks[:page_size]
+        last = tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor({
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "value": getattr(last, sort_by),
+            "id": last.id,
+        })
+    return tasks
+
+
+async def _stream_tasks(query, limit):
+    """Yield tasks as NDJSON from a server-side cursor on a session owned by the stream."""
+    if limit is not None:
+        query = query.limit(limit)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for task in result.scalars():
+            yield TaskResponse.model_validate(task).model_dump_json() + "\n"
+
+
+SMART_COLUMNS = (Task.id, Task.due_date, Task.priority, Task.assigned_to_id, Task.completed)
+
+
+def _ranking_scope(user: User):
+    # Admins all see the same tasks, so they share cached rankings
+    return "admin" if user.role.value == "admin" else user.id
+
+
+async def _ranking(db: AsyncSession, user: User, filters, key, weights: SmartWeights = SmartWeights()):
+    ranking = smart_rankings.get((key, weights))
+    if ranking is None:
+        rows = (await db.execute(_visible_tasks(user, *SMART_COLUMNS).where(*filters))).all()
+        # Load is relative to everyone's open tasks, not just the ones this list shows
+        open_counts = dict((await db.execute(assignee_load_query())).tuples().all())
+        ranking = rank(rows, weights=weights, open_counts=open_counts)
+        smart_rankings.put((key, weights), ranking)
+    return ranking
+
+
+async def _tasks_in_order(db: AsyncSession, ids):
+    """Load tasks by id, keeping the given order (ids deleted meanwhile are skipped)."""
+    found = {}
+    for start in range(0, len(ids), TASK_BATCH_MAX):
+        chunk = ids[start:start + TASK_BATCH_MAX]
+        for task in (await db.execute(select(Task).where(Task.id.in_(chunk)))).scalars():
+            found[task.id] = task
+    return [found[task_id] for task_id in ids if task_id in found]
+
+
+async def _smart_tasks(db, user, filters, key, response, sort_order, page_size, cursor, stream):
+    """sort_by=smart: best-first by the prioritization score (sort_order does not apply)."""
+    ranking = await _ranking(db, user, filters, key)
+
+    start = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("sort_by") != "smart" or "id" not in position or "value" not in position:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sorting")
+        start = ranking.after(position["value"], position["id"])
+    end = len(ranking) if page_size is None else min(start + page_size, len(ranking))
+    ids = ranking.ids[start:end].tolist()
+
+    if stream:
+        return StreamingResponse(_stream_ranked(ids), media_type="application/x-ndjson")
+
+    tasks = await _tasks_in_order(db, ids)
+    if end < len(ranking) and ids:
+        response.headers["X-Next-Cursor"] = encode_cursor({
+            "sort_by": "smart",
+            "sort_order": sort_order,
+            "value": float(ranking.scores[end - 1]),
+            "id": ids[-1],
+        })
+    return tasks
+
+
+async def _stream_ranked(ids):
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(ids), STREAM_BATCH_SIZE):
+            for task in await _tasks_in_order(db, ids[start:start + STREAM_BATCH_SIZE]):
+                yield TaskResponse.model_validate(task).model_dump_json() + "\n"
+
+
+#  Smart prioritization: open tasks ranked by due date, priority and assignee load
+#  (see app/utils/prioritization.py). Weights default to the SMART_WEIGHT_* settings
+#  and can be overridden per request; admins can narrow the list to one assignee.
+@router.get("/prioritized", response_model=List[PrioritizedTask])
+async def get_prioritized_tasks(
+    limit: int = Query(20, ge=1, le=500),
+    assigned_to_id: Optional[int] = None,
+    w_due: Optional[float] = Query(None, ge=0),
+    w_priority: Optional[float] = Query(None, ge=0),
+    w_load: Optional[float] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
-    query = db.query(Task)
-
-    # Non-admin users should only see their own tasks
+    defaults = SmartWeights()
+    weights = SmartWeights(
+        defaults.due if w_due is None else w_due,
+        defaults.priority if w_priority is None else w_priority,
+        defaults.load if w_load is None else w_load,
+    )
+    filters = [Task.completed == False]
+    if assigned_to_id is not None:
+        filters.append(Task.assigned_to_id == assigned_to_id)
+
+    ranking = await _ranking(db, user, filters, ("open", _ranking_scope(user), assigned_to_id), weights)
+    ids = ranking.ids[:limit].tolist()
+    scores = dict(zip(ids, ranking.scores[:limit].tolist()))
+    return [
+        {**TaskResponse.model_validate(task).model_dump(), "due_date": task.due_date,
+         "priority": task.priority, "score": scores[task.id]}
+        for task in await _tasks_in_order(db, ids)
+    ]
+
+
+@router.get("/prioritized/cache")
+async def get_prioritized_cache_stats(user: User = Depends(get_current_user)):
     if user.role.value != "admin":
-        query = query.filter((Task.owner_id == user.id) | (Task.assigned_to_id == user.id))
+        raise HTTPException(status_code=403, detail="Only admins can view cache statistics")
+
+    return smart_rankings.stats()
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
 
-    tasks = query.all()
 
-    return {
-        "totalTasks": len(tasks),
-        "completedTasks": sum(1 for task in tasks if task.completed),
-        "pendingTasks": sum(1 for task in tasks if not task.completed),
-        "highPriority": sum(1 for task in tasks if task.priority == 1),
-        "mediumPriority": sum(1 for task in tasks if task.priority == 2),
-        "lowPriority": sum(1 for task in tasks if task.priority == 3),
+SUMMARY_COUNTERS = ("totalTasks", "completedTasks", "pendingTasks", "highPriority", "mediumPriority",
+                    "lowPriority", "overdueTasks", "dueToday")
+
+
+def summary_query(user: User, by_assignee: bool, now: datetime):
+    """The /tasks/summary query: every counter as a conditional aggregate over the visible tasks."""
+    today = datetime(now.year, now.month, now.day)
+    tomorrow = today + timedelta(days=1)
+    counters = {
+        "totalTasks": func.count(Task.id),
+        "completedTasks": _count_where(Task.completed == True),
+        "pendingTasks": _count_where(Task.completed == False),
+        "highPriority": _count_where(Task.priority == 1),
+        "mediumPriority": _count_where(Task.priority == 2),
+        "lowPriority": _count_where(Task.priority == 3),
+        "overdueTasks": _count_where(and_(Task.completed == False, Task.due_date < now)),
+        "dueToday": _count_where(and_(Task.due_date >= today, Task.due_date < tomorrow)),
     }
+    columns = [counters[name].label(name) for name in SUMMARY_COUNTERS]
+    if not by_assignee:
+        return _visible_tasks(user, *columns)
+    return _visible_tasks(user, Task.assigned_to_id, *columns).group_by(Task.assigned_to_id)
+
+
+# 🚀 Get Task Statistics (Admin sees all, users see their own)
+#  All counters come from one conditional-aggregate query. With by_assignee=true the
+#  same query is grouped by assignee and the totals are folded from the groups.
+#  Conditional like /tasks/; overdue/today counts move with the clock, so an ETag
+#  is only reused within the minute it was issued.
+@router.get("/summary")
+async def get_task_summary(
+    request: Request,
+    response: Response,
+    by_assignee: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user),
+):
+    now = datetime.utcnow()
+    unchanged = not_modified(request, response, await task_list_stamp(db, user),
+                             by_assignee, now.strftime("%Y-%m-%dT%H:%M"))
+    if unchanged:
+        return unchanged
+
+    query = summary_query(user, by_assignee, now)
+    if not by_assignee:
+        row = (await db.execute(query)).one()
+        return {name: int(getattr(row, name)) for name in SUMMARY_COUNTERS}
+
+    rows = (await db.execute(query)).all()
+    summary = {name: sum(int(getattr(row, name)) for row in rows) for name in SUMMARY_COUNTERS}
+    summary["byAssignee"] = [
+        {"assigned_to_id": row.assigned_to_id, **{name: int(getattr(row, name)) for name in SUMMARY_COUNTERS}}
+        for row in rows
+    ]
+    return summary
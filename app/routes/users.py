@@ -1,23 +1,47 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.auth import authenticate_user, create_access_token, get_password_hash, get_current_user
-from app.database import get_db
+from app.auth import authenticate_user_async, create_access_token, get_current_user
+from app.database import get_async_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
+from app.utils.principal_cache import principal_cache
+from app.utils.password_hasher import password_hasher, PasswordHasherBusy
 
 router = APIRouter()
 
 
+def _hasher_unavailable(e: Exception):
+    """503 for a saturated, slow or crashed password hasher; clients retry after a second."""
+    if isinstance(e, PasswordHasherBusy):
+        detail = str(e)
+    elif isinstance(e, asyncio.TimeoutError):
+        detail = "Password check timed out, please retry shortly"
+    else:
+        detail = "Password hasher restarting, please retry shortly"
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+
 #  Register New User
+#  bcrypt runs on the password hasher's process pool; when it is saturated,
+#  times out or loses a worker, auth requests get a 503 instead of tying up
+#  threads other routes need.
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.username == user.username).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = (await db.execute(select(User).where(User.username == user.username))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except (PasswordHasherBusy, asyncio.TimeoutError, BrokenProcessPool) as e:
+        raise _hasher_unavailable(e)
+
     db_user = User(
         username=user.username,
         email=user.email,
@@ -25,18 +49,21 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         role="user"  
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 #  Login & Generate JWT Token
 @router.post("/token", response_model=Token)
-def login_for_access_token(data: dict, db: Session = Depends(get_db)):
+async def login_for_access_token(data: dict, db: AsyncSession = Depends(get_async_db)):
     username = data.get("username")
     password = data.get("password")
 
-    user = authenticate_user(db, username, password)
+    try:
+        user = await authenticate_user_async(db, username, password)
+    except (PasswordHasherBusy, asyncio.TimeoutError, BrokenProcessPool) as e:
+        raise _hasher_unavailable(e)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
@@ -46,27 +73,36 @@ def login_for_access_token(data: dict, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
 #  Get All Users (Admin Only)
 @router.get("/all", response_model=list[UserResponse])
-def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_all_users(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can view all users")
     
-    return db.query(User).all()
+    return (await db.execute(select(User))).scalars().all()
+
+#  Authenticated-principal cache statistics (Admin Only)
+@router.get("/cache/stats")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view cache statistics")
+    
+    return principal_cache.stats()
+
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(
+async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role.value != "admin":
         raise HTTPException(status_code=403, detail="Only admins can access user information")
     
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
\ No newline at end of file
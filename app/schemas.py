@@ -19,6 +19,23 @@ class TaskCreate(TaskBase):
     priority: int = 3
     assigned_to_id: Optional[int] = None  
 
+class TaskBatchIds(BaseModel):
+    ids: List[int]
+
+class TaskBatchUpdate(TaskBatchIds):
+    # Only the fields that are sent are changed
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    priority: Optional[int] = None
+    due_date: Optional[datetime] = None
+
+class TaskBatchResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str
+    detail: Optional[str] = None
+
 class TaskFilter(BaseModel):
     completed: Optional[bool] = None
     priority: Optional[int] = None
@@ -32,6 +49,11 @@ class TaskResponse(TaskBase):
     class Config:
         from_attributes = True
 
+class PrioritizedTask(TaskResponse):
+    due_date: Optional[datetime] = None
+    priority: int
+    score: float
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
@@ -87,10 +109,16 @@ class ChatResponse(BaseModel):
     title: str
     is_admin_chat: bool
     messages: Optional[List[MessageResponse]] = []
+    admin_last_read_id: Optional[int] = None
+    user_last_read_id: Optional[int] = None
 
     class Config:
         from_attributes = True
-        
+
+class AdminChatSummary(ChatResponse):
+    unread_count: int = 0
+    last_activity: Optional[datetime] = None
+
 class AdminStatusResponse(BaseModel):
     
     is_online: bool
@@ -100,4 +128,11 @@ class AdminStatusResponse(BaseModel):
         from_attributes = True
         
 class AdminStatusUpdate(BaseModel):
-    is_online: bool        
\ No newline at end of file
+    is_online: bool        
+
+class SearchHit(BaseModel):
+    type: str
+    id: int
+    score: int
+    task: Optional[TaskResponse] = None
+    message: Optional[MessageResponse] = None
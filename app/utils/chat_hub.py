@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+
+from fastapi.encoders import jsonable_encoder
+
+CHAT_HUB_BACKEND = os.getenv("CHAT_HUB_BACKEND", "memory")
+CHAT_HUB_REDIS_URL = os.getenv("CHAT_HUB_REDIS_URL", "redis://localhost:6379/0")
+CHAT_HUB_QUEUE_SIZE = int(os.getenv("CHAT_HUB_QUEUE_SIZE", "100"))
+
+logger = logging.getLogger(__name__)
+
+
+# Fan-out backends. publish() may be called from any thread; the backend hands
+# every published event (from this or another worker) to deliver(channels, event).
+class MemoryBackend:
+    """Delivers inside this process only (single uvicorn worker)."""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, channels, event):
+        self._deliver(channels, event)
+
+    def stop(self):
+        pass
+
+
+class RedisBackend:
+    """Shares events between uvicorn workers through a local Redis pub/sub channel."""
+
+    def __init__(self, url: str = CHAT_HUB_REDIS_URL, channel: str = "optitask:chat"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CHAT_HUB_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._thread = None
+
+    def start(self, deliver):
+        def on_message(message):
+            envelope = json.loads(message["data"])
+            deliver(envelope["channels"], envelope["event"])
+
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self._channel: on_message})
+        self._thread = pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def publish(self, channels, event):
+        self._client.publish(self._channel, json.dumps({"channels": list(channels), "event": event}))
+
+    def stop(self):
+        if self._thread:
+            self._thread.stop()
+            self._thread = None
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "redis": RedisBackend,
+}
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = set(channels)
+        self.queue = asyncio.Queue(maxsize=CHAT_HUB_QUEUE_SIZE)
+        # Set when the client falls too far behind; the socket is then closed
+        # and the client reloads over HTTP when it reconnects.
+        self.overflowed = False
+
+
+class ChatHub:
+    """In-process pub/sub keyed by channel ("chat:<id>", "admins", "presence")."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._loop = None
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def start(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        if self._backend is None:
+            if CHAT_HUB_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown CHAT_HUB_BACKEND '{CHAT_HUB_BACKEND}'")
+            self._backend = BACKENDS[CHAT_HUB_BACKEND]()
+        self._backend.start(self._deliver)
+
+    def stop(self):
+        if self._backend:
+            self._backend.stop()
+        self._loop = None
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def add_channel(self, subscription, channel):
+        with self._lock:
+            subscription.channels.add(channel)
+            self._channels.setdefault(channel, set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channels, event):
+        """Send an event to every subscriber of any of the channels. Safe to call from sync handlers."""
+        if self._loop is None:
+            return
+        try:
+            self._backend.publish(channels, jsonable_encoder(event))
+        except Exception:
+            logger.exception("Chat hub publish failed")
+
+    def _deliver(self, channels, event):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._dispatch, channels, event)
+
+    def _dispatch(self, channels, event):
+        # A subscriber listening on several of the channels gets the event once
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscription in targets:
+            if subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+
+
+chat_hub = ChatHub()
@@ -0,0 +1,123 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, ChatUnreadCounter, TaskListVersion, User
+
+# ETag / Last-Modified on the polled reads (/tasks/, /tasks/summary, /chats/admin).
+# The stamps only move when a change goes through the API; turn this off while
+# tasks or messages are also written some other way.
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "1") == "1"
+# task_list_versions row of the admin view (every task)
+ALL_TASKS = 0
+
+
+class Stamp(NamedTuple):
+    key: str
+    version: int
+    updated_at: Optional[datetime]
+
+
+# Task list versions. bump_task_versions only stages changes on the given
+# session, so a version moves exactly when the task change it covers commits.
+def _task_list_key(user: User):
+    return ALL_TASKS if user.role.value == "admin" else user.id
+
+
+async def bump_task_versions(db: AsyncSession, user_ids):
+    """Stage a new version of the task lists of these users (owners and assignees; None is skipped) and of the admin view."""
+    keys = sorted({ALL_TASKS, *(user_id for user_id in user_ids if user_id is not None)})
+    now = datetime.utcnow()
+    values = {TaskListVersion.version: TaskListVersion.version + 1, TaskListVersion.updated_at: now}
+    result = await db.execute(update(TaskListVersion).where(TaskListVersion.user_id.in_(keys)).values(values))
+    if result.rowcount == len(keys):
+        return
+
+    existing = set((await db.execute(
+        select(TaskListVersion.user_id).where(TaskListVersion.user_id.in_(keys))
+    )).scalars())
+    for key in keys:
+        if key in existing:
+            continue
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(TaskListVersion).values(user_id=key, version=1, updated_at=now))
+        except IntegrityError:
+            # Another request created it first
+            await db.execute(update(TaskListVersion).where(TaskListVersion.user_id == key).values(values))
+
+
+async def task_list_stamp(db: AsyncSession, user: User):
+    """Version of the tasks this user sees: one primary-key lookup."""
+    key = _task_list_key(user)
+    row = (await db.execute(
+        select(TaskListVersion.version, TaskListVersion.updated_at).where(TaskListVersion.user_id == key)
+    )).first()
+    # No row yet: nothing changed through the API since the table was added
+    return Stamp(f"tasks:{key}", row.version, row.updated_at) if row else Stamp(f"tasks:{key}", 0, None)
+
+
+def admin_chat_stamp_query(user_id: int):
+    return select(Chat.id, ChatUnreadCounter.version, ChatUnreadCounter.updated_at).join(
+        ChatUnreadCounter, ChatUnreadCounter.chat_id == Chat.id
+    ).where(Chat.user_id == user_id, Chat.is_admin_chat == True)
+
+
+async def admin_chat_stamp(db: AsyncSession, user: User):
+    """Version of the user's admin chat, kept on its unread counter row (None when there is none yet)."""
+    row = (await db.execute(admin_chat_stamp_query(user.id))).first()
+    return Stamp(f"chat:{row.id}", row.version, row.updated_at) if row else None
+
+
+def _etag_matches(header: str, etag: str):
+    if header.strip() == "*":
+        return True
+    # Weak comparison: a W/ prefix added by a proxy still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _modified_since(header: str, updated_at: datetime):
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    # Last-Modified is sent in whole seconds, so compare at that precision: the
+    # copy a client got stays current until a change in a later second
+    return updated_at.replace(microsecond=0, tzinfo=timezone.utc) > since
+
+
+def not_modified(request: Request, response: Response, stamp: Optional[Stamp], *variant):
+    """Set ETag / Last-Modified for stamp and return a 304 when the client's copy is current, else None.
+
+    variant holds whatever else the payload depends on (query parameters,
+    the current minute for time-based counters). Read the stamp before the
+    rows: a change committed in between then only costs one extra full response.
+    """
+    if not CONDITIONAL_GET_ENABLED or stamp is None:
+        return None
+    digest = hashlib.sha1(repr((stamp, variant)).encode()).hexdigest()[:24]
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "private, no-cache"}
+    if stamp.updated_at is not None:
+        headers["Last-Modified"] = format_datetime(stamp.updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        current = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        # Last-Modified does not see the variant, so only unvaried resources honour it
+        current = bool(if_modified_since) and not variant and stamp.updated_at is not None \
+            and not _modified_since(if_modified_since, stamp.updated_at)
+    if current:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+CONVERSATION_MAX_BYTES = int(os.getenv("CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "6000"))
+
+
+def estimate_tokens(message: dict) -> int:
+    # Rough count (~4 characters per token plus per-message overhead); good
+    # enough to keep prompts under the budget without loading a tokenizer.
+    return len(message["content"]) // 4 + 4
+
+
+def _message_bytes(message: dict) -> int:
+    return len(message["content"].encode("utf-8")) + len(message["role"])
+
+
+class _Session:
+    __slots__ = ("messages", "tokens", "bytes", "last_used")
+
+    def __init__(self):
+        self.messages = []
+        self.tokens = 0
+        self.bytes = 0
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """LRU + TTL store of chat sessions for /generate.
+
+    The system message is shared and prepended on read instead of being copied
+    into every session. Each session's history is trimmed from the oldest turn
+    so that system message + history stays within token_budget; whole sessions
+    are evicted least-recently-used first when max_sessions or max_bytes is hit.
+    """
+
+    def __init__(self, system_message: dict, max_sessions: int = CONVERSATION_MAX_SESSIONS,
+                 max_bytes: int = CONVERSATION_MAX_BYTES, ttl_seconds: float = CONVERSATION_TTL_SECONDS,
+                 token_budget: int = CONVERSATION_TOKEN_BUDGET):
+        self.system_message = system_message
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.history_budget = max(token_budget - estimate_tokens(system_message), 0)
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return self._get(session_id) is not None
+
+    @property
+    def total_bytes(self):
+        return self._bytes
+
+    def messages(self, session_id: str, pending: dict = None):
+        """Prompt for the session: system message, kept history and an optional new message."""
+        with self._lock:
+            session = self._get(session_id)
+            history = list(session.messages) if session else []
+        if pending is None:
+            return [self.system_message] + history
+
+        # Make room for the pending message the same way append() would
+        budget = self.history_budget - estimate_tokens(pending)
+        tokens = sum(estimate_tokens(message) for message in history)
+        while history and tokens > budget:
+            tokens -= estimate_tokens(history.pop(0))
+        while history and history[0]["role"] == "assistant":
+            history.pop(0)
+        return [self.system_message] + history + [pending]
+
+    def append(self, session_id: str, *messages: dict):
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                session = _Session()
+                self._sessions[session_id] = session
+            for message in messages:
+                session.messages.append(message)
+                session.tokens += estimate_tokens(message)
+                size = _message_bytes(message)
+                session.bytes += size
+                self._bytes += size
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self._trim(session)
+            self._evict()
+
+    def clear(self, session_id: str = None):
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                self._bytes = 0
+            elif session_id in self._sessions:
+                self._bytes -= self._sessions.pop(session_id).bytes
+
+    def _get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_used > self.ttl_seconds:
+            self._bytes -= self._sessions.pop(session_id).bytes
+            return None
+        return session
+
+    def _drop_oldest(self, session):
+        message = session.messages.pop(0)
+        session.tokens -= estimate_tokens(message)
+        size = _message_bytes(message)
+        session.bytes -= size
+        self._bytes -= size
+
+    def _trim(self, session):
+        # Drop the oldest turns but never the latest message
+        while session.tokens > self.history_budget and len(session.messages) > 1:
+            self._drop_oldest(session)
+        # A history must not start with an orphaned assistant reply
+        while len(session.messages) > 1 and session.messages[0]["role"] == "assistant":
+            self._drop_oldest(session)
+
+    def _evict(self):
+        now = time.monotonic()
+        # Expired sessions sit at the LRU end, so stop at the first live one
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_seconds:
+                break
+            self._bytes -= self._sessions.pop(session_id).bytes
+        while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+            _, session = self._sessions.popitem(last=False)
+            self._bytes -= session.bytes
@@ -1,25 +1,100 @@
 import os
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
-
-from dotenv import load_dotenv
-load_dotenv()
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
-SENDER_EMAIL = os.getenv("SENDER") 
-
-sg = sendgrid.SendGridAPIClient(api_key=SENDGRID_API_KEY)
-
-def send_email(to_email: str, subject: str, message: str):
-    """Send an email notification using SendGrid."""
-    from_email = Email(SENDER_EMAIL)
-    to_email = To(to_email)
-    content = Content("text/plain", message)
-    
-    mail = Mail(from_email, to_email, subject, content)
-    
-    try:
-        response = sg.client.mail.send.post(request_body=mail.get())
-        print(f"Email sent to {to_email}: {response.status_code}")
-    except Exception as e:
-        print(f"zError sending email: {e}")
\ No newline at end of file
+SENDER_EMAIL = os.getenv("SENDER")
+# Seconds each InMemoryTransport send takes, to stand in for the provider's latency
+EMAIL_FAKE_LATENCY = float(os.getenv("EMAIL_FAKE_LATENCY", "0"))
+
+
+# Transports: anything with a send(to_email, subject, message) method that
+# raises on failure. The outbox worker uses the failure to schedule a retry.
+class SendGridTransport:
+    name = "sendgrid"
+
+    def __init__(self, api_key: str = None):
+        # Imported here so the other transports (and app import) skip the SDK
+        import sendgrid
+
+        self._client = sendgrid.SendGridAPIClient(api_key=api_key or SENDGRID_API_KEY)
+
+    def send(self, to_email: str, subject: str, message: str):
+        from sendgrid.helpers.mail import Mail, Email, To, Content
+
+        mail = Mail(Email(SENDER_EMAIL), To(to_email), subject, Content("text/plain", message))
+        response = self._client.client.mail.send.post(request_body=mail.get())
+        if response.status_code >= 400:
+            raise RuntimeError(f"SendGrid returned {response.status_code}")
+        return response.status_code
+
+
+class SMTPTransport:
+    name = "smtp"
+
+    def __init__(self, host: str = None, port: int = None, username: str = None,
+                 password: str = None, use_tls: bool = None):
+        self.host = host or os.getenv("SMTP_HOST", "localhost")
+        self.port = port or int(os.getenv("SMTP_PORT", "587"))
+        self.username = username or os.getenv("SMTP_USERNAME")
+        self.password = password or os.getenv("SMTP_PASSWORD")
+        self.use_tls = use_tls if use_tls is not None else os.getenv("SMTP_USE_TLS", "1") == "1"
+
+    def send(self, to_email: str, subject: str, message: str):
+        mail = EmailMessage()
+        mail["From"] = SENDER_EMAIL
+        mail["To"] = to_email
+        mail["Subject"] = subject
+        mail.set_content(message)
+
+        with smtplib.SMTP(self.host, self.port, timeout=30) as server:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.send_message(mail)
+
+
+class InMemoryTransport:
+    """Keeps sent mails in a list instead of delivering them (tests, local runs, benchmarks)."""
+
+    name = "memory"
+
+    def __init__(self, latency: float = EMAIL_FAKE_LATENCY):
+        self.latency = latency
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_email: str, subject: str, message: str):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.sent.append({"to": to_email, "subject": subject, "message": message})
+
+
+TRANSPORTS = {
+    "sendgrid": SendGridTransport,
+    "smtp": SMTPTransport,
+    "memory": InMemoryTransport,
+}
+
+_transport = None
+
+
+def get_transport():
+    """Return the process-wide transport selected by EMAIL_TRANSPORT."""
+    global _transport
+    if _transport is None:
+        name = os.getenv("EMAIL_TRANSPORT", "sendgrid").lower()
+        if name not in TRANSPORTS:
+            raise ValueError(f"Unknown EMAIL_TRANSPORT '{name}'")
+        _transport = TRANSPORTS[name]()
+    return _transport
+
+
+def set_transport(transport):
+    global _transport
+    _transport = transport
+
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+
+from app.utils.request_metrics import request_metrics, service_name
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "0.05"))
+
+
+class LLMOverloaded(Exception):
+    """Raised when the wait queue is full or a request waited too long for a slot."""
+
+
+class GroqBackend:
+    name = "groq"
+
+    def __init__(self, api_key: str = None, max_connections: int = LLM_MAX_CONNECTIONS,
+                 timeout: float = LLM_REQUEST_TIMEOUT):
+        import httpx
+        from groq import AsyncGroq
+
+        # One keep-alive connection pool shared by every request in this worker
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        self._client = AsyncGroq(api_key=api_key or os.getenv("GROQ_API_KEY"), http_client=self._http)
+
+    async def complete(self, messages, model):
+        response = await self._client.chat.completions.create(messages=messages, model=model)
+        return response.choices[0].message.content
+
+    async def stream(self, messages, model):
+        stream = await self._client.chat.completions.create(messages=messages, model=model, stream=True)
+        try:
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+        finally:
+            await stream.close()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class FakeBackend:
+    """Answers locally after a fixed delay; for load tests without the real service."""
+
+    name = "fake"
+
+    def __init__(self, latency: float = LLM_FAKE_LATENCY, tokens: int = 20):
+        self.latency = latency
+        self.tokens = tokens
+
+    def _words(self, messages):
+        prompt = messages[-1]["content"] if messages else ""
+        return [f"{word} " for word in (f"You asked: {prompt}".split() + ["ok"] * self.tokens)[:self.tokens]]
+
+    async def complete(self, messages, model):
+        await asyncio.sleep(self.latency)
+        return "".join(self._words(messages)).strip()
+
+    async def stream(self, messages, model):
+        words = self._words(messages)
+        for word in words:
+            await asyncio.sleep(self.latency / len(words))
+            yield word
+
+    async def aclose(self):
+        pass
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "fake": FakeBackend,
+}
+
+
+class LLMClient:
+    """Async LLM client with a concurrency cap and a bounded wait queue.
+
+    At most max_concurrency calls are in flight; up to max_queue more wait for
+    a slot (at most queue_timeout seconds). Anything beyond that fails fast
+    with LLMOverloaded instead of piling up.
+    """
+
+    def __init__(self, backend=None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_queue: int = LLM_MAX_QUEUE, queue_timeout: float = LLM_QUEUE_TIMEOUT,
+                 request_timeout: float = LLM_REQUEST_TIMEOUT):
+        self._backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+
+    @property
+    def backend(self):
+        # Built on first use so importing the app does not touch the network
+        if self._backend is None:
+            if LLM_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'")
+            self._backend = BACKENDS[LLM_BACKEND]()
+        return self._backend
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    async def _acquire(self):
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+            self._in_flight += 1
+            return
+        if self._waiting >= self.max_queue:
+            raise LLMOverloaded("Too many assistant requests, please retry shortly")
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMOverloaded("Timed out waiting for the assistant, please retry shortly")
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+
+    def _release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def complete(self, messages, model):
+        await self._acquire()
+        # Timed from the slot being granted: queueing shows up in the request latency instead
+        started, ok = time.perf_counter(), False
+        try:
+            answer = await asyncio.wait_for(self.backend.complete(messages, model), self.request_timeout)
+            ok = True
+            return answer
+        finally:
+            request_metrics.observe_outbound(service_name(self.backend), "complete", time.perf_counter() - started, ok)
+            self._release()
+
+    async def stream(self, messages, model):
+        """Yield tokens; the slot is held until the stream ends or is closed."""
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.request_timeout
+        tokens = self.backend.stream(messages, model)
+        started, ok = time.perf_counter(), False
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    ok = True
+                    break
+                yield token
+        finally:
+            await tokens.aclose()
+            request_metrics.observe_outbound(service_name(self.backend), "stream", time.perf_counter() - started, ok)
+            self._release()
+
+    async def aclose(self):
+        if self._backend is not None:
+            await self._backend.aclose()
@@ -0,0 +1,162 @@
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Union
+
+from sqlalchemy import update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import EmailOutbox
+from app.utils.email_service import get_transport
+from app.utils.request_metrics import request_metrics, service_name
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "2"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_BACKOFF_SECONDS = float(os.getenv("EMAIL_BACKOFF_SECONDS", "30"))
+# A claimed row that is not finished within the lease is picked up again
+# (e.g. the worker process died mid-batch).
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+# Items listed by name in a coalesced notification email
+SUMMARY_MAX_LINES = 20
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(db: Union[Session, AsyncSession], to_email: str, subject: str, message: str):
+    """Add an email to the outbox. It is sent once the caller's transaction commits."""
+    entry = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=message,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(entry)
+    return entry
+
+
+def enqueue_summary(db: Union[Session, AsyncSession], to_email: str, subject: str, intro: str, lines):
+    """Queue one email that lists every item of a batch concerning a recipient."""
+    shown = [f"- {line}" for line in lines[:SUMMARY_MAX_LINES]]
+    if len(lines) > SUMMARY_MAX_LINES:
+        shown.append(f"- ...and {len(lines) - SUMMARY_MAX_LINES} more")
+    return enqueue_email(db, to_email, subject, intro + "\n" + "\n".join(shown))
+
+
+class OutboxWorker:
+    """Thread pool that drains the email outbox in batches."""
+
+    def __init__(self, transport=None, workers: int = EMAIL_WORKERS,
+                 batch_size: int = EMAIL_BATCH_SIZE, poll_interval: float = EMAIL_POLL_INTERVAL,
+                 max_attempts: int = EMAIL_MAX_ATTEMPTS, backoff_seconds: float = EMAIL_BACKOFF_SECONDS,
+                 session_factory=SessionLocal):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception:
+                logger.exception("Outbox worker error")
+                processed = 0
+            # Keep going while there is a backlog, otherwise sleep until the next poll
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def _backoff(self, attempts: int):
+        delay = self.backoff_seconds * (2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def drain_once(self):
+        """Claim one batch of due rows, send them and record the outcome. Returns the batch size."""
+        transport = self.transport or get_transport()
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            due_ids = [
+                row.id for row in db.query(EmailOutbox.id)
+                .filter(
+                    or_(EmailOutbox.status == "pending", EmailOutbox.status == "sending"),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+                .limit(self.batch_size)
+                .all()
+            ]
+            if not due_ids:
+                return 0
+
+            # Claim the batch in one statement; rows grabbed by another worker in
+            # the meantime no longer match the status/next_attempt_at condition.
+            token = str(uuid.uuid4())
+            db.execute(
+                update(EmailOutbox)
+                .where(
+                    EmailOutbox.id.in_(due_ids),
+                    or_(EmailOutbox.status == "pending", EmailOutbox.status == "sending"),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .values(
+                    status="sending",
+                    claim_token=token,
+                    next_attempt_at=now + timedelta(seconds=EMAIL_LEASE_SECONDS),
+                )
+            )
+            db.commit()
+
+            batch = db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).all()
+            for entry in batch:
+                started = time.perf_counter()
+                try:
+                    transport.send(entry.to_email, entry.subject, entry.body)
+                    request_metrics.observe_outbound(service_name(transport), "send", time.perf_counter() - started)
+                    entry.status = "sent"
+                    entry.sent_at = datetime.utcnow()
+                    entry.last_error = None
+                except Exception as e:
+                    request_metrics.observe_outbound(service_name(transport), "send", time.perf_counter() - started,
+                                                     ok=False)
+                    entry.attempts += 1
+                    entry.last_error = str(e)[:500]
+                    if entry.attempts >= self.max_attempts:
+                        entry.status = "failed"
+                    else:
+                        entry.status = "pending"
+                        entry.next_attempt_at = datetime.utcnow() + self._backoff(entry.attempts)
+                entry.claim_token = None
+            db.commit()
+            return len(batch)
+        finally:
+            db.close()
@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+# Opaque continuation tokens for keyset pagination. A token is the sort key of
+# the last row of a page plus whatever the endpoint needs to check it is used
+# with the same ordering it was issued for.
+def encode_cursor(data: dict) -> str:
+    payload = {
+        key: {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in data.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            raise ValueError("cursor is not an object")
+        return {
+            key: datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+            for key, value in payload.items()
+        }
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
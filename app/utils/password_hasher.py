@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max((os.cpu_count() or 2) // 2, 1))))
+# Hash/verify jobs allowed to run or wait for a worker; beyond that auth
+# requests are rejected with 503 instead of queueing behind each other.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+# The pool starts after the outbox, reminder and hub threads; forking a threaded
+# process can copy a lock some other thread holds, so workers are never forked
+# from the app process.
+PASSWORD_HASH_START_METHOD = os.getenv(
+    "PASSWORD_HASH_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+
+def make_context(rounds: int = BCRYPT_ROUNDS):
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# These run in the worker processes, so they must be importable top-level functions
+def _hash(password: str, rounds: int):
+    return make_context(rounds).hash(password)
+
+
+def _verify(password: str, hashed_password: str):
+    return make_context().verify(password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already pending."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool so it never occupies request threads."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, rounds: int = BCRYPT_ROUNDS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING, timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.context = make_context(rounds)
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(PASSWORD_HASH_START_METHOD)
+            )
+        return self._executor
+
+    def _discard(self, executor):
+        """Drop a broken pool; the next job starts a fresh one."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # another job already replaced it
+            self._executor = None
+        logger.warning("Password hasher pool broke (a worker died); starting a new one")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, future):
+        # A job that timed out still holds its worker until bcrypt returns, so
+        # it keeps counting against max_pending until then.
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args):
+        executor = self._pool()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died since the last job: nothing of ours ran, retry once on a new pool
+            self._discard(executor)
+            executor = self._pool()
+            return executor, executor.submit(fn, *args)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy("Too many login attempts in progress, please retry shortly")
+            self._pending += 1
+        try:
+            executor, future = self._submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    async def hash(self, password: str):
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str):
+        return await self._run(_verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str):
+        """True when the hash was made with a different work factor than BCRYPT_ROUNDS."""
+        return self.context.needs_update(hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import chain
+from typing import NamedTuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Task
+
+# Weights of the three signals in the smart score (see score_tasks)
+SMART_WEIGHT_DUE = float(os.getenv("SMART_WEIGHT_DUE", "0.5"))
+SMART_WEIGHT_PRIORITY = float(os.getenv("SMART_WEIGHT_PRIORITY", "0.35"))
+SMART_WEIGHT_LOAD = float(os.getenv("SMART_WEIGHT_LOAD", "0.15"))
+# A task due this many days out has about a third of the urgency of one due now
+SMART_HORIZON_DAYS = float(os.getenv("SMART_HORIZON_DAYS", "7"))
+SMART_CACHE_SIZE = int(os.getenv("SMART_CACHE_SIZE", "256"))
+# Other workers' task changes are only seen after this long
+SMART_CACHE_TTL_SECONDS = float(os.getenv("SMART_CACHE_TTL_SECONDS", "30"))
+
+LOWEST_PRIORITY = 5
+COMPLETED_SCORE = -1.0
+_EPOCH = datetime(1970, 1, 1)
+_DAY_SECONDS = 86400.0
+
+
+class SmartWeights(NamedTuple):
+    due: float = SMART_WEIGHT_DUE
+    priority: float = SMART_WEIGHT_PRIORITY
+    load: float = SMART_WEIGHT_LOAD
+
+
+def _seconds(moment: datetime):
+    # Naive UTC datetimes, as stored; much faster than converting to datetime64
+    return (moment - _EPOCH).total_seconds()
+
+
+def score_tasks(due_seconds, priorities, assignees, now: datetime = None,
+                weights: SmartWeights = SmartWeights(), horizon_days: float = SMART_HORIZON_DAYS,
+                open_counts=None):
+    """Score tasks in one vectorized pass; higher means do it sooner.
+
+    due_seconds: epoch seconds (NaN = no due date), priorities: 1 (highest)
+    to 5, assignees: user ids (-1 = unassigned). Each signal is in [0, 1],
+    except urgency, which grows to 2 as a task becomes a horizon overdue:
+      urgency    exp(-days_left / horizon) when due, 1 + days_late / horizon when late
+      importance (5 - priority) / 4
+      load       assignee's open task count / busiest assignee's count
+    open_counts ({assignee id: open tasks}, from assignee_load_query) gives the
+    counts over all tasks; without it they are counted among the scored tasks.
+    """
+    import numpy as np
+
+    days_left = (due_seconds - _seconds(now or datetime.utcnow())) / _DAY_SECONDS
+    horizon = max(horizon_days, 1e-9)
+    with np.errstate(over="ignore", invalid="ignore"):
+        urgency = np.where(
+            days_left >= 0,
+            np.exp(-days_left / horizon),
+            1.0 + np.minimum(-days_left, horizon) / horizon,
+        )
+    urgency = np.nan_to_num(urgency, nan=0.0)
+
+    importance = (LOWEST_PRIORITY - np.clip(priorities, 1, LOWEST_PRIORITY)) / (LOWEST_PRIORITY - 1)
+
+    load = np.zeros(len(assignees))
+    assigned = assignees >= 0
+    if open_counts:
+        known = np.fromiter(open_counts, dtype=np.int64, count=len(open_counts))
+        counts = np.fromiter(open_counts.values(), dtype=np.float64, count=len(open_counts))
+        order = np.argsort(known)
+        known, counts = known[order], counts[order]
+        position = np.clip(np.searchsorted(known, assignees[assigned]), 0, len(known) - 1)
+        found = known[position] == assignees[assigned]
+        # An assignee missing from the counts (assigned after they were read) counts as idle
+        load[assigned] = np.where(found, counts[position], 0.0) / counts.max()
+    elif assigned.any():
+        _, inverse, counts = np.unique(assignees[assigned], return_inverse=True, return_counts=True)
+        load[assigned] = counts[inverse] / counts.max()
+
+    return weights.due * urgency + weights.priority * importance + weights.load * load
+
+
+class Ranking:
+    """Task ids best-first with their scores; ties go to the lower id."""
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    def after(self, score: float, task_id: int):
+        """Index of the first entry ranked after (score, task_id), for keyset cursors."""
+        import numpy as np
+
+        later = (self.scores < score) | ((self.scores == score) & (self.ids > task_id))
+        return int(np.argmax(later)) if later.any() else len(self.ids)
+
+
+def assignee_load_query():
+    """Open tasks per assignee over the whole table, whatever the list being ranked shows."""
+    return (
+        select(Task.assigned_to_id, func.count(Task.id))
+        .where(Task.assigned_to_id.is_not(None), Task.completed == False)
+        .group_by(Task.assigned_to_id)
+    )
+
+
+def rank(rows, now: datetime = None, weights: SmartWeights = SmartWeights(), open_counts=None):
+    """Rank (id, due_date, priority, assigned_to_id, completed) rows; completed tasks go last.
+
+    open_counts: {assignee id: open tasks} for the load signal (see score_tasks).
+    """
+    import numpy as np
+
+    count = len(rows)
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    due_seconds = np.fromiter(
+        (np.nan if row[1] is None else _seconds(row[1]) for row in rows), dtype=np.float64, count=count
+    )
+    priorities = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+    assignees = np.fromiter((-1 if row[3] is None else row[3] for row in rows), dtype=np.int64, count=count)
+    completed = np.fromiter((bool(row[4]) for row in rows), dtype=bool, count=count)
+
+    scores = np.zeros(count)
+    if count:
+        scores[~completed] = score_tasks(
+            due_seconds[~completed], priorities[~completed], assignees[~completed], now, weights,
+            open_counts=open_counts,
+        )
+        scores[completed] = COMPLETED_SCORE
+    # Rounded so a score survives the JSON round-trip through a cursor unchanged
+    scores = np.round(scores, 6)
+    order = np.lexsort((ids, -scores))
+    return Ranking(ids[order], scores[order])
+
+
+class RankingCache:
+    """LRU + TTL cache of rankings, cleared whenever a transaction changes tasks."""
+
+    def __init__(self, max_entries: int = SMART_CACHE_SIZE, ttl_seconds: float = SMART_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, ranking: Ranking):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (ranking, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+smart_rankings = RankingCache()
+
+
+# Invalidation: note task writes on the session (unit of work and bulk
+# insert/update/delete statements alike), drop the rankings once they commit.
+@event.listens_for(Session, "after_flush")
+def _note_flushed_tasks(session, flush_context):
+    if any(isinstance(obj, Task) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["tasks_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_task_statements(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Task:
+        orm_execute_state.session.info["tasks_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_rankings(session):
+    if session.info.pop("tasks_changed", False):
+        smart_rankings.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_task_changes(session):
+    session.info.pop("tasks_changed", None)
@@ -0,0 +1,148 @@
+import re
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import text
+
+from app.database import engine as default_engine
+from app.models import Role, User
+
+# Tables the hot queries must never read with a full scan
+HOT_TABLES = ("tasks", "chats", "chat_messages", "chat_unread_counters")
+
+
+class HotQuery(NamedTuple):
+    statement: object
+    # Set for the reads that may walk a whole index from one end:
+    #   "top-n":     a first page in index order; it stops after LIMIT rows
+    #   "aggregate": admin-wide counters over every row, from a covering index
+    #   "grouped":   admin-wide counters per group, streamed in index order (no sort)
+    scan: str = None
+
+
+def hot_queries(user_id: int = 1, chat_id: int = 1, page_size: int = 50):
+    """The statements the routers run on every request, built by the routers' own query builders."""
+    from app.routes.chats import (
+        admin_inbox_query, chat_history_query, mark_read_statement, message_page_query,
+        own_admin_chat_query, recent_messages_query,
+    )
+    from app.routes.tasks import summary_query, task_list_query
+    from app.models import Task
+    from app.utils.conditional_get import admin_chat_stamp_query
+    from app.utils.prioritization import assignee_load_query
+    from app.utils.reminders import reminder_scheduler
+    from app.utils.unread_counters import unread_by_user_query, unread_count_query
+
+    now = datetime.utcnow()
+    admin = User(id=user_id, role=Role.admin)
+    member = User(id=user_id, role=Role.user)
+    next_page = {"value": now, "id": 1000}
+    window = reminder_scheduler.window
+
+    return {
+        "tasks.list (admin)": HotQuery(task_list_query(admin, [], "due_date", "asc").limit(page_size + 1), "top-n"),
+        "tasks.list (admin, next page)": HotQuery(
+            task_list_query(admin, [], "due_date", "asc", next_page).limit(page_size + 1)
+        ),
+        "tasks.list (admin, filtered)": HotQuery(task_list_query(
+            admin, [Task.completed == False, Task.priority == 1], "due_date", "asc"
+        ).limit(page_size + 1)),
+        "tasks.list (user)": HotQuery(task_list_query(member, [], "due_date", "asc").limit(page_size + 1)),
+        "tasks.summary (user)": HotQuery(summary_query(member, False, now)),
+        "tasks.summary (admin)": HotQuery(summary_query(admin, False, now), "aggregate"),
+        "tasks.summary (admin, by assignee)": HotQuery(summary_query(admin, True, now), "grouped"),
+        "tasks.smart (assignee load)": HotQuery(assignee_load_query(), "grouped"),
+        "reminders (next window)": HotQuery(reminder_scheduler.window_query(now, None, now + window)),
+        "chats.admin (own chat)": HotQuery(own_admin_chat_query(user_id)),
+        "chats.admin (version)": HotQuery(admin_chat_stamp_query(user_id)),
+        "chats.admin (history)": HotQuery(chat_history_query(chat_id)),
+        "chats.admin/all (inbox)": HotQuery(admin_inbox_query(page_size + 1), "top-n"),
+        "chats.admin/all (inbox, next page)": HotQuery(
+            admin_inbox_query(page_size + 1, {"last_activity": now, "id": chat_id})
+        ),
+        "chats.admin/all (recent messages)": HotQuery(recent_messages_query([chat_id, chat_id + 1], 20)),
+        "chats.admin/{id}/messages": HotQuery(message_page_query(chat_id, 1000, page_size)),
+        "chats.unread (admin)": HotQuery(unread_by_user_query()),
+        "chats.unread (per chat)": HotQuery(unread_count_query(chat_id, for_admin=True)),
+        "chats.read (mark range)": HotQuery(mark_read_statement(chat_id, True, 10, 1000)),
+    }
+
+
+def explain(connection, statement):
+    """Return the plan of a statement as a list of lines, for the connection's dialect.
+
+    SQLite lines are indented two spaces per level below the top of the plan.
+    """
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        depth, lines = {0: -1}, []
+        for node_id, parent, _, detail in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"):
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+    if dialect == "postgresql":
+        # Tiny tables are cheaper to scan; ask whether an index is usable at all
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+    if dialect == "mssql":
+        connection.exec_driver_sql("SET SHOWPLAN_TEXT ON")
+        try:
+            result = connection.exec_driver_sql(sql)
+            lines = [row[0] for row in result]
+            while result.cursor.nextset():
+                lines.extend(row[0] for row in result.cursor.fetchall())
+            return lines
+        finally:
+            connection.exec_driver_sql("SET SHOWPLAN_TEXT OFF")
+    raise ValueError(f"EXPLAIN is not supported for dialect '{dialect}'")
+
+
+_INDEX_MARKERS = {
+    "sqlite": re.compile(r"USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY|USING PRIMARY KEY"),
+    "postgresql": re.compile(r"Index Scan|Index Only Scan|Bitmap Index Scan"),
+    "mssql": re.compile(r"Index Seek|Index Scan"),
+}
+
+
+def _scan_allowed(dialect, line, lines, scan):
+    if dialect == "sqlite":
+        if any("TEMP B-TREE" in other for other in lines):
+            return False
+        if scan in ("top-n", "grouped"):
+            # Only at the top of the plan does the LIMIT / group order apply to the walk
+            return not line.startswith(" ") and "USING" in line and "INDEX" in line
+        return scan == "aggregate" and "USING COVERING INDEX" in line
+    # PostgreSQL / SQL Server: an index walk, never a heap or table scan
+    return scan is not None and "Index" in line
+
+
+def _full_scans(dialect, lines, scan=None):
+    """Plan lines that read a whole hot table (or a whole index of one) and are not an allowed scan."""
+    tables = "|".join(HOT_TABLES)
+    patterns = {
+        # With or without USING INDEX: a SCAN visits every entry
+        "sqlite": rf"^SCAN ({tables})\b",
+        "postgresql": rf"(Seq Scan|Index Scan|Index Only Scan)( Backward)? (using \w+ )?on ({tables})\b(?!.*\n?\s*Index Cond)",
+        "mssql": rf"(Table Scan|Clustered Index Scan|Index Scan)\(OBJECT:\(\[[^\]]+\]\.\[[^\]]+\]\.\[({tables})\]",
+    }
+    return [
+        line for line in lines
+        if re.search(patterns[dialect], line.strip()) and not _scan_allowed(dialect, line, lines, scan)
+    ]
+
+
+def check_plans(engine=default_engine, **params):
+    """Explain every hot query. Returns [(name, uses_index, plan lines)]."""
+    results = []
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        for name, query in hot_queries(**params).items():
+            with connection.begin() as transaction:
+                lines = explain(connection, query.statement)
+                # EXPLAIN of the UPDATE runs nothing, but keep the check read-only regardless
+                transaction.rollback()
+            uses_index = bool(_INDEX_MARKERS[dialect].search("\n".join(lines))) \
+                and not _full_scans(dialect, lines, query.scan)
+            results.append((name, uses_index, lines))
+    return results
@@ -0,0 +1,320 @@
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, inspect, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from app.database import SessionLocal
+from app.models import SchedulerState, Task, User
+from app.utils.outbox import enqueue_summary
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1") == "1"
+# A reminder goes out this long before a task is due
+REMINDER_LEAD_MINUTES = float(os.getenv("REMINDER_LEAD_MINUTES", "1440"))
+# Upcoming reminders are loaded one window ahead, with one due_date range query
+# on ix_tasks_due (completed tasks in the range are dropped after the read)
+REMINDER_WINDOW_MINUTES = float(os.getenv("REMINDER_WINDOW_MINUTES", "60"))
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "5"))
+# Most reminders handled per tick; a backlog is worked off without sleeping
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_LOAD_CHUNK_SIZE = 5000
+
+STATE_NAME = "task_reminders"
+# Rebuild the heap once it holds this many superseded entries
+_COMPACT_SLACK = 1024
+
+
+class ReminderScheduler:
+    """Min-heap of (fire_at, task_id) reminders, fed by window loads and committed task changes.
+
+    A task changed after its window was loaded replaces its entry in
+    _scheduled; the old heap entry is skipped when it surfaces. Every worker
+    runs a scheduler, so each reminder is claimed on its task row
+    (tasks.reminded_due) in the transaction that queues its email, and only
+    the worker whose claim lands sends it. The high-water mark is where a
+    restart resumes; it only moves forward.
+    """
+
+    def __init__(self, lead_minutes: float = REMINDER_LEAD_MINUTES,
+                 window_minutes: float = REMINDER_WINDOW_MINUTES,
+                 tick_interval: float = REMINDER_TICK_SECONDS,
+                 batch_size: int = REMINDER_BATCH_SIZE,
+                 session_factory=SessionLocal):
+        self.lead = timedelta(minutes=lead_minutes)
+        self.window = timedelta(minutes=window_minutes)
+        self.tick_interval = tick_interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.sent = 0
+        self.skipped = 0
+        self.windows_loaded = 0
+        self._heap = []
+        self._scheduled = {}        # task id -> fire time of its live heap entry
+        self._loaded_until = None   # fire times up to here are in the heap
+        self._touched = None        # ids changed while a window loads
+        self._high_water = None     # (fire_at, task_id) of the last reminder handled
+        self._saved_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        with self._lock:
+            # Changes committed before the first window load win over what it reads
+            self._touched = set()
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.tick()
+            except Exception:
+                logger.exception("Reminder scheduler error")
+                handled = 0
+            if handled < self.batch_size:
+                self._stop.wait(self.tick_interval)
+
+    def apply(self, changes):
+        """Take committed (task_id, due_date, completed) changes into account; due_date None = deleted."""
+        if not self.running:
+            return
+        with self._lock:
+            for task_id, due_date, completed in changes:
+                if self._touched is not None:
+                    self._touched.add(task_id)
+                fire_at = None if completed or due_date is None else due_date - self.lead
+                if fire_at is None or (self._loaded_until is not None and fire_at > self._loaded_until):
+                    # Nothing to send, or a later window query will find it
+                    self._scheduled.pop(task_id, None)
+                elif self._scheduled.get(task_id) != fire_at:
+                    self._scheduled[task_id] = fire_at
+                    heapq.heappush(self._heap, (fire_at, task_id))
+            if len(self._heap) > 2 * len(self._scheduled) + _COMPACT_SLACK:
+                self._heap = [(fire_at, task_id) for task_id, fire_at in self._scheduled.items()]
+                heapq.heapify(self._heap)
+
+    def tick(self, now: datetime = None):
+        """Load the next window if due, then send what is due. Returns the reminders handled."""
+        now = now or datetime.utcnow()
+        if self._high_water is None:
+            self._restore(now)
+        if self._loaded_until is None or self._loaded_until - now < self.window / 2:
+            self._load_window(now + self.window)
+
+        due = []
+        with self._lock:
+            while self._heap and len(due) < self.batch_size and self._heap[0][0] <= now:
+                fire_at, task_id = heapq.heappop(self._heap)
+                if self._scheduled.get(task_id) == fire_at:
+                    del self._scheduled[task_id]
+                    due.append((fire_at, task_id))
+            caught_up = not self._heap or self._heap[0][0] > now
+
+        # Once nothing due is left, a restart can resume from now
+        high_water = max(due[-1], self._high_water) if due else self._high_water
+        if caught_up:
+            high_water = max(high_water, (now, 0))
+        if due or now - self._saved_at >= self.window:
+            self._send(due, high_water, now)
+        return len(due)
+
+    def _restore(self, now: datetime):
+        db = self.session_factory()
+        try:
+            state = db.get(SchedulerState, STATE_NAME)
+            if state is None:
+                # First run: start one lead back, so tasks already due within
+                # the lead get their reminder on the first tick
+                try:
+                    state = SchedulerState(name=STATE_NAME, high_water_at=now - self.lead, high_water_id=0)
+                    db.add(state)
+                    db.commit()
+                except IntegrityError:
+                    # Another worker's scheduler created it first
+                    db.rollback()
+                    state = db.get(SchedulerState, STATE_NAME)
+            self._high_water = (state.high_water_at, state.high_water_id)
+            self._saved_at = now
+        finally:
+            db.close()
+
+    def window_query(self, start: datetime, after_id, until: datetime):
+        """Tasks whose reminder falls after (start, after_id) and up to until.
+
+        Only due_date is bounded, so the read is one range on ix_tasks_due;
+        the caller skips the completed ones.
+        """
+        lower = start + self.lead
+        if after_id is None:
+            condition = Task.due_date > lower
+        else:
+            condition = and_(Task.due_date >= lower, or_(Task.due_date > lower, Task.id > after_id))
+        return select(Task.id, Task.due_date, Task.completed).where(condition, Task.due_date <= until + self.lead)
+
+    def _load_window(self, until: datetime):
+        """One range query for the tasks whose reminder falls in (loaded_until, until]."""
+        with self._lock:
+            previous = self._loaded_until
+            self._loaded_until = until
+            if self._touched is None:
+                self._touched = set()
+        # The first window starts right after the persisted high-water mark
+        start, after_id = (previous, None) if previous is not None else self._high_water
+        query = self.window_query(start, after_id, until).execution_options(yield_per=REMINDER_LOAD_CHUNK_SIZE)
+
+        db = self.session_factory()
+        try:
+            for chunk in db.execute(query).partitions():
+                with self._lock:
+                    for task_id, due_date, completed in chunk:
+                        if completed or task_id in self._touched:
+                            continue
+                        fire_at = due_date - self.lead
+                        self._scheduled[task_id] = fire_at
+                        heapq.heappush(self._heap, (fire_at, task_id))
+        except Exception:
+            with self._lock:
+                self._loaded_until = previous
+            raise
+        finally:
+            db.close()
+            with self._lock:
+                self._touched = None
+        self.windows_loaded += 1
+
+    def _send(self, due, high_water, now: datetime):
+        """Queue one email per recipient for the due reminders and move the high-water mark."""
+        db = self.session_factory()
+        try:
+            lines_by_email = {}
+            if due:
+                fire_times = {task_id: fire_at for fire_at, task_id in due}
+                owner, assignee = aliased(User), aliased(User)
+                rows = db.execute(
+                    select(Task.id, Task.title, Task.due_date, Task.completed,
+                           owner.email.label("owner_email"), assignee.email.label("assignee_email"))
+                    .join(owner, owner.id == Task.owner_id)
+                    .outerjoin(assignee, assignee.id == Task.assigned_to_id)
+                    .where(Task.id.in_(list(fire_times)))
+                )
+                for row in rows:
+                    # Changed since it was scheduled (a newer entry covers it), done, already late,
+                    # or claimed by another worker's scheduler
+                    if row.completed or row.due_date is None or row.due_date - self.lead != fire_times[row.id] \
+                            or row.due_date <= now or not self._claim(db, row.id, row.due_date):
+                        self.skipped += 1
+                        continue
+                    lines_by_email.setdefault(row.assignee_email or row.owner_email, []).append(
+                        f"{row.title} (due {row.due_date:%Y-%m-%d %H:%M} UTC)"
+                    )
+
+            for email, lines in lines_by_email.items():
+                enqueue_summary(db, email, "Tasks Due Soon", f"{len(lines)} of your tasks are due soon:", lines)
+            high_water_at, high_water_id = high_water
+            db.execute(update(SchedulerState).where(
+                SchedulerState.name == STATE_NAME,
+                or_(SchedulerState.high_water_at < high_water_at,
+                    and_(SchedulerState.high_water_at == high_water_at, SchedulerState.high_water_id < high_water_id)),
+            ).values(high_water_at=high_water_at, high_water_id=high_water_id))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put them back; the next tick tries again
+            with self._lock:
+                for fire_at, task_id in due:
+                    if task_id not in self._scheduled:
+                        self._scheduled[task_id] = fire_at
+                        heapq.heappush(self._heap, (fire_at, task_id))
+            raise
+        finally:
+            db.close()
+
+        self._high_water = high_water
+        self._saved_at = now
+        self.sent += sum(len(lines) for lines in lines_by_email.values())
+
+    @staticmethod
+    def _claim(db, task_id: int, due_date: datetime):
+        """Mark the reminder for this due date as sent; False when another worker already did."""
+        result = db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.due_date == due_date,
+                   or_(Task.reminded_due.is_(None), Task.reminded_due != due_date))
+            .values(reminded_due=due_date)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._scheduled)
+            heap_size = len(self._heap)
+            next_at = self._heap[0][0] if self._heap else None
+        return {
+            "running": self.running,
+            "pending": pending,
+            "heap_size": heap_size,
+            "next_reminder_at": next_at,
+            "loaded_until": self._loaded_until,
+            "high_water_at": self._high_water[0] if self._high_water else None,
+            "windows_loaded": self.windows_loaded,
+            "sent": self.sent,
+            "skipped": self.skipped,
+        }
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+def note_task_changes(session, changes):
+    """Record (task_id, due_date, completed) for tasks changed by bulk statements.
+
+    Unit-of-work changes are picked up on flush; either way the scheduler
+    sees them once the transaction commits.
+    """
+    session.info.setdefault("reminder_changes", []).extend(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_tasks(session, flush_context):
+    changes = [(obj.id, obj.due_date, obj.completed) for obj in session.new if isinstance(obj, Task)]
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            attrs = inspect(obj).attrs
+            if attrs.due_date.history.has_changes() or attrs.completed.history.has_changes():
+                changes.append((obj.id, obj.due_date, obj.completed))
+    changes.extend((obj.id, None, True) for obj in session.deleted if isinstance(obj, Task))
+    if changes:
+        note_task_changes(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed_tasks(session):
+    changes = session.info.pop("reminder_changes", None)
+    if changes:
+        reminder_scheduler.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_task_changes(session):
+    session.info.pop("reminder_changes", None)
@@ -0,0 +1,338 @@
+import contextvars
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from sqlalchemy import event
+
+# Log one line for this fraction of requests (0 = off, 1 = every request)
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0"))
+# Upper bounds (seconds) of the histogram buckets; one more bucket catches the rest
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# The same statement shape this many times in one request is reported as a likely N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+# Add X-DB-Queries / X-DB-Time-Ms / X-DB-Repeated to every response (development, tests, benchmarks)
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "0") == "1"
+
+access_logger = logging.getLogger("app.access")
+sql_logger = logging.getLogger("app.sql")
+
+_PLACEHOLDER = re.compile(r"\?|%s|%\(\w+\)s|\$\d+|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str):
+    """The statement with parameters and IN lists normalized, so repeats of one query compare equal."""
+    shape = _PLACEHOLDER.sub("?", _WHITESPACE.sub(" ", statement).strip())
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class QueryStats:
+    """Statements run for one request (or one query_budget block)."""
+
+    __slots__ = ("queries", "seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD):
+        """[(shape, count)] run at least threshold times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+# Statements of the request being handled (None outside requests)
+_request_stats = contextvars.ContextVar("request_query_stats", default=None)
+# Open query_budget blocks; they see statements from every thread
+_budgets = []
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        other = Histogram(self.buckets)
+        other.counts, other.sum, other.count = list(self.counts), self.sum, self.count
+        return other
+
+
+def _labels(**labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+class RequestMetrics:
+    """Per-process request and outbound-call metrics, rendered in the Prometheus text format.
+
+    Requests are keyed by route template (/tasks/{task_id}), not the raw
+    path, so the number of series stays bounded.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._latency = defaultdict(Histogram)      # (method, route)
+        self._db_time = defaultdict(Histogram)      # (method, route)
+        self._db_queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))  # (method, route)
+        self._repeated = Counter()                  # (method, route): requests with a likely N+1
+        self._statuses = Counter()                  # (method, route, status)
+        self._outbound = defaultdict(Histogram)     # (service, operation)
+        self._outbound_errors = Counter()           # (service, operation)
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: QueryStats):
+        repeated = stats.repeated()
+        with self._lock:
+            self._latency[(method, route)].observe(seconds)
+            self._db_time[(method, route)].observe(stats.seconds)
+            self._db_queries[(method, route)].observe(stats.queries)
+            self._statuses[(method, route, status)] += 1
+            if repeated:
+                self._repeated[(method, route)] += 1
+                first_time = self._repeated[(method, route)] == 1
+        if repeated and first_time:
+            shape, count = repeated[0]
+            sql_logger.warning(f"Likely N+1 in {method} {route}: {count}x {shape}")
+
+    def observe_outbound(self, service: str, operation: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._outbound[(service, operation)].observe(seconds)
+            if not ok:
+                self._outbound_errors[(service, operation)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._db_time.clear()
+            self._db_queries.clear()
+            self._repeated.clear()
+            self._statuses.clear()
+            self._outbound.clear()
+            self._outbound_errors.clear()
+
+    def render(self):
+        with self._lock:
+            latency = {key: histogram.copy() for key, histogram in self._latency.items()}
+            db_time = {key: histogram.copy() for key, histogram in self._db_time.items()}
+            db_queries = {key: histogram.copy() for key, histogram in self._db_queries.items()}
+            repeated = dict(self._repeated)
+            outbound = {key: histogram.copy() for key, histogram in self._outbound.items()}
+            statuses = dict(self._statuses)
+            outbound_errors = dict(self._outbound_errors)
+
+        lines = [
+            "# HELP http_requests_in_flight Requests being handled by this process.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        lines += [
+            f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}"
+            for (method, route, status), count in sorted(statuses.items())
+        ]
+        lines += _histogram_lines("http_request_duration_seconds", "Request latency.",
+                                  latency, ("method", "route"))
+        lines += _histogram_lines("http_request_db_seconds", "Time spent in SQL per request.",
+                                  db_time, ("method", "route"))
+        lines += _histogram_lines("http_request_db_queries", "SQL statements per request.",
+                                  db_queries, ("method", "route"))
+        lines += [
+            "# HELP http_request_repeated_queries_total Requests that ran one statement shape "
+            f"{SQL_REPEAT_THRESHOLD}+ times (likely N+1).",
+            "# TYPE http_request_repeated_queries_total counter",
+        ]
+        lines += [
+            f"http_request_repeated_queries_total{{{_labels(method=method, route=route)}}} {count}"
+            for (method, route), count in sorted(repeated.items())
+        ]
+        lines += _histogram_lines("outbound_request_duration_seconds", "Calls to external services.",
+                                  outbound, ("service", "operation"))
+        lines += [
+            "# HELP outbound_request_errors_total Failed calls to external services.",
+            "# TYPE outbound_request_errors_total counter",
+        ]
+        lines += [
+            f"outbound_request_errors_total{{{_labels(service=service, operation=operation)}}} {count}"
+            for (service, operation), count in sorted(outbound_errors.items())
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, help_text: str, histograms: dict, label_names):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        labels = _labels(**dict(zip(label_names, key)))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+request_metrics = RequestMetrics()
+
+
+def _route_template(scope):
+    """Path template of the matched route, prefix included; "unmatched" before/without a match."""
+    # Routes of an included router only know their own path; FastAPI keeps the
+    # prefixed one on the effective route context.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    route = context if context is not None else scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL statements/time of every HTTP request."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics,
+                 sample_rate: float = ACCESS_LOG_SAMPLE_RATE, debug_headers: bool = SQL_DEBUG_HEADERS):
+        self.app = app
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = QueryStats()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.debug_headers:
+                    # Statements run while a streamed body is produced come too late to count here
+                    message = {**message, "headers": list(message.get("headers", [])) + _debug_headers(stats)}
+            await send(message)
+
+        token = _request_stats.set(stats)
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight -= 1
+            _request_stats.reset(token)
+            self.metrics.observe_request(scope["method"], _route_template(scope), status, elapsed, stats)
+            if self.sample_rate and random.random() < self.sample_rate:
+                access_logger.info(
+                    f"{scope['method']} {scope['path']} {status} {elapsed * 1000:.1f}ms "
+                    f"(db {stats.queries} queries, {stats.seconds * 1000:.1f}ms)"
+                )
+
+
+def _debug_headers(stats: QueryStats):
+    headers = [
+        (b"x-db-queries", str(stats.queries).encode()),
+        (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+    ]
+    repeated = stats.repeated()
+    if repeated:
+        shape, count = repeated[0]
+        headers.append((b"x-db-repeated", f"{count}x {shape[:200]}".encode("latin-1", "replace")))
+    return headers
+
+
+# SQL timing: the start time is kept on the connection, the totals on the request
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_started"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for budget in _budgets:
+        budget.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("metrics_query_started") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def time_queries(*engines):
+    """Count the statements and SQL time of requests run on these (sync) engines."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def service_name(client):
+    return getattr(client, "name", type(client).__name__)
+
+
+# Test helpers: fail a test or benchmark when an endpoint goes over its query budget
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _check_budget(label: str, queries: int, max_queries: int, repeated, allow_repeats: bool):
+    if queries > max_queries:
+        raise QueryBudgetExceeded(f"{label} ran {queries} SQL statements (budget {max_queries})")
+    if repeated and not allow_repeats:
+        raise QueryBudgetExceeded(f"{label} repeated a statement (likely N+1): {repeated[0]}")
+
+
+@contextmanager
+def query_budget(max_queries: int, allow_repeats: bool = False, label: str = "block"):
+    """Raise QueryBudgetExceeded if the block runs more than max_queries statements
+    or repeats one SQL_REPEAT_THRESHOLD times.
+
+    Counts every statement on the instrumented engines from any thread (so it
+    works around TestClient calls), which means it is meant for tests, not
+    for code running next to other requests.
+    """
+    stats = QueryStats()
+    _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        _budgets.remove(stats)
+    _check_budget(label, stats.queries, max_queries,
+                  [f"{count}x {shape}" for shape, count in stats.repeated()], allow_repeats)
+
+
+def assert_query_budget(response, max_queries: int, allow_repeats: bool = False):
+    """Check a response's debug headers (SQL_DEBUG_HEADERS=1) against a query budget."""
+    if "x-db-queries" not in response.headers:
+        raise RuntimeError("The response has no X-DB-Queries header; set SQL_DEBUG_HEADERS=1")
+    repeated = response.headers.get("x-db-repeated")
+    label = f"{response.request.method} {response.request.url.path}"
+    _check_budget(label, int(response.headers["x-db-queries"]), max_queries,
+                  [repeated] if repeated else [], allow_repeats)
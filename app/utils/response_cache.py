@@ -0,0 +1,77 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+ASSISTANT_CACHE_SIZE = int(os.getenv("ASSISTANT_CACHE_SIZE", "512"))
+ASSISTANT_CACHE_TTL_SECONDS = float(os.getenv("ASSISTANT_CACHE_TTL_SECONDS", "86400"))
+# Questions answered at startup so the first user asking them gets a cache hit
+ASSISTANT_CACHE_WARM_QUESTIONS = [
+    question.strip()
+    for question in os.getenv(
+        "ASSISTANT_CACHE_WARM_QUESTIONS",
+        "How do I create a new task?|Can OptiTask send reminders?|How does the AI prioritize tasks?"
+    ).split("|")
+    if question.strip()
+]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer."""
+    return re.sub(r"\s+", " ", prompt).strip().lower().rstrip("?!. ")
+
+
+class ResponseCache:
+    """LRU + TTL cache of first-turn assistant answers keyed by (model, prompt)."""
+
+    def __init__(self, max_entries: int = ASSISTANT_CACHE_SIZE, ttl_seconds: float = ASSISTANT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, model: str, prompt: str):
+        if not self.enabled:
+            return None
+        key = (model, normalize_prompt(prompt))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, prompt: str, response: str):
+        if not self.enabled:
+            return
+        key = (model, normalize_prompt(prompt))
+        with self._lock:
+            self._entries[key] = (response, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,161 @@
+import math
+import re
+from collections import Counter
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, ChatMessage, SearchTerm, Task
+
+# Field weights: a hit in a task title counts three times a hit in the body
+TITLE_WEIGHT = 3
+BODY_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+MAX_TERMS_PER_DOCUMENT = 256
+MAX_QUERY_TERMS = 8
+REBUILD_CHUNK_SIZE = 500
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str):
+    return [word[:MAX_TERM_LENGTH] for word in _WORD.findall((text or "").lower())]
+
+
+def task_terms(title: str, description: str):
+    terms = Counter()
+    for word in tokenize(title):
+        terms[word] += TITLE_WEIGHT
+    for word in tokenize(description):
+        terms[word] += BODY_WEIGHT
+    return terms
+
+
+def message_terms(content: str):
+    return Counter({word: count * BODY_WEIGHT for word, count in Counter(tokenize(content)).items()})
+
+
+def _rows(doc_type: str, doc_id: int, terms: Counter):
+    return [
+        {"term": term, "doc_type": doc_type, "doc_id": doc_id, "weight": weight}
+        for term, weight in terms.most_common(MAX_TERMS_PER_DOCUMENT)
+    ]
+
+
+# Incremental maintenance: callers pass what they just wrote and commit as usual
+async def _replace(db: AsyncSession, doc_type: str, terms_by_id: dict):
+    if not terms_by_id:
+        return
+    await db.execute(delete(SearchTerm).where(
+        SearchTerm.doc_type == doc_type, SearchTerm.doc_id.in_(list(terms_by_id))
+    ))
+    rows = [row for doc_id, terms in terms_by_id.items() for row in _rows(doc_type, doc_id, terms)]
+    if rows:
+        await db.execute(insert(SearchTerm), rows)
+
+
+async def index_tasks(db: AsyncSession, tasks):
+    """Index (id, title, description) tuples, replacing what was indexed for those ids."""
+    await _replace(db, "task", {task_id: task_terms(title, description) for task_id, title, description in tasks})
+
+
+async def index_messages(db: AsyncSession, messages):
+    """Index (id, content) tuples."""
+    await _replace(db, "message", {message_id: message_terms(content) for message_id, content in messages})
+
+
+async def remove_tasks(db: AsyncSession, task_ids):
+    await db.execute(delete(SearchTerm).where(SearchTerm.doc_type == "task", SearchTerm.doc_id.in_(list(task_ids))))
+
+
+def rebuild(connection):
+    """Re-index every task and message on a sync connection. Returns the documents indexed."""
+    connection.execute(delete(SearchTerm))
+    indexed = 0
+    sources = [
+        ("task", select(Task.id, Task.title, Task.description), lambda row: task_terms(row[1], row[2])),
+        ("message", select(ChatMessage.id, ChatMessage.content), lambda row: message_terms(row[1])),
+    ]
+    for doc_type, query, terms_of in sources:
+        result = connection.execution_options(yield_per=REBUILD_CHUNK_SIZE).execute(query)
+        for chunk in result.partitions():
+            rows = [row for doc in chunk for row in _rows(doc_type, doc[0], terms_of(doc))]
+            if rows:
+                connection.execute(insert(SearchTerm), rows)
+            indexed += len(chunk)
+    return indexed
+
+
+async def rebuild_search_index(db: AsyncSession):
+    indexed = await db.run_sync(lambda session: rebuild(session.connection()))
+    await db.commit()
+    return indexed
+
+
+def parse_query(q: str):
+    """[(term, is_prefix)]: a trailing * marks a prefix, and so does the last word (type-ahead)."""
+    words = re.findall(r"[^\W_]+\*?", (q or "").lower())[:MAX_QUERY_TERMS]
+    terms = [(word.rstrip("*")[:MAX_TERM_LENGTH], word.endswith("*")) for word in words]
+    if terms:
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+
+async def search(db: AsyncSession, q: str, doc_types, visible_tasks, visible_chats,
+                 limit: int, after: dict = None):
+    """Rank documents containing every query term.
+
+    score = sum over terms of weight x idf, idf = log(1 + documents / documents
+    containing the term), scaled to an integer so pages can be keyed on it.
+    visible_tasks / visible_chats are WHERE conditions on Task / Chat (None: no
+    restriction). Returns [(doc_type, doc_id, score)].
+    """
+    terms = parse_query(q)
+    if not terms:
+        return []
+
+    documents = 0
+    if "task" in doc_types:
+        documents += (await db.execute(select(func.count(Task.id)))).scalar()
+    if "message" in doc_types:
+        documents += (await db.execute(select(func.count(ChatMessage.id)))).scalar()
+
+    matches = []
+    for term, is_prefix in terms:
+        condition = SearchTerm.term.like(f"{term}%") if is_prefix else SearchTerm.term == term
+        matched = select(
+            SearchTerm.doc_type.label("doc_type"),
+            SearchTerm.doc_id.label("doc_id"),
+            func.sum(SearchTerm.weight).label("weight"),
+        ).where(condition, SearchTerm.doc_type.in_(doc_types)).group_by(
+            SearchTerm.doc_type, SearchTerm.doc_id
+        ).subquery()
+        frequency = (await db.execute(select(func.count()).select_from(matched))).scalar()
+        if not frequency:
+            return []
+        idf = max(int(1000 * math.log(1 + max(documents, frequency) / frequency)), 1)
+        matches.append((matched, idf))
+
+    first = matches[0][0]
+    score = sum((matched.c.weight * idf for matched, idf in matches[1:]), first.c.weight * matches[0][1])
+    query = select(first.c.doc_type, first.c.doc_id, score.label("score"))
+    for matched, _ in matches[1:]:
+        query = query.join(matched, and_(matched.c.doc_type == first.c.doc_type, matched.c.doc_id == first.c.doc_id))
+
+    # Same visibility as the list endpoints; rows of deleted documents drop out here too
+    query = query.outerjoin(Task, and_(first.c.doc_type == "task", Task.id == first.c.doc_id)) \
+        .outerjoin(ChatMessage, and_(first.c.doc_type == "message", ChatMessage.id == first.c.doc_id)) \
+        .outerjoin(Chat, Chat.id == ChatMessage.chat_id)
+    task_condition = Task.id.isnot(None) if visible_tasks is None else and_(Task.id.isnot(None), visible_tasks)
+    chat_condition = Chat.id.isnot(None) if visible_chats is None else and_(Chat.id.isnot(None), visible_chats)
+    query = query.where(or_(task_condition, chat_condition))
+
+    if after:
+        query = query.where(or_(
+            score < after["score"],
+            and_(score == after["score"], first.c.doc_type > after["type"]),
+            and_(score == after["score"], first.c.doc_type == after["type"], first.c.doc_id < after["id"]),
+        ))
+
+    query = query.order_by(score.desc(), first.c.doc_type, first.c.doc_id.desc()).limit(limit)
+    return [(row.doc_type, row.doc_id, int(row.score)) for row in await db.execute(query)]
@@ -0,0 +1,81 @@
+"""Measure how long a new worker takes to import app.main and run its startup.
+
+    python -m app.utils.startup_budget [--runs 5]
+
+Each run is a fresh interpreter, like a forked/spawned uvicorn worker. Exits
+non-zero when the median exceeds STARTUP_IMPORT_BUDGET / STARTUP_BUDGET
+(seconds), and lists the slowest imports so regressions are easy to spot.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+STARTUP_IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "1.5"))
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", "1.0"))
+
+# Runs in the child: time the import, then the lifespan startup (not shutdown)
+_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+started = time.perf_counter()
+ready = asyncio.run(startup())
+print(json.dumps({"import": imported, "startup": ready - started,
+                  "steps": getattr(app.main.app.state, "startup_timings", {})}))
+"""
+
+
+def _probe():
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 10):
+    """[(cumulative seconds, module)] for the modules app.main imports directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and len(match.group(2)) == 2:
+            package = match.group(3)
+            packages[package] = max(packages.get(package, 0), int(match.group(1)) / 1e6)
+    return sorted(((seconds, name) for name, seconds in packages.items()), reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.utils.startup_budget")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    samples = [_probe() for _ in range(args.runs)]
+    import_time = statistics.median(sample["import"] for sample in samples)
+    startup_time = statistics.median(sample["startup"] for sample in samples)
+
+    print(f"import app.main: {import_time:.3f}s (budget {STARTUP_IMPORT_BUDGET:.3f}s)")
+    print(f"lifespan startup: {startup_time:.3f}s (budget {STARTUP_BUDGET:.3f}s)")
+    for name, seconds in samples[-1]["steps"].items():
+        print(f"    {name}: {seconds:.3f}s")
+    print("slowest imports:")
+    for seconds, name in slowest_imports():
+        print(f"    {seconds:.3f}s  {name}")
+
+    over = import_time > STARTUP_IMPORT_BUDGET or startup_time > STARTUP_BUDGET
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from datetime import datetime
+
+from sqlalchemy import update, insert, select, func, case, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, ChatMessage, ChatUnreadCounter, User
+
+# Admin chats recounted per transaction of a rebuild
+REBUILD_CHUNK_SIZE = 1000
+
+
+# Per-chat unread counters. Every helper only stages changes on the given
+# session, so they commit (or roll back) together with the message they track.
+def _column(for_admin: bool):
+    return ChatUnreadCounter.admin_unread if for_admin else ChatUnreadCounter.user_unread
+
+
+def _changed(column, value):
+    # Any change also moves the chat's version, the ETag of GET /chats/admin
+    return {column: value, ChatUnreadCounter.version: ChatUnreadCounter.version + 1,
+            ChatUnreadCounter.updated_at: datetime.utcnow()}
+
+
+def unread_count_query(chat_id: int, for_admin: bool):
+    # Admins read user messages, users read admin messages
+    return select(func.count(ChatMessage.id)).where(
+        ChatMessage.chat_id == chat_id,
+        ChatMessage.is_admin == (not for_admin),
+        ChatMessage.is_read == False
+    )
+
+
+async def _count_unread(db: AsyncSession, chat_id: int, for_admin: bool):
+    return (await db.execute(unread_count_query(chat_id, for_admin))).scalar()
+
+
+def _chat_activity():
+    """Newest message of the chat in the enclosing statement, else when the chat was created."""
+    newest = select(func.max(ChatMessage.created_at)).where(ChatMessage.chat_id == Chat.id).scalar_subquery()
+    return func.coalesce(newest, Chat.created_at)
+
+
+def _last_activity(chat_id):
+    # newest correlates to chats, so chat_id may itself be a column of the statement around it
+    return select(_chat_activity()).where(Chat.id == chat_id).scalar_subquery()
+
+
+def add_counter(db: AsyncSession, chat: Chat):
+    """Stage the (empty) counter row of a new chat; call after the chat is flushed."""
+    db.add(ChatUnreadCounter(chat_id=chat.id, admin_unread=0, user_unread=0, last_activity=chat.created_at))
+
+
+async def _create_counter(db: AsyncSession, chat_id: int):
+    """Insert the counter row for a chat, seeded from its messages."""
+    try:
+        async with db.begin_nested():
+            db.add(ChatUnreadCounter(
+                chat_id=chat_id,
+                admin_unread=await _count_unread(db, chat_id, for_admin=True),
+                user_unread=await _count_unread(db, chat_id, for_admin=False),
+                last_activity=(await db.execute(select(_last_activity(chat_id)))).scalar(),
+            ))
+            await db.flush()
+        return True
+    except IntegrityError:
+        # Another request created it first
+        return False
+
+
+async def increment_unread(db: AsyncSession, chat_id: int, for_admin: bool, sent_at: datetime):
+    """Count one more unread message in a chat, sent at sent_at. Call after the message is added to the session."""
+    column = _column(for_admin)
+    values = {**_changed(column, column + 1), ChatUnreadCounter.last_activity: sent_at}
+    await db.flush()
+    result = await db.execute(
+        update(ChatUnreadCounter).where(ChatUnreadCounter.chat_id == chat_id).values(values)
+    )
+    if result.rowcount == 0 and not await _create_counter(db, chat_id):
+        await db.execute(
+            update(ChatUnreadCounter).where(ChatUnreadCounter.chat_id == chat_id).values(values)
+        )
+
+
+async def decrement_unread(db: AsyncSession, chat_id: int, for_admin: bool, count: int):
+    """Count `count` fewer unread messages in a chat: the rows the caller just marked read.
+
+    Subtracting (rather than resetting to 0) keeps a message that arrives
+    between the caller's UPDATE and this one counted.
+    """
+    column = _column(for_admin)
+    await db.flush()
+    result = await db.execute(
+        update(ChatUnreadCounter)
+        .where(ChatUnreadCounter.chat_id == chat_id)
+        .values(_changed(column, case((column > count, column - count), else_=0)))
+    )
+    if result.rowcount == 0:
+        await _create_counter(db, chat_id)
+
+
+def unread_by_user_query():
+    return select(User.username, ChatUnreadCounter.admin_unread).join(
+        Chat, Chat.id == ChatUnreadCounter.chat_id
+    ).join(
+        User, User.id == Chat.user_id
+    ).where(
+        ChatUnreadCounter.admin_unread > 0,
+        Chat.is_admin_chat == True
+    )
+
+
+async def unread_by_user(db: AsyncSession):
+    """Admin view read from the counter table: {username: unread user messages}."""
+    rows = (await db.execute(unread_by_user_query())).all()
+    return {username: count for username, count in rows}
+
+
+async def unread_by_user_from_messages(db: AsyncSession):
+    """Same result as unread_by_user computed from chat_messages (rebuilds and checks)."""
+    rows = (await db.execute(select(User.username, func.count(ChatMessage.id)).join(
+        Chat, Chat.id == ChatMessage.chat_id
+    ).join(
+        User, User.id == Chat.user_id
+    ).where(
+        Chat.is_admin_chat == True,
+        ChatMessage.is_admin == False,
+        ChatMessage.is_read == False
+    ).group_by(User.username))).all()
+    return {username: count for username, count in rows}
+
+
+def rebuild_chats(connection, after_id: int, last_id: int):
+    """Recount the admin chats with after_id < id <= last_id from chat_messages, in the caller's transaction.
+
+    The counter rows are locked before the messages are counted. A request
+    that increments or decrements one of them waits for the caller's commit
+    and applies on top of the recount, or it committed first and the recount
+    includes its message. version keeps moving, so ETags stay valid.
+    """
+    chat_range = and_(Chat.id > after_id, Chat.id <= last_id, Chat.is_admin_chat == True)
+    counter_range = and_(ChatUnreadCounter.chat_id > after_id, ChatUnreadCounter.chat_id <= last_id)
+    connection.execute(select(ChatUnreadCounter.chat_id).where(counter_range).with_for_update())
+
+    chat_id = ChatUnreadCounter.chat_id
+    connection.execute(update(ChatUnreadCounter).where(counter_range).values(
+        admin_unread=unread_count_query(chat_id, for_admin=True).scalar_subquery(),
+        user_unread=unread_count_query(chat_id, for_admin=False).scalar_subquery(),
+        last_activity=_last_activity(chat_id),
+        version=ChatUnreadCounter.version + 1,
+        updated_at=datetime.utcnow(),
+    ))
+    # Chats that have no counter row yet; a request creating one concurrently seeds it the same way
+    missing = select(
+        Chat.id,
+        unread_count_query(Chat.id, for_admin=True).scalar_subquery(),
+        unread_count_query(Chat.id, for_admin=False).scalar_subquery(),
+        _chat_activity(),
+    ).where(chat_range, ~select(ChatUnreadCounter.chat_id).where(ChatUnreadCounter.chat_id == Chat.id).exists())
+    connection.execute(insert(ChatUnreadCounter).from_select(
+        ["chat_id", "admin_unread", "user_unread", "last_activity"], missing
+    ))
+
+
+def _rebuild_ranges(connection):
+    """(after_id, last_id] ranges of at most REBUILD_CHUNK_SIZE admin chats."""
+    ids = connection.execute(select(Chat.id).where(Chat.is_admin_chat == True).order_by(Chat.id)).scalars().all()
+    return len(ids), [
+        (ids[start - 1] if start else 0, ids[min(start + REBUILD_CHUNK_SIZE, len(ids)) - 1])
+        for start in range(0, len(ids), REBUILD_CHUNK_SIZE)
+    ]
+
+
+def rebuild(connection):
+    """Recount every admin chat on a sync connection (CLI, scripts). Returns the number of chats counted."""
+    chats_counted, ranges = _rebuild_ranges(connection)
+    for after_id, last_id in ranges:
+        rebuild_chats(connection, after_id, last_id)
+    return chats_counted
+
+
+async def rebuild_unread_counters(db: AsyncSession):
+    """Recount every admin chat, one committed transaction per REBUILD_CHUNK_SIZE chats, so the row locks stay short."""
+    chats_counted, ranges = await db.run_sync(lambda session: _rebuild_ranges(session.connection()))
+    await db.commit()
+    for after_id, last_id in ranges:
+        for attempt in range(2):
+            try:
+                await db.run_sync(lambda session: rebuild_chats(session.connection(), after_id, last_id))
+                await db.commit()
+                break
+            except IntegrityError:
+                # A request created a missing counter row first; the retry updates it instead
+                await db.rollback()
+                if attempt:
+                    raise
+    return chats_counted
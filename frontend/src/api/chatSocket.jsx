@@ -0,0 +1,63 @@
+const WS_URL = "ws://localhost:8000/chats/ws";
+// Reconnect after 1s, 2s, 4s ... up to 30s; keepalive ping every 25s
+const MAX_RETRY_DELAY = 30000;
+const PING_INTERVAL = 25000;
+
+// Connects to /chats/ws and keeps reconnecting until close() is called.
+// onEvent gets every server event ({type: "message.created" | "messages.read" |
+// "admin.status", ...}); onStatus(true/false) reports whether the socket is
+// open, so callers can poll over HTTP only while it is not.
+export const connectChatSocket = (token, { onEvent, onStatus }) => {
+  let socket = null;
+  let retries = 0;
+  let retryTimer = null;
+  let pingTimer = null;
+  let closed = false;
+
+  const open = () => {
+    socket = new WebSocket(`${WS_URL}?token=${encodeURIComponent(token)}`);
+
+    socket.onopen = () => {
+      retries = 0;
+      pingTimer = setInterval(() => send({ action: "ping" }), PING_INTERVAL);
+      onStatus(true);
+    };
+
+    socket.onmessage = (message) => {
+      try {
+        const event = JSON.parse(message.data);
+        if (event.type !== "pong") onEvent(event);
+      } catch (err) {
+        console.error("Bad chat socket event:", err);
+      }
+    };
+
+    socket.onclose = () => {
+      clearInterval(pingTimer);
+      onStatus(false);
+      if (closed) return;
+      const delay = Math.min(1000 * 2 ** retries, MAX_RETRY_DELAY);
+      retries += 1;
+      retryTimer = setTimeout(open, delay);
+    };
+  };
+
+  const send = (data) => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify(data));
+    }
+  };
+
+  open();
+
+  return {
+    // Start receiving a chat's events (e.g. right after the user's first message creates it)
+    subscribe: (chatId) => send({ action: "subscribe", chat_id: chatId }),
+    close: () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      clearInterval(pingTimer);
+      if (socket) socket.close();
+    },
+  };
+};
@@ -1,40 +1,60 @@
 import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { connectChatSocket } from '../api/chatSocket';
 
 const API_BASE_URL = 'http://localhost:8000';
+// Chats per /chats/admin/all page and messages per history page
+const CHAT_PAGE_SIZE = 50;
+const MESSAGE_PAGE_SIZE = 50;
 
 const AdminChatInterface = () => {
   const [chats, setChats] = useState([]);
   const [selectedChat, setSelectedChat] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [totalUnread, setTotalUnread] = useState(0);
   const [newMessage, setNewMessage] = useState('');
   const [isOnline, setIsOnline] = useState(false);
   const [loading, setLoading] = useState({
     chats: true,
-    messages: false
+    messages: false,
+    older: false
   });
   const [error, setError] = useState(null);
   const messagesEndRef = useRef(null);
   const messagesContainerRef = useRef(null);
   const [shouldScroll, setShouldScroll] = useState(false);
+  const [socketConnected, setSocketConnected] = useState(false);
+  // Read by the socket handler, which is created once
+  const selectedChatRef = useRef(null);
+  const chatsRef = useRef([]);
 
-  // Fetch all admin chats
+  // Fetch all admin chats: every page of /chats/admin/all (X-Next-Cursor), with
+  // only the latest message of each chat for the preview
   const fetchChats = async () => {
     try {
       setLoading(prev => ({ ...prev, chats: true }));
       const token = localStorage.getItem('token');
       
-      const response = await axios.get(`${API_BASE_URL}/chats/admin/all`, {
-        headers: { Authorization: `Bearer ${token}` },
-        withCredentials: true
-      });
+      const allChats = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API_BASE_URL}/chats/admin/all`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { page_size: CHAT_PAGE_SIZE, message_limit: 1, ...(cursor ? { cursor } : {}) },
+          withCredentials: true
+        });
+        allChats.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
       
-      setChats(response.data);
+      setChats(allChats);
       setError(null);
+      fetchUnreadTotal();
       
       // Auto-select first chat if none selected
-      if (!selectedChat && response.data.length > 0) {
-        setSelectedChat(response.data[0].id);
+      if (!selectedChatRef.current && allChats.length > 0) {
+        setSelectedChat(allChats[0].id);
       }
     } catch (err) {
       setError('Failed to load chats. Please try again.');
@@ -44,7 +64,31 @@ const AdminChatInterface = () => {
     }
   };
 
-  // Fetch messages for selected chat
+  // Unread total across all chats, from the unread counters
+  const fetchUnreadTotal = async () => {
+    try {
+      const token = localStorage.getItem('token');
+      const response = await axios.get(`${API_BASE_URL}/chats/admin/unread`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setTotalUnread(response.data.total_unread || 0);
+    } catch (err) {
+      console.error('Failed to load unread counts:', err);
+    }
+  };
+
+  // One page of a chat's history, newest first on the server, oldest first here
+  const fetchMessagePage = async (chatId, beforeId) => {
+    const token = localStorage.getItem('token');
+    const response = await axios.get(`${API_BASE_URL}/chats/admin/${chatId}/messages`, {
+      headers: { Authorization: `Bearer ${token}` },
+      params: { limit: MESSAGE_PAGE_SIZE, ...(beforeId ? { before_id: beforeId } : {}) }
+    });
+    setHasOlder(response.data.length === MESSAGE_PAGE_SIZE);
+    return response.data;
+  };
+
+  // Fetch the latest messages of the selected chat and mark them read
   const fetchMessages = async () => {
     if (!selectedChat) return;
     
@@ -52,23 +96,18 @@ const AdminChatInterface = () => {
       setLoading(prev => ({ ...prev, messages: true }));
       const token = localStorage.getItem('token');
       
-      // Find the chat by id
-      const chat = chats.find(c => c.id === selectedChat);
+      setMessages(await fetchMessagePage(selectedChat));
       
-      if (chat && chat.messages) {
-        setMessages(chat.messages);
-        
-        // Mark messages as read when opening chat
-        await axios.put(
-          `${API_BASE_URL}/chats/admin/read/${selectedChat}`,
-          {},
-          { headers: { Authorization: `Bearer ${token}` }}
-        );
-        
-        // Refresh chats to update unread counts
-        fetchChats();
-        setShouldScroll(true);
-      }
+      // Mark messages as read when opening chat
+      await axios.put(
+        `${API_BASE_URL}/chats/admin/read/${selectedChat}`,
+        {},
+        { headers: { Authorization: `Bearer ${token}` }}
+      );
+      
+      // Refresh chats to update unread counts
+      fetchChats();
+      setShouldScroll(true);
     } catch (err) {
       console.error('Failed to load messages:', err);
     } finally {
@@ -76,6 +115,21 @@ const AdminChatInterface = () => {
     }
   };
 
+  // Prepend the page before the oldest message shown
+  const fetchOlderMessages = async () => {
+    if (!selectedChat || messages.length === 0) return;
+    
+    try {
+      setLoading(prev => ({ ...prev, older: true }));
+      const older = await fetchMessagePage(selectedChat, messages[0].id);
+      setMessages(prev => [...older, ...prev]);
+    } catch (err) {
+      console.error('Failed to load older messages:', err);
+    } finally {
+      setLoading(prev => ({ ...prev, older: false }));
+    }
+  };
+
   // Update admin status
   const updateAdminStatus = async (status) => {
     try {
@@ -106,14 +160,14 @@ const AdminChatInterface = () => {
     try {
       const token = localStorage.getItem('token');
       
-      await axios.post(
+      const response = await axios.post(
         `${API_BASE_URL}/chats/admin/reply/${selectedChat}`,
         { content: newMessage },
         { headers: { Authorization: `Bearer ${token}` }}
       );
       
       setNewMessage('');
-      fetchMessages();
+      setMessages(prev => prev.some(m => m.id === response.data.id) ? prev : [...prev, response.data]);
       fetchChats();
       setShouldScroll(true);
     } catch (err) {
@@ -122,17 +176,88 @@ const AdminChatInterface = () => {
     }
   };
 
-  // Initial data loading
+  const markRead = async (chatId) => {
+    try {
+      const token = localStorage.getItem('token');
+      await axios.put(
+        `${API_BASE_URL}/chats/admin/read/${chatId}`,
+        {},
+        { headers: { Authorization: `Bearer ${token}` }}
+      );
+    } catch (err) {
+      console.error('Failed to mark messages as read:', err);
+    }
+  };
+
+  const handleSocketEvent = (event) => {
+    const isSelected = event.chat_id === selectedChatRef.current;
+    if (event.type === 'message.created') {
+      const message = event.message;
+      if (isSelected) {
+        setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+        setShouldScroll(true);
+        if (!message.is_admin) markRead(event.chat_id);
+      }
+      if (!chatsRef.current.some(c => c.id === event.chat_id)) {
+        // A new chat: load the inbox for its title and position
+        fetchChats();
+        return;
+      }
+      setChats(prev => {
+        const chat = prev.find(c => c.id === event.chat_id);
+        if (!chat) return prev;
+        const unread = !message.is_admin && !isSelected ? 1 : 0;
+        const updated = {
+          ...chat,
+          messages: [message],
+          last_activity: message.created_at,
+          unread_count: (chat.unread_count || 0) + unread
+        };
+        // Most recently active first, as /chats/admin/all orders them
+        return [updated, ...prev.filter(c => c.id !== event.chat_id)];
+      });
+      fetchUnreadTotal();
+    } else if (event.type === 'messages.read') {
+      if (event.reader === 'admin') {
+        setChats(prev => prev.map(c => c.id === event.chat_id ? { ...c, unread_count: 0 } : c));
+        fetchUnreadTotal();
+      } else if (isSelected) {
+        setMessages(prev => prev.map(m => (
+          m.is_admin && m.id <= event.last_read_id ? { ...m, is_read: true } : m
+        )));
+      }
+    } else if (event.type === 'admin.status') {
+      setIsOnline(event.is_online);
+    }
+  };
+
+  // Live updates over /chats/ws
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    const socket = connectChatSocket(token, {
+      onEvent: handleSocketEvent,
+      onStatus: setSocketConnected
+    });
+    return () => socket.close();
+  }, []);
+
+  // Load on mount and whenever the socket connects (to catch up on what it missed);
+  // poll only while the socket is down
   useEffect(() => {
     fetchChats();
+    if (socketConnected) return;
     
-    // Set up periodic refreshing
     const chatInterval = setInterval(fetchChats, 10000);
     return () => clearInterval(chatInterval);
-  }, []);
+  }, [socketConnected]);
+
+  useEffect(() => {
+    chatsRef.current = chats;
+  }, [chats]);
 
   // Load messages when chat selection changes
   useEffect(() => {
+    selectedChatRef.current = selectedChat;
     fetchMessages();
   }, [selectedChat]);
 
@@ -159,8 +284,9 @@ const formatTimestamp = (timestamp) => {
   }
 };
 
+  // Kept on chat_unread_counters; chat.messages only holds the preview
   const getUnreadCount = (chat) => {
-    return chat.messages?.filter(m => !m.is_admin && !m.is_read).length || 0;
+    return chat.unread_count || 0;
   };
 
   const getUserNameFromTitle = (title) => {
@@ -173,7 +299,14 @@ const formatTimestamp = (timestamp) => {
       {/* Sidebar */}
       <div className="w-80 border-r bg-white shadow-sm">
         <div className="p-4 border-b flex justify-between items-center bg-indigo-600 text-white">
-          <h2 className="text-xl font-bold">Support Chats</h2>
+          <h2 className="text-xl font-bold">
+            Support Chats
+            {totalUnread > 0 && (
+              <span className="ml-2 bg-red-500 text-white rounded-full px-2 text-xs align-middle">
+                {totalUnread}
+              </span>
+            )}
+          </h2>
           <div className="flex items-center space-x-2">
             <span className={`h-2 w-2 rounded-full ${isOnline ? 'bg-green-400' : 'bg-red-400'}`}></span>
             <label className="relative inline-flex items-center cursor-pointer">
@@ -272,7 +405,20 @@ const formatTimestamp = (timestamp) => {
                   <p className="text-sm mt-1">Start the conversation</p>
                 </div>
               ) : (
-                messages.map(message => (
+                <>
+                {hasOlder && (
+                  <div className="flex justify-center">
+                    <button
+                      type="button"
+                      className="text-sm text-indigo-600 hover:underline disabled:text-gray-400"
+                      onClick={fetchOlderMessages}
+                      disabled={loading.older}
+                    >
+                      {loading.older ? 'Loading...' : 'Load older messages'}
+                    </button>
+                  </div>
+                )}
+                {messages.map(message => (
                   <div
                     key={message.id}
                     className={`flex ${message.is_admin ? 'justify-end' : 'justify-start'}`}
@@ -297,7 +443,8 @@ const formatTimestamp = (timestamp) => {
                       </div>
                     </div>
                   </div>
-                ))
+                ))}
+                </>
               )}
               <div ref={messagesEndRef} />
             </div>
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { format } from 'date-fns';
+import { connectChatSocket } from '../api/chatSocket';
 
 // API base URL - adjust as needed
 const API_BASE_URL = 'http://localhost:8000';
@@ -12,8 +13,10 @@ const UserChatInterface = () => {
   const [error, setError] = useState(null);
   const [adminStatus, setAdminStatus] = useState({ isOnline: false, lastSeen: null });
   const [unreadCount, setUnreadCount] = useState(0);
+  const [socketConnected, setSocketConnected] = useState(false);
   const messagesEndRef = useRef(null);
   const messageInputRef = useRef(null);
+  const socketRef = useRef(null);
 
   // Fetch user's admin chat
   const fetchChat = async () => {
@@ -74,14 +77,16 @@ const UserChatInterface = () => {
     try {
       const token = localStorage.getItem('token');
       
-      await axios.post(
+      const response = await axios.post(
         `${API_BASE_URL}/chats/admin/message`,
         { content: newMessage },
         { headers: { Authorization: `Bearer ${token}` }}
       );
       
       setNewMessage('');
-      fetchChat(); // Refresh messages after sending
+      addMessage(response.data);
+      // The first message creates the chat; its events only reach sockets subscribed to it
+      socketRef.current?.subscribe(response.data.chat_id);
     } catch (err) {
       setError('Failed to send message. Please try again.');
       console.error(err);
@@ -113,13 +118,42 @@ const UserChatInterface = () => {
     }
   };
 
-  // Initial data loading
+  // Add a message unless it is already shown (the sender also gets its own event)
+  const addMessage = (message) => {
+    setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+  };
+
+  const handleSocketEvent = (event) => {
+    if (event.type === 'message.created') {
+      addMessage(event.message);
+      if (event.message.is_admin) fetchUnreadCount();
+    } else if (event.type === 'messages.read' && event.reader === 'admin') {
+      setMessages(prev => prev.map(m => (
+        !m.is_admin && m.id <= event.last_read_id ? { ...m, is_read: true } : m
+      )));
+    } else if (event.type === 'admin.status') {
+      setAdminStatus({ isOnline: event.is_online, lastSeen: event.last_seen });
+    }
+  };
+
+  // Live updates over /chats/ws
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    socketRef.current = connectChatSocket(token, {
+      onEvent: handleSocketEvent,
+      onStatus: setSocketConnected
+    });
+    return () => socketRef.current.close();
+  }, []);
+
+  // Load on mount and whenever the socket connects (to catch up on what it missed);
+  // poll only while the socket is down
   useEffect(() => {
     fetchChat();
     fetchAdminStatus();
     fetchUnreadCount();
+    if (socketConnected) return;
     
-    // Set up periodic refreshing
     const chatInterval = setInterval(fetchChat, 15000); // Every 15 seconds
     const statusInterval = setInterval(fetchAdminStatus, 30000); // Every 30 seconds
     const unreadInterval = setInterval(fetchUnreadCount, 20000); // Every 20 seconds
@@ -129,7 +163,7 @@ const UserChatInterface = () => {
       clearInterval(statusInterval);
       clearInterval(unreadInterval);
     };
-  }, []);
+  }, [socketConnected]);
 
   // Scroll to bottom when messages change
   useEffect(() => {
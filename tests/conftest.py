@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import uuid
+
+# Before anything imports app.database: a throwaway SQLite file (the async engine
+# gets sqlite+aiosqlite from it) and no outside services.
+_DB_DIR = tempfile.mkdtemp(prefix="optitask-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["EMAIL_TRANSPORT"] = "memory"
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["REMINDERS_ENABLED"] = "0"
+# Per-request statement counts come back in X-DB-Queries
+os.environ["SQL_DEBUG_HEADERS"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """make_user(admin=False) -> (auth headers, user id) of a new account."""
+    from app.database import SessionLocal
+    from app.models import Role, User
+
+    def make(admin: bool = False):
+        name = f"user-{uuid.uuid4().hex[:10]}"
+        response = client.post("/users/register", json={
+            "username": name, "email": f"{name}@example.com", "role": "user", "password": "secret"
+        })
+        assert response.status_code == 200, response.text
+        user_id = response.json()["id"]
+        if admin:
+            with SessionLocal() as db:
+                db.execute(update(User).where(User.id == user_id).values(role=Role.admin))
+                db.commit()
+        token = client.post("/users/token", json={"username": name, "password": "secret"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}, user_id
+
+    return make
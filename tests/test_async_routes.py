@@ -0,0 +1,110 @@
+"""The routers end to end on the async engine (sqlite+aiosqlite)."""
+from app.database import ASYNC_DATABASE_URL
+
+
+def test_async_engine_uses_aiosqlite():
+    assert ASYNC_DATABASE_URL.startswith("sqlite+aiosqlite://")
+
+
+def test_task_lifecycle(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+
+    created = client.post("/tasks/", headers=admin, json={
+        "title": "write report", "priority": 1, "due_date": "2030-01-02T00:00:00", "assigned_to_id": member_id
+    })
+    assert created.status_code == 200, created.text
+    task_id = created.json()["id"]
+
+    listed = client.get("/tasks/", headers=member)
+    assert [task["id"] for task in listed.json()] == [task_id]
+
+    updated = client.put(f"/tasks/{task_id}", headers=admin, json={"title": "write the report", "priority": 2})
+    assert updated.json()["title"] == "write the report"
+
+    assert client.patch(f"/tasks/{task_id}/complete", headers=member).status_code == 200
+    summary = client.get("/tasks/summary", headers=member).json()
+    assert summary["totalTasks"] == 1 and summary["completedTasks"] == 1
+
+    assert client.delete(f"/tasks/{task_id}", headers=admin).status_code == 200
+    assert client.get("/tasks/", headers=member).json() == []
+
+
+def test_task_pages_and_stream(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    ids = [task["id"] for task in client.post("/tasks/batch", headers=admin, json=[
+        {"title": f"task {i}", "due_date": f"2030-02-{i + 1:02d}T00:00:00", "assigned_to_id": member_id}
+        for i in range(5)
+    ]).json()]
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/tasks/", headers=member, params={"page_size": 2, **({"cursor": cursor} if cursor else {})})
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == ids
+
+    streamed = client.get("/tasks/", headers=member, params={"stream": "true"})
+    assert len(streamed.text.splitlines()) == 5
+
+
+def test_task_pages_with_missing_due_dates(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    ids = [task["id"] for task in client.post("/tasks/batch", headers=admin, json=[
+        {"title": f"task {i}", "assigned_to_id": member_id, **({"due_date": f"2030-04-0{i}T00:00:00"} if i % 2 else {})}
+        for i in range(1, 6)
+    ]).json()]
+
+    def pages(sort_order):
+        seen, cursor = [], None
+        while True:
+            response = client.get("/tasks/", headers=member, params={
+                "page_size": 2, "sort_order": sort_order, **({"cursor": cursor} if cursor else {})
+            })
+            seen += [task["id"] for task in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return seen
+
+    # Tasks without a due date come first ascending and last descending
+    undated, dated = [ids[1], ids[3]], [ids[0], ids[2], ids[4]]
+    assert pages("asc") == undated + dated
+    assert pages("desc") == dated[::-1] + undated[::-1]
+
+
+def test_cors_exposes_paging_headers(client):
+    response = client.get("/", headers={"Origin": "http://localhost:5173"})
+    exposed = response.headers["access-control-expose-headers"].lower()
+    assert all(name in exposed for name in ("x-next-cursor", "etag", "last-modified"))
+
+
+def test_admin_chat_unread_and_read(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, _ = make_user()
+
+    assert client.post("/chats/admin/message", headers=member, json={"content": "hello"}).status_code == 200
+    client.post("/chats/admin/message", headers=member, json={"content": "anyone there?"})
+    chat = client.get("/chats/admin", headers=member).json()
+    assert [message["content"] for message in chat["messages"]] == ["hello", "anyone there?"]
+
+    inbox = {entry["id"]: entry for entry in client.get("/chats/admin/all", headers=admin).json()}
+    assert inbox[chat["id"]]["unread_count"] == 2
+
+    assert client.post(f"/chats/admin/reply/{chat['id']}", headers=admin, json={"content": "yes"}).status_code == 200
+    assert client.get("/chats/admin/unread", headers=member).json() == {"unread_count": 1}
+
+    read = client.put(f"/chats/admin/read/{chat['id']}", headers=admin).json()
+    assert read["message"] == "Marked 2 messages as read"
+    inbox = {entry["id"]: entry for entry in client.get("/chats/admin/all", headers=admin).json()}
+    assert inbox[chat["id"]]["unread_count"] == 0
+
+
+def test_search(client, make_user):
+    admin, _ = make_user(admin=True)
+    client.post("/tasks/", headers=admin, json={"title": "quarterly zeppelin audit"})
+    hits = client.get("/search/", headers=admin, params={"q": "zeppelin"}).json()
+    assert any(hit["type"] == "task" for hit in hits)
@@ -0,0 +1,40 @@
+"""PUT /chats/admin/read/{id}: per-side read watermarks and one bounded UPDATE."""
+from app.database import SessionLocal
+from app.models import Chat
+
+
+def test_read_advances_each_side_watermark(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, _ = make_user()
+    client.post("/chats/admin/message", headers=member, json={"content": "one"})
+    chat_id = client.post("/chats/admin/message", headers=member, json={"content": "two"}).json()["chat_id"]
+    reply = client.post(f"/chats/admin/reply/{chat_id}", headers=admin, json={"content": "three"}).json()
+
+    read = client.put(f"/chats/admin/read/{chat_id}", headers=admin)
+    assert read.json() == {"message": "Marked 2 messages as read", "last_read_id": reply["id"]}
+    # Nothing new since the watermark: the UPDATE is skipped
+    again = client.put(f"/chats/admin/read/{chat_id}", headers=admin)
+    assert again.json()["message"] == "Marked 0 messages as read"
+    assert int(again.headers["x-db-queries"]) < int(read.headers["x-db-queries"])
+
+    latest = client.post("/chats/admin/message", headers=member, json={"content": "four"}).json()
+    assert client.put(f"/chats/admin/read/{chat_id}", headers=admin).json() == {
+        "message": "Marked 1 messages as read", "last_read_id": latest["id"]
+    }
+    # The member's side has its own watermark: only the admin's reply was unread
+    assert client.put(f"/chats/admin/read/{chat_id}", headers=member).json()["message"] == "Marked 1 messages as read"
+
+    with SessionLocal() as db:
+        chat = db.get(Chat, chat_id)
+        assert (chat.admin_last_read_id, chat.user_last_read_id) == (latest["id"], latest["id"])
+    messages = client.get("/chats/admin", headers=member).json()["messages"]
+    assert all(message["is_read"] for message in messages)
+
+
+def test_read_checks_the_chat(client, make_user):
+    owner, _ = make_user()
+    stranger, _ = make_user()
+    chat_id = client.post("/chats/admin/message", headers=owner, json={"content": "private"}).json()["chat_id"]
+
+    assert client.put(f"/chats/admin/read/{chat_id}", headers=stranger).status_code == 403
+    assert client.put("/chats/admin/read/999999", headers=owner).status_code == 404
@@ -0,0 +1,56 @@
+"""ETag / Last-Modified revalidation of the task list and the admin chat."""
+from datetime import timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def _assign(client, admin, member_id, title):
+    response = client.post("/tasks/", headers=admin, json={"title": title, "assigned_to_id": member_id})
+    assert response.status_code == 200, response.text
+
+
+def test_task_list_if_none_match(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    _assign(client, admin, member_id, "etag one")
+
+    first = client.get("/tasks/", headers=member)
+    etag = first.headers["etag"]
+    assert client.get("/tasks/", headers={**member, "If-None-Match": etag}).status_code == 304
+    # The query parameters are part of the tag
+    assert client.get("/tasks/", headers={**member, "If-None-Match": etag},
+                      params={"sort_by": "priority"}).status_code == 200
+
+    _assign(client, admin, member_id, "etag two")
+    changed = client.get("/tasks/", headers={**member, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 2
+
+
+def test_task_list_if_modified_since(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    _assign(client, admin, member_id, "ims")
+
+    last_modified = client.get("/tasks/", headers=member).headers["last-modified"]
+    assert client.get("/tasks/", headers={**member, "If-Modified-Since": last_modified}).status_code == 304
+
+    earlier = format_datetime(parsedate_to_datetime(last_modified) - timedelta(seconds=1), usegmt=True)
+    assert client.get("/tasks/", headers={**member, "If-Modified-Since": earlier}).status_code == 200
+    # Last-Modified does not cover the query parameters
+    assert client.get("/tasks/", headers={**member, "If-Modified-Since": last_modified},
+                      params={"completed": False}).status_code == 200
+
+
+def test_admin_chat_revalidates(client, make_user):
+    member, _ = make_user()
+    client.post("/chats/admin/message", headers=member, json={"content": "conditional"})
+
+    first = client.get("/chats/admin", headers=member)
+    assert first.status_code == 200
+    for header, value in (("If-None-Match", first.headers["etag"]),
+                          ("If-Modified-Since", first.headers["last-modified"])):
+        assert client.get("/chats/admin", headers={**member, header: value}).status_code == 304
+
+    client.post("/chats/admin/message", headers=member, json={"content": "again"})
+    assert client.get("/chats/admin", headers={**member, "If-None-Match": first.headers["etag"]}).status_code == 200
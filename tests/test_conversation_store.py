@@ -0,0 +1,62 @@
+"""ConversationStore: token-budget trimming, LRU/byte eviction and TTL expiry."""
+import time
+
+from app.utils.conversation_store import ConversationStore, estimate_tokens
+
+SYSTEM = {"role": "system", "content": "You are a helpful assistant."}
+
+
+def _message(role, text):
+    # 40 characters: 14 tokens each by estimate_tokens
+    return {"role": role, "content": text.ljust(40, ".")}
+
+
+def test_history_is_trimmed_from_the_oldest_turn():
+    store = ConversationStore(SYSTEM, token_budget=estimate_tokens(SYSTEM) + 3 * 14)
+    for turn in range(3):
+        store.append("s", _message("user", f"question {turn}"), _message("assistant", f"answer {turn}"))
+
+    prompt = store.messages("s")
+    assert prompt[0] == SYSTEM
+    # Three messages fit; the history then must not open with an assistant reply
+    assert [message["content"][:10] for message in prompt[1:]] == ["question 2", "answer 2.."]
+    assert store.total_bytes == sum(len(message["content"]) + len(message["role"]) for message in prompt[1:])
+
+    pending = _message("user", "question 3")
+    assert store.messages("s", pending)[1:] == [_message("user", "question 2"), _message("assistant", "answer 2"),
+                                                pending]
+
+
+def test_latest_message_is_kept_over_budget():
+    store = ConversationStore(SYSTEM, token_budget=estimate_tokens(SYSTEM) + 5)
+    store.append("s", _message("user", "too long for the budget"))
+    assert store.messages("s")[1:] == [_message("user", "too long for the budget")]
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = ConversationStore(SYSTEM, max_sessions=2)
+    for session_id in ("a", "b"):
+        store.append(session_id, _message("user", session_id))
+    store.append("a", _message("assistant", "a again"))  # a is now the most recent
+    store.append("c", _message("user", "c"))
+    assert "a" in store and "c" in store and "b" not in store
+
+    by_bytes = ConversationStore(SYSTEM, max_bytes=100)
+    by_bytes.append("old", _message("user", "old"))
+    by_bytes.append("new", _message("user", "new"))
+    by_bytes.append("new", _message("assistant", "reply"))
+    # Over the byte budget the oldest session goes...
+    assert len(by_bytes) == 1 and "new" in by_bytes
+    # ...but never the only one left
+    by_bytes.append("new", _message("user", "more"))
+    assert "new" in by_bytes and by_bytes.total_bytes > 100
+
+
+def test_idle_sessions_expire():
+    store = ConversationStore(SYSTEM, ttl_seconds=0.05)
+    store.append("s", _message("user", "hello"))
+    assert "s" in store
+    time.sleep(0.1)
+    assert "s" not in store
+    assert store.messages("s") == [SYSTEM]
+    assert store.total_bytes == 0
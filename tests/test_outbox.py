@@ -0,0 +1,111 @@
+"""Email outbox: claiming, retries and delivery by the worker pool."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, SessionLocal
+from app.models import EmailOutbox, User
+from app.utils.email_service import InMemoryTransport, get_transport
+from app.utils.outbox import OutboxWorker, enqueue_email
+
+
+class FailingTransport:
+    name = "failing"
+
+    def send(self, to_email, subject, message):
+        raise ConnectionError("relay down")
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    """A database of its own, out of reach of the app's running outbox workers."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _queue(sessions, *addresses, **values):
+    with sessions() as db:
+        entries = [enqueue_email(db, address, "Subject", f"Hello {address}") for address in addresses]
+        for entry in entries:
+            for name, value in values.items():
+                setattr(entry, name, value)
+        db.commit()
+
+
+def _rows(sessions):
+    with sessions() as db:
+        return {entry.to_email: entry for entry in db.query(EmailOutbox)}
+
+
+def test_drain_sends_due_rows_once(sessions):
+    transport = InMemoryTransport(latency=0)
+    worker = OutboxWorker(transport=transport, batch_size=2, session_factory=sessions)
+    _queue(sessions, "a@example.com", "b@example.com", "c@example.com")
+    _queue(sessions, "later@example.com", next_attempt_at=datetime.utcnow() + timedelta(hours=1))
+
+    assert worker.drain_once() == 2
+    assert worker.drain_once() == 1
+    assert worker.drain_once() == 0
+
+    assert sorted(mail["to"] for mail in transport.sent) == ["a@example.com", "b@example.com", "c@example.com"]
+    rows = _rows(sessions)
+    assert all(rows[address].status == "sent" and rows[address].sent_at and rows[address].claim_token is None
+               for address in ("a@example.com", "b@example.com", "c@example.com"))
+    assert rows["later@example.com"].status == "pending"
+
+
+def test_failures_back_off_then_give_up(sessions):
+    worker = OutboxWorker(transport=FailingTransport(), max_attempts=2, backoff_seconds=60, session_factory=sessions)
+    _queue(sessions, "down@example.com")
+
+    assert worker.drain_once() == 1
+    entry = _rows(sessions)["down@example.com"]
+    assert (entry.status, entry.attempts, entry.last_error) == ("pending", 1, "relay down")
+    assert entry.next_attempt_at > datetime.utcnow() + timedelta(seconds=30)
+    assert worker.drain_once() == 0  # not due again yet
+
+    with sessions() as db:
+        db.query(EmailOutbox).update({EmailOutbox.next_attempt_at: datetime.utcnow()})
+        db.commit()
+    assert worker.drain_once() == 1
+    entry = _rows(sessions)["down@example.com"]
+    assert (entry.status, entry.attempts) == ("failed", 2)
+    assert worker.drain_once() == 0
+
+
+def test_claimed_rows_are_taken_over_after_the_lease(sessions):
+    transport = InMemoryTransport(latency=0)
+    worker = OutboxWorker(transport=transport, session_factory=sessions)
+    # Claimed by a worker that is still within its lease, and by one that died
+    _queue(sessions, "leased@example.com", status="sending", claim_token="other",
+           next_attempt_at=datetime.utcnow() + timedelta(minutes=5))
+    _queue(sessions, "orphan@example.com", status="sending", claim_token="dead",
+           next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+
+    assert worker.drain_once() == 1
+    assert [mail["to"] for mail in transport.sent] == ["orphan@example.com"]
+    assert _rows(sessions)["leased@example.com"].status == "sending"
+
+
+def test_app_workers_deliver_task_emails(client, make_user):
+    admin, admin_id = make_user(admin=True)
+    client.post("/tasks/", headers=admin, json={"title": "delivered"})
+    with SessionLocal() as db:
+        email = db.get(User, admin_id).email
+
+    deadline = time.monotonic() + 15
+    while True:
+        with SessionLocal() as db:
+            status = db.execute(select(EmailOutbox.status).where(
+                EmailOutbox.to_email == email, EmailOutbox.subject == "Task Created"
+            )).scalar_one()
+        if status == "sent" or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+    assert status == "sent"
+    assert any(mail["to"] == email and mail["subject"] == "Task Created" for mail in get_transport().sent)
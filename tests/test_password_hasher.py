@@ -0,0 +1,51 @@
+"""The bcrypt process pool: admission limit, timeouts and worker crashes."""
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.utils.password_hasher import PasswordHasher, password_hasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, rounds=4, max_pending=1, timeout=0.2)
+    yield hasher
+    hasher.shutdown()
+
+
+def _wait_until(condition, seconds=10):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.05)
+
+
+def test_timed_out_job_counts_until_it_finishes(hasher):
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hasher._run(time.sleep, 1))
+    # bcrypt is still running in the worker; it holds its slot until it returns
+    assert hasher.pending == 1
+    _wait_until(lambda: hasher.pending == 0)
+
+
+def test_broken_pool_is_replaced(hasher):
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(hasher._run(os._exit, 1))
+    assert hasher.pending == 0
+
+    hasher.timeout = 30
+    hashed = asyncio.run(hasher.hash("secret"))
+    assert asyncio.run(hasher.verify("secret", hashed))
+
+
+@pytest.mark.parametrize("setting, value", [("max_pending", 0), ("timeout", 0)])
+def test_register_answers_503_when_hasher_unavailable(client, monkeypatch, setting, value):
+    monkeypatch.setattr(password_hasher, setting, value)
+    response = client.post("/users/register", json={
+        "username": f"hasher-{setting}", "email": f"hasher-{setting}@example.com", "role": "user", "password": "secret"
+    })
+    assert response.status_code == 503, response.text
+    assert response.headers["retry-after"] == "1"
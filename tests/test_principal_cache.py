@@ -0,0 +1,45 @@
+"""Authenticated-principal cache: hits, expiry and invalidation on user writes."""
+import time
+
+from app.database import SessionLocal
+from app.models import Role, User
+from app.utils.principal_cache import PrincipalCache, principal_cache
+
+
+def _user(user_id):
+    return User(id=user_id, username=f"cached-{user_id}", email=f"cached-{user_id}@example.com",
+                hashed_password="x", role=Role.user)
+
+
+def test_entries_expire_with_the_ttl_or_the_token():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=30)
+    cache.put("fresh", _user(1))
+    cache.put("expiring", _user(2), token_exp=time.time() - 1)
+    assert cache.get("fresh").username == "cached-1"
+    assert cache.get("expiring") is None
+
+    cache.put("third", _user(3))
+    cache.put("fourth", _user(3))
+    assert cache.get("fresh") is None  # least recently stored
+    cache.invalidate_user(3)
+    assert cache.get("third") is None and cache.get("fourth") is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_requests_reuse_the_principal_until_the_user_changes(client, make_user):
+    member, member_id = make_user()
+    client.get("/users/me", headers=member)
+
+    hits = principal_cache.hits
+    cached = client.get("/users/me", headers=member)
+    assert principal_cache.hits == hits + 1
+    # Only the token is checked: no user query
+    assert cached.headers["x-db-queries"] == "0"
+    assert cached.json()["role"] == "user"
+
+    with SessionLocal() as db:
+        db.get(User, member_id).role = Role.admin
+        db.commit()
+    refreshed = client.get("/users/me", headers=member)
+    assert refreshed.json()["role"] == "admin"
+    assert refreshed.headers["x-db-queries"] == "1"
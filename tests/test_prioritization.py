@@ -0,0 +1,53 @@
+"""Smart prioritization: the score and the assignee load it weighs."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.utils.prioritization import SmartWeights, rank, score_tasks
+
+NOW = datetime(2030, 1, 1)
+LOAD_ONLY = SmartWeights(due=0.0, priority=0.0, load=1.0)
+
+
+def test_score_orders_by_urgency_and_priority():
+    day = 86400.0
+    start = (NOW - datetime(1970, 1, 1)).total_seconds()
+    due = np.array([start + 10 * day, start + day, start - day, np.nan])
+    scores = score_tasks(due, np.array([3, 3, 3, 3]), np.array([-1, -1, -1, -1]), NOW)
+    # overdue > due tomorrow > due in ten days > no due date
+    assert list(np.argsort(-scores)) == [2, 1, 0, 3]
+
+    high, low = score_tasks(np.array([np.nan, np.nan]), np.array([1, 5]), np.array([-1, -1]), NOW)
+    assert high > low
+
+
+def test_load_counts_every_open_task_of_the_assignee():
+    rows = [(1, None, 3, 7, False), (2, None, 3, 8, False), (3, None, 3, None, False), (4, None, 3, 7, True)]
+    # Among these rows alone assignees 7 and 8 have one open task each
+    assert rank(rows, NOW, LOAD_ONLY).scores.tolist() == [1.0, 1.0, 0.0, -1.0]
+
+    ranking = rank(rows, NOW, LOAD_ONLY, open_counts={7: 2, 8: 8, 9: 4})
+    assert ranking.ids.tolist() == [2, 1, 3, 4]
+    assert ranking.scores.tolist() == [1.0, 0.25, 0.0, -1.0]
+
+
+def test_prioritized_load_is_relative_to_all_assignees(client, make_user):
+    admin, _ = make_user(admin=True)
+    _, busy_id = make_user()
+    _, idle_id = make_user()
+    due = (datetime.utcnow() + timedelta(days=3)).isoformat()
+    client.post("/tasks/batch", headers=admin, json=[
+        {"title": f"busy {i}", "due_date": due, "assigned_to_id": busy_id} for i in range(5)
+    ] + [{"title": "idle", "due_date": due, "assigned_to_id": idle_id}])
+
+    def score(assignee):
+        response = client.get("/tasks/prioritized", headers=admin, params={
+            "assigned_to_id": assignee, "w_due": 0, "w_priority": 0, "w_load": 1
+        })
+        assert response.status_code == 200, response.text
+        return response.json()[0]["score"]
+
+    # Narrowed to the idle user it is still one fifth as loaded as the busy one
+    assert score(idle_id) == pytest.approx(score(busy_id) / 5, abs=1e-6)
+    assert score(idle_id) < 1.0
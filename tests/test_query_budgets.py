@@ -0,0 +1,114 @@
+"""Statement counts of the list, inbox and batch endpoints (X-DB-Queries, SQL_DEBUG_HEADERS=1).
+
+Each endpoint runs a fixed number of statements whatever the number of rows
+or ids; a per-row query shows up as a higher count or an X-DB-Repeated header.
+"""
+import pytest
+from sqlalchemy import select
+
+from app.database import SessionLocal, engine
+from app.models import Task
+from app.utils.request_metrics import QueryBudgetExceeded, assert_query_budget, query_budget
+
+
+def _queries(response):
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-db-queries"])
+
+
+def _create(client, headers, count, assignee):
+    return client.post("/tasks/batch", headers=headers, json=[
+        {"title": f"budget {i}", "due_date": f"2030-03-{i % 28 + 1:02d}T00:00:00", "assigned_to_id": assignee}
+        for i in range(count)
+    ])
+
+
+def test_task_list_budget(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    _create(client, admin, 2, member_id)
+    client.get("/tasks/", headers=member)  # the first request also loads the user into the principal cache
+    few = {"admin": client.get("/tasks/", headers=admin), "member": client.get("/tasks/", headers=member)}
+    _create(client, admin, 40, member_id)
+    many = {"admin": client.get("/tasks/", headers=admin), "member": client.get("/tasks/", headers=member)}
+
+    for name, response in many.items():
+        # version stamp, page (+ the user on a cold principal cache)
+        assert_query_budget(response, 3)
+        assert _queries(response) == _queries(few[name])
+
+    page = client.get("/tasks/", headers=member, params={"page_size": 5})
+    assert_query_budget(client.get("/tasks/", headers=member, params={
+        "page_size": 5, "cursor": page.headers["x-next-cursor"]
+    }), 3)
+
+
+def test_admin_inbox_budget(client, make_user):
+    admin, _ = make_user(admin=True)
+
+    def inbox_after(new_chats):
+        for _ in range(new_chats):
+            member, _ = make_user()
+            client.post("/chats/admin/message", headers=member, json={"content": "hello"})
+            client.post("/chats/admin/message", headers=member, json={"content": "still there?"})
+        return client.get("/chats/admin/all", headers=admin)
+
+    client.get("/chats/admin/all", headers=admin)  # loads the admin into the principal cache
+    few, many = inbox_after(1), inbox_after(8)
+    # page of chats from the counters, latest messages of the page (+ the user on a cold cache)
+    assert_query_budget(many, 3)
+    assert _queries(many) == _queries(few)
+    assert len(many.json()) >= 9
+
+
+# complete: load, update, versions, recipients' emails, and one outbox insert per
+# recipient (owner and assignee here) on SQLite, which has no insert sentinel
+@pytest.mark.parametrize("endpoint, budget", [("update", 3), ("assign", 5), ("complete", 6)])
+def test_task_batch_budget(client, make_user, endpoint, budget):
+    admin, _ = make_user(admin=True)
+    _, member_id = make_user()
+
+    def call(ids):
+        if endpoint == "update":
+            return client.put("/tasks/batch", headers=admin, json={"ids": ids, "priority": 1})
+        if endpoint == "assign":
+            return client.put(f"/tasks/batch/assign/{member_id}", headers=admin, json={"ids": ids})
+        return client.patch("/tasks/batch/complete", headers=admin, json={"ids": ids})
+
+    small = [task["id"] for task in _create(client, admin, 2, member_id).json()]
+    large = [task["id"] for task in _create(client, admin, 50, member_id).json()]
+    call(small)  # first call per user may create version rows
+    small_response, large_response = call(small), call(large)
+
+    assert_query_budget(large_response, budget)
+    assert _queries(large_response) == _queries(small_response)
+
+
+def test_task_batch_create_budget(client, make_user):
+    admin, _ = make_user(admin=True)
+    _, member_id = make_user()
+    _create(client, admin, 1, member_id)
+
+    small, large = _create(client, admin, 2, member_id), _create(client, admin, 30, member_id)
+    if engine.dialect.name == "sqlite":
+        # SQLite has no insert sentinel, so INSERT ... RETURNING in parameter
+        # order runs once per row there; every other statement stays fixed
+        assert _queries(large) - _queries(small) == 28
+        assert "INSERT INTO tasks" in large.headers["x-db-repeated"]
+        assert_query_budget(large, 4 + 30, allow_repeats=True)
+    else:
+        assert_query_budget(large, 5)
+        assert _queries(large) == _queries(small)
+
+
+def test_query_budget_reports_repeats():
+    with SessionLocal() as db:
+        with pytest.raises(QueryBudgetExceeded, match="likely N\\+1"):
+            with query_budget(20, label="per-row loads"):
+                for task_id in range(1, 7):
+                    db.execute(select(Task.title).where(Task.id == task_id))
+
+        with pytest.raises(QueryBudgetExceeded, match="budget 1"):
+            with query_budget(1):
+                db.execute(select(Task.id).limit(1))
+                db.execute(select(Task.title).limit(1))
@@ -0,0 +1,83 @@
+"""Due-date reminders: one email per recipient, claimed once across workers, resumed after restart."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import EmailOutbox, Role, Task, User
+from app.utils.reminders import ReminderScheduler
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    """A database of its own, so the app's tasks and workers stay out of it."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _scheduler(sessions):
+    return ReminderScheduler(lead_minutes=60, window_minutes=60, session_factory=sessions)
+
+
+def _reminders(sessions):
+    with sessions() as db:
+        return [(to_email, body) for to_email, body in db.execute(
+            select(EmailOutbox.to_email, EmailOutbox.body)
+            .where(EmailOutbox.subject == "Tasks Due Soon").order_by(EmailOutbox.id)
+        )]
+
+
+def test_reminders_are_coalesced_and_claimed_once(sessions):
+    with sessions() as db:
+        alice = User(username="alice", email="alice@example.com", hashed_password="x", role=Role.user)
+        bob = User(username="bob", email="bob@example.com", hashed_password="x", role=Role.user)
+        db.add_all([alice, bob])
+        db.flush()
+
+        def task(title, minutes, assignee=None, completed=False):
+            return Task(title=title, owner_id=alice.id, assigned_to_id=assignee and assignee.id,
+                        due_date=NOW + timedelta(minutes=minutes), completed=completed)
+
+        tasks = {
+            "a": task("a", 30, bob), "b": task("b", 45), "c": task("c", 50, bob),
+            "done": task("done", 40, bob, completed=True), "d": task("d", 90),
+        }
+        db.add_all(tasks.values())
+        db.commit()
+        ids = {name: row.id for name, row in tasks.items()}
+
+    # Two workers' schedulers with the same window loaded before either sends
+    first, second = _scheduler(sessions), _scheduler(sessions)
+    assert second.tick(NOW - timedelta(minutes=40)) == 0
+    assert first.tick(NOW) == 3
+    assert second.tick(NOW) == 3
+    assert (first.sent, second.sent, second.skipped) == (3, 0, 3)
+
+    # Assignees get the reminder, owners the unassigned tasks: one email each
+    sent = dict(_reminders(sessions))
+    assert sorted(sent) == ["alice@example.com", "bob@example.com"]
+    assert sent["bob@example.com"].startswith("2 of your tasks are due soon:")
+    assert "- a (due 2030-01-01 12:30 UTC)" in sent["bob@example.com"]
+    assert "- c (due 2030-01-01 12:50 UTC)" in sent["bob@example.com"]
+    assert sent["alice@example.com"].startswith("1 of your tasks are due soon:")
+    with sessions() as db:
+        assert db.get(Task, ids["a"]).reminded_due == NOW + timedelta(minutes=30)
+        assert db.get(Task, ids["done"]).reminded_due is None
+
+    # A restarted worker resumes after the high-water mark: only d is still to come
+    restarted = _scheduler(sessions)
+    assert restarted.tick(NOW) == 0
+    assert restarted.stats()["pending"] == 1
+    assert restarted.tick(NOW + timedelta(minutes=31)) == 1
+    # The first scheduler had d in its window too; its claim finds it sent
+    assert first.tick(NOW + timedelta(minutes=31)) == 1
+    assert (first.sent, first.skipped) == (3, 1)
+    reminders = _reminders(sessions)
+    assert len(reminders) == 3
+    assert reminders[2] == ("alice@example.com", "1 of your tasks are due soon:\n- d (due 2030-01-01 13:30 UTC)")
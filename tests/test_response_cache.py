@@ -0,0 +1,63 @@
+"""First-turn answer cache for /generate."""
+import time
+import uuid
+
+from app.utils.response_cache import ResponseCache, normalize_prompt
+
+
+def test_prompts_are_normalized():
+    assert normalize_prompt("  How do I\n create a TASK?? ") == "how do i create a task"
+    cache = ResponseCache()
+    cache.put("model", "How do I create a task?", "answer")
+    assert cache.get("model", "how do i   create a task") == "answer"
+    assert cache.get("other-model", "How do I create a task?") is None
+
+
+def test_entries_are_bounded_and_expire():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("m", "one", "1")
+    cache.put("m", "two", "2")
+    cache.get("m", "one")
+    cache.put("m", "three", "3")
+    assert cache.get("m", "two") is None  # least recently used
+    assert cache.get("m", "one") == "1"
+
+    time.sleep(0.1)
+    assert cache.get("m", "three") is None
+    assert cache.stats()["entries"] == 1  # "one" is only dropped when looked up
+
+    disabled = ResponseCache(max_entries=0)
+    disabled.put("m", "one", "1")
+    assert disabled.get("m", "one") is None and not disabled.stats()["enabled"]
+
+
+def test_generate_answers_repeated_first_turns_from_cache(client, monkeypatch):
+    from app.main import llm_client
+
+    question = f"What is task {uuid.uuid4().hex}?"
+    greeting = f"hello {uuid.uuid4().hex}"
+    calls = []
+    complete = llm_client.complete
+
+    async def counting(messages, model):
+        prompt = normalize_prompt(messages[-1]["content"])
+        if prompt in (normalize_prompt(question), greeting):  # not the startup warm-up questions
+            calls.append(prompt)
+        return await complete(messages, model)
+
+    monkeypatch.setattr(llm_client, "complete", counting)
+
+    def ask(session_id, prompt):
+        response = client.post("/generate", json={"session_id": session_id, "prompt": prompt})
+        assert response.status_code == 200, response.text
+        return response.json()["response"]
+
+    first = ask(uuid.uuid4().hex, question)
+    assert ask(uuid.uuid4().hex, f"  {question.upper()} ") == first
+    assert calls == [normalize_prompt(question)]
+
+    # A later turn depends on the history, so it always goes to the model
+    session_id = uuid.uuid4().hex
+    ask(session_id, greeting)
+    ask(session_id, question)
+    assert calls == [normalize_prompt(question), greeting, normalize_prompt(question)]
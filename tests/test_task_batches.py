@@ -0,0 +1,39 @@
+"""Batch task endpoints: per-item results and one notification per recipient."""
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import EmailOutbox, User
+
+
+def _outbox(user_id, subject):
+    with SessionLocal() as db:
+        email = db.get(User, user_id).email
+        return db.execute(
+            select(EmailOutbox.body).where(EmailOutbox.to_email == email, EmailOutbox.subject == subject)
+        ).scalars().all()
+
+
+def test_batch_complete_notifies_owners_and_assignees_once(client, make_user):
+    admin, admin_id = make_user(admin=True)
+    member, member_id = make_user(admin=True)  # only admins can create tasks
+    assigned = client.post("/tasks/batch", headers=admin, json=[
+        {"title": "assigned one", "assigned_to_id": member_id},
+        {"title": "assigned two", "assigned_to_id": member_id},
+    ]).json()
+    owned = client.post("/tasks/batch", headers=member, json=[{"title": "owned"}]).json()
+    forbidden = client.post("/tasks/batch", headers=admin, json=[{"title": "not theirs"}]).json()
+
+    ids = [task["id"] for task in assigned + owned + forbidden] + [assigned[0]["id"]]
+    results = client.patch("/tasks/batch/complete", headers=member, json={"ids": ids}).json()
+    assert [result["status"] for result in results] == ["completed", "completed", "completed", "forbidden"]
+
+    # The member owns one task and is assigned two: one email lists all three
+    [member_email] = _outbox(member_id, "Tasks Completed")
+    assert member_email.startswith("3 of your tasks have been completed:")
+    assert "- owned\n" in member_email + "\n"
+    assert "- assigned one (assigned to you)" in member_email
+    assert "- assigned two (assigned to you)" in member_email
+
+    [admin_email] = _outbox(admin_id, "Tasks Completed")
+    assert admin_email.startswith("2 of your tasks have been completed:")
+    assert "not theirs" not in admin_email
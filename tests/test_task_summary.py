@@ -0,0 +1,38 @@
+"""/tasks/summary: every counter from one conditional-aggregate query."""
+from datetime import datetime, timedelta
+
+EMPTY = {"totalTasks": 0, "completedTasks": 0, "pendingTasks": 0, "highPriority": 0, "mediumPriority": 0,
+         "lowPriority": 0, "overdueTasks": 0, "dueToday": 0}
+
+
+def test_summary_counters(client, make_user):
+    admin, _ = make_user(admin=True)
+    member, member_id = make_user()
+    assert client.get("/tasks/summary", headers=member).json() == EMPTY
+
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    tasks = [
+        (today - timedelta(days=1), 1, False),                # overdue
+        (today + timedelta(hours=23, minutes=59), 2, False),  # due today
+        (today, 3, True),                                     # due today, done: not overdue
+        (today + timedelta(days=10), 4, False),
+        (None, 1, True),
+    ]
+    created = client.post("/tasks/batch", headers=admin, json=[
+        {"title": f"summary {i}", "due_date": due and due.isoformat(), "priority": priority,
+         "assigned_to_id": member_id}
+        for i, (due, priority, _) in enumerate(tasks)
+    ]).json()
+    done = [result["id"] for result, (_, _, completed) in zip(created, tasks) if completed]
+    client.patch("/tasks/batch/complete", headers=member, json={"ids": done})
+
+    expected = {"totalTasks": 5, "completedTasks": 2, "pendingTasks": 3, "highPriority": 2, "mediumPriority": 1,
+                "lowPriority": 1, "overdueTasks": 1, "dueToday": 2}
+    assert client.get("/tasks/summary", headers=member).json() == expected
+
+    # Admins see every task; the groups add up to the totals
+    grouped = client.get("/tasks/summary", headers=admin, params={"by_assignee": True}).json()
+    [mine] = [group for group in grouped.pop("byAssignee") if group.pop("assigned_to_id") == member_id]
+    assert mine == expected
+    assert grouped == client.get("/tasks/summary", headers=admin).json()
@@ -0,0 +1,56 @@
+"""chat_unread_counters: last_activity and the rebuild from chat_messages."""
+from sqlalchemy import delete, select, update
+
+from app.database import SessionLocal
+from app.models import ChatUnreadCounter
+
+
+def _inbox(client, admin):
+    entries, cursor = {}, None
+    while True:
+        response = client.get("/chats/admin/all", headers=admin, params={"cursor": cursor} if cursor else {})
+        entries.update({entry["id"]: entry for entry in response.json()})
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return entries
+
+
+def test_rebuild_keeps_last_activity_of_empty_chats(client, make_user):
+    admin, _ = make_user(admin=True)
+    quiet, _ = make_user()
+    chatty, _ = make_user()
+    empty_id = client.post("/chats/admin", headers=quiet, json={"title": "Admin Chat - quiet"}).json()["id"]
+    client.post("/chats/admin/message", headers=chatty, json={"content": "hello"})
+    chatty_id = client.get("/chats/admin", headers=chatty).json()["id"]
+
+    assert client.post("/chats/admin/unread/rebuild", headers=admin).status_code == 200
+    inbox = _inbox(client, admin)
+    # An empty chat is as old as the chat itself, not as the newest message anywhere
+    assert inbox[empty_id]["last_activity"] < inbox[chatty_id]["last_activity"]
+
+
+def test_rebuild_recounts_in_place(client, make_user):
+    admin, _ = make_user(admin=True)
+    first, _ = make_user()
+    second, _ = make_user()
+    for headers in (first, second):
+        client.post("/chats/admin/message", headers=headers, json={"content": "hello"})
+        client.post("/chats/admin/message", headers=headers, json={"content": "hello again"})
+    first_id = client.get("/chats/admin", headers=first).json()["id"]
+    second_id = client.get("/chats/admin", headers=second).json()["id"]
+
+    with SessionLocal() as db:
+        db.execute(update(ChatUnreadCounter).where(ChatUnreadCounter.chat_id == first_id).values(admin_unread=40))
+        db.execute(delete(ChatUnreadCounter).where(ChatUnreadCounter.chat_id == second_id))
+        db.commit()
+        version = db.execute(select(ChatUnreadCounter.version).where(ChatUnreadCounter.chat_id == first_id)).scalar()
+
+    assert client.post("/chats/admin/unread/rebuild", headers=admin).status_code == 200
+    inbox = _inbox(client, admin)
+    assert inbox[first_id]["unread_count"] == 2
+    assert inbox[second_id]["unread_count"] == 2
+    with SessionLocal() as db:
+        # Moved on rather than reset, so an ETag from before the rebuild no longer matches
+        assert db.execute(
+            select(ChatUnreadCounter.version).where(ChatUnreadCounter.chat_id == first_id)
+        ).scalar() > version